@@ -0,0 +1,184 @@
+"""
+Async variants of the hot routes, mounted instead of the sync ones when
+``DB_ASYNC_MODE`` is set. Database access goes through ``AsyncSession``;
+bcrypt runs on the password-hashing process pool, and translator misses
+and KB refreshes run on worker threads, so the event loop never waits.
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import history
+from backend.auth import (
+    HashPoolSaturated, TokenUser, create_user_token, optional_token_user, password_hasher, require_token_user,
+    token_user_for,
+)
+from backend.chat_service import Guest, arespond, aunderstand, history_rows, reply_language
+from backend.database import ReadSessionLocal, get_async_db, get_async_read_db
+from backend.kb import get_index, refresh_due, refresh_if_due
+from backend.metrics import chat_requests, timed
+from backend.models import ChatHistory, User
+from backend.schemas import ChatHistoryResponse, ChatRequest, ChatResponse, LoginUser, RegisterUser
+
+router = APIRouter()
+
+
+# ----------------- Helpers -----------------
+async def current_snapshot():
+    """The KB snapshot; the (sync) version check runs in a thread only when due."""
+    if refresh_due():
+        return await asyncio.to_thread(refresh_if_due, ReadSessionLocal)
+    return get_index()
+
+
+def _read_with_pending(writer, stmt, user_id: int):
+    """
+    Table page after committing the user's buffered rows, or, if that flush
+    fails, the page and the unflushed rows under the writer's (thread) lock.
+    Runs whole on one worker thread, so a cancelled request can't leave the
+    lock held.
+    """
+    db = ReadSessionLocal()
+    try:
+        if writer.drain(user_id):
+            return db.execute(stmt).all(), []
+        with writer.visibility():
+            return db.execute(stmt).all(), writer.pending_for(user_id)
+    finally:
+        db.close()
+
+
+async def queue_history(rows: list):
+    writer = history.history_writer
+    if not writer.try_add(rows):
+        await asyncio.to_thread(writer.add, rows)  # full: wait for room off the loop
+
+
+# ----------------- Routes -----------------
+@router.post("/register")
+async def register(user: RegisterUser, db: AsyncSession = Depends(get_async_db)):
+    email_clean = user.email.strip().lower()
+    if await db.scalar(select(User.id).where(User.username == user.username)):
+        raise HTTPException(status_code=400, detail="❌ Username already taken")
+    if await db.scalar(select(User.id).where(User.email == email_clean)):
+        raise HTTPException(status_code=400, detail="❌ Email already registered")
+
+    hashed_pw = await password_hasher.ahash(user.password)
+    new_user = User(
+        username=user.username.strip(),
+        email=email_clean,
+        age=int(user.age),
+        gender=user.gender.strip().lower(),
+        password=hashed_pw,
+        language="en",
+    )
+    db.add(new_user)
+    await db.commit()
+
+    return {
+        "id": new_user.id,
+        "username": new_user.username,
+        "email": new_user.email,
+        "gender": new_user.gender,
+        "message": "✅ User registered successfully!"
+    }
+
+
+@router.post("/login")
+async def login(payload: LoginUser, db: AsyncSession = Depends(get_async_db)):
+    email_clean = payload.email.strip().lower()
+    user = await db.scalar(select(User).where(User.email == email_clean))
+    if not user or not await password_hasher.averify(payload.password, user.password):
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if password_hasher.needs_update(user.password):
+        try:
+            user.password = await password_hasher.ahash(payload.password)
+            await db.commit()
+        except HashPoolSaturated:
+            pass  # try again on a later login
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "language": user.language,
+        "access_token": create_user_token(user),
+        "token_type": "bearer",
+        "message": "Login successful ✅"
+    }
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    token_user: Optional[TokenUser] = Depends(optional_token_user),
+):
+    user = token_user
+    if user is None and request.user:  # no token: look the user up by name
+        with timed("user_lookup"):
+            user = await db.scalar(select(User).where(User.username == request.user))
+    if not user:  # guest fallback
+        user = Guest(request.user, request.language)
+    chat_requests.inc("registered" if user.id != 0 else "guest")
+
+    detected, query_en = await aunderstand(request.message)
+    out_lang = reply_language(request.language, detected, user)
+    bot_reply_translated, tier = await arespond(db, await current_snapshot(), query_en, out_lang)
+
+    if user.id != 0:
+        rows = history_rows(user.id, request.message, bot_reply_translated)
+        with timed("history_write"):
+            if history.history_writer is not None:
+                await queue_history(rows)
+            else:
+                await db.execute(ChatHistory.__table__.insert(), rows)
+                await db.commit()
+
+    return {"response": bot_reply_translated, "detected_language": detected.lang, "tier": tier}
+
+
+@router.get("/history/{username}", response_model=ChatHistoryResponse)
+async def get_history(
+    username: str,
+    limit: int = Query(10, ge=1, le=100),
+    before_id: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_read_db),
+    token_user: TokenUser = Depends(require_token_user),
+):
+    user = token_user_for(username, token_user)
+
+    stmt = select(ChatHistory.id, ChatHistory.sender, ChatHistory.message).where(ChatHistory.user_id == user.id)
+    if before_id is not None:
+        stmt = stmt.where(ChatHistory.id < before_id)
+    stmt = stmt.order_by(ChatHistory.id.desc()).limit(limit + 1)
+
+    writer = history.history_writer
+    pending = []
+    if writer is None or before_id is not None:
+        stored = (await db.execute(stmt)).all()
+    else:
+        stored, pending = await asyncio.to_thread(_read_with_pending, writer, stmt, user.id)
+
+    rows, next_before_id = history.history_page(stored, pending, limit)
+
+    return {
+        "username": user.username,
+        "language": user.language,
+        "history": rows,
+        "next_before_id": next_before_id,
+    }
+
+
+# ----------------- Mounting -----------------
+def mount_async_routes(app: FastAPI):
+    """Replace the sync routes that have an async variant here."""
+    replaced = {(r.path, m) for r in router.routes for m in r.methods}
+    app.router.routes = [
+        r for r in app.router.routes
+        if not (isinstance(r, APIRoute) and any((r.path, m) in replaced for m in r.methods))
+    ]
+    app.include_router(router)
+    print("✅ Async database mode: /chat, /history, /register and /login use AsyncSession.")
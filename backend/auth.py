@@ -1,9 +1,18 @@
+import asyncio
+import hmac
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt, JWTError, ExpiredSignatureError
 from dotenv import load_dotenv
+from passlib.context import CryptContext
 
 # ----------------- Load environment variables -----------------
 load_dotenv()
@@ -11,6 +20,141 @@ load_dotenv()
 SECRET_KEY: str = os.getenv("SECRET_KEY", "change_this_secret_key")
 ALGORITHM: str = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # bearer token for the /admin routes; empty = locked
+
+# ----------------- Password Hashing -----------------
+BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", 2))
+HASH_MAX_PENDING: int = int(os.getenv("HASH_MAX_PENDING", 32))  # running + queued before we shed load
+HASH_RETRY_AFTER: int = int(os.getenv("HASH_RETRY_AFTER", 2))  # seconds, sent with the 503
+
+# min_rounds makes needs_update() flag hashes made with an older, lower cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+
+
+class HashPoolSaturated(Exception):
+    """Too many password hashes queued; the caller should answer 503 + Retry-After."""
+
+    def __init__(self, retry_after: int = HASH_RETRY_AFTER):
+        super().__init__("password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    return pwd_context.hash(password), time.perf_counter() - started
+
+
+def _timed_verify(password: str, hashed: str) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    return pwd_context.verify(password, hashed), time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    bcrypt on a small process pool, so hashing never holds the API's GIL
+    or threadpool for CPU time. At most ``max_pending`` calls may be running
+    or queued; beyond that calls fail fast with ``HashPoolSaturated``.
+    Queue wait and service (bcrypt) time are recorded per call.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.wait_seconds_max = 0.0
+        self.service_seconds = 0.0
+        self.service_seconds_max = 0.0
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashPoolSaturated()
+            self.pending += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            pool = self._pool
+        submitted = time.perf_counter()
+        outer: Future = Future()
+
+        def done(inner: Future):
+            elapsed = time.perf_counter() - submitted
+            with self._lock:
+                self.pending -= 1
+                if inner.cancelled():
+                    outer.cancel()
+                    return
+                if inner.exception() is not None:
+                    outer.set_exception(inner.exception())
+                    return
+                result, service = inner.result()
+                wait = max(elapsed - service, 0.0)
+                self.completed += 1
+                self.wait_seconds += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+                self.service_seconds += service
+                self.service_seconds_max = max(self.service_seconds_max, service)
+            outer.set_result(result)
+
+        try:
+            pool.submit(fn, *args).add_done_callback(done)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        return outer
+
+    # ---- Blocking (sync routes) ----
+    def hash(self, password: str) -> str:
+        return self._submit(_timed_hash, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit(_timed_verify, password, hashed).result()
+
+    # ---- Awaitable (async routes) ----
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_timed_hash, password))
+
+    async def averify(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_timed_verify, password, hashed))
+
+    def needs_update(self, hashed: str) -> bool:
+        return pwd_context.needs_update(hashed)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = max(self.completed, 1)
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "wait_seconds_avg": round(self.wait_seconds / done, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "service_seconds_total": round(self.service_seconds, 6),
+                "service_seconds_avg": round(self.service_seconds / done, 6),
+                "service_seconds_max": round(self.service_seconds_max, 6),
+            }
+
+
+password_hasher = PasswordHasher()
 
 
 # ----------------- Create JWT Token -----------------
@@ -37,3 +181,115 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         print("❌ Invalid token")
         return None
+
+
+# ----------------- Verified Claims Cache -----------------
+class ClaimsCache:
+    """LRU of token -> verified claims; an entry is dropped once its ``exp`` has passed."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            claims = self._data.get(token)
+            if claims is None:
+                self.misses += 1
+                return None
+            if claims["exp"] <= time.time():
+                del self._data[token]
+                self.misses += 1
+                return None
+            self._data.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, claims: dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[token] = claims
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+claims_cache = ClaimsCache()
+
+
+def verify_token(token: str) -> Optional[dict]:
+    """``decode_token`` for user access tokens, remembering verified claims until they expire."""
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if claims is None or "uid" not in claims or "exp" not in claims:
+            return None
+        claims_cache.put(token, claims)
+    return claims
+
+
+# ----------------- Token Users -----------------
+class TokenUser:
+    """The caller as described by a verified access token; no users-table row is loaded."""
+
+    def __init__(self, claims: dict):
+        self.id = claims["uid"]
+        self.username = claims["sub"]
+        self.language = claims.get("lang") or "en"
+
+
+def create_user_token(user) -> str:
+    return create_access_token({"sub": user.username, "uid": user.id, "lang": user.language})
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def optional_token_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[TokenUser]:
+    """The bearer token's user, None without a token (guest/legacy callers), 401 if it is bad."""
+    if credentials is None:
+        return None
+    claims = verify_token(credentials.credentials)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return TokenUser(claims)
+
+
+async def require_token_user(user: Optional[TokenUser] = Depends(optional_token_user)) -> TokenUser:
+    """The bearer token's user; 401 without a token, for routes that serve one user's private data."""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def token_user_for(username: str, token_user: Optional[TokenUser]) -> Optional[TokenUser]:
+    """The token's user if it is ``username``; 403 if the token belongs to someone else."""
+    if token_user is not None and token_user.username != username:
+        raise HTTPException(status_code=403, detail="Token does not belong to this user")
+    return token_user
+
+
+# ----------------- Admin Access -----------------
+def require_bearer_secret(secret: str, name: str):
+    """Dependency that admits only ``Authorization: Bearer <secret>``; 403 for everyone while ``secret`` is unset."""
+
+    async def check(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)):
+        if not secret:
+            raise HTTPException(status_code=403, detail=f"❌ {name} is disabled: no token is configured")
+        if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), secret.encode()):
+            raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+    return check
+
+
+require_admin = require_bearer_secret(ADMIN_TOKEN, "ADMIN_TOKEN")
@@ -0,0 +1,254 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from backend.conditions import get_conditions
+from backend.intents import get_intents
+from backend.kb import alocalized_answer, localized_answer, localized_answers
+from backend.language import Detection, detect_language, record_detection
+from backend.metrics import chat_replies, kb_matches, timed
+from backend.response_cache import response_cache
+from backend.translation import (
+    LANG_MAP, atranslate_from_english, atranslate_to_english, translate_from_english,
+    translate_many_from_english, translate_to_english, translator,
+)
+
+# ----------------- Replies -----------------
+NO_MATCH_REPLY = "Sorry, I don’t have information about that. Please rephrase your question."
+EMPTY_KB_REPLY = "Knowledge base is empty. Please add QnA data."
+
+
+# ----------------- Guest -----------------
+class Guest:
+    """Stand-in for unknown users; nothing is stored for id 0."""
+    id = 0
+
+    def __init__(self, username: Optional[str], language: Optional[str]):
+        self.username = username or "guest"
+        self.language = language or "en"
+
+
+# ----------------- Pipeline Steps -----------------
+def understand(message: str) -> Tuple[Detection, str]:
+    """Detect the language and return the lower-cased English query."""
+    detected = detect_language(message)
+    if detected.lang == "en":
+        query_en = message
+    else:
+        with timed("translate_in"):
+            query_en = translate_to_english(message, detected.lang or "auto")
+    record_detection(detected, translated=detected.lang != "en")
+    return detected, query_en.lower()
+
+
+async def aunderstand(message: str) -> Tuple[Detection, str]:
+    detected = detect_language(message)
+    if detected.lang == "en":
+        query_en = message
+    else:
+        with timed("translate_in"):
+            query_en = await atranslate_to_english(message, detected.lang or "auto")
+    record_detection(detected, translated=detected.lang != "en")
+    return detected, query_en.lower()
+
+
+def answer_query(snapshot, query_en: str) -> Tuple[Optional[Tuple[int, str]], str]:
+    """(match, English reply); ``match`` is (qna id, answer) or None."""
+    if not len(snapshot):
+        return None, EMPTY_KB_REPLY
+    with timed("match"):
+        match = snapshot.match(query_en)
+    kb_matches.inc("hit" if match is not None else "miss")
+    return match, (match[1] if match is not None else NO_MATCH_REPLY)
+
+
+def cacheable(reply: str, english_reply: str, lang: str) -> bool:
+    """A failed translation returns the English text; don't pin that in the cache."""
+    return lang == "en" or reply != english_reply
+
+
+def fast_reply(query_en: str) -> Optional[Tuple[str, str]]:
+    """(English reply, "intent") for an exact intent pattern, or None to go on to the QnA tiers."""
+    with timed("intents"):
+        intent = get_intents().match(query_en)
+    return (intent[1], "intent") if intent is not None else None
+
+
+def fallback_reply(query_en: str) -> Optional[Tuple[str, str]]:
+    """
+    (English reply, tier) for a QnA miss: the conditions tier, then an
+    intent with the same content words, then the nearest intent. Only
+    consulted after the KB, so a curated answer always wins over the
+    generic symptom list or an intent's canned text.
+    """
+    with timed("conditions"):
+        conditions = get_conditions().chat_reply(query_en)
+    if conditions is not None:
+        return conditions, "conditions"
+    intents = get_intents()
+    with timed("intents"):
+        intent = intents.match_content(query_en)
+    if intent is not None:
+        return intent[1], "intent"
+    if intents.nearest is not None:
+        with timed("intents"):
+            intent = intents.match_nearest(query_en)
+        if intent is not None:
+            return intent[1], "intent"
+    return None
+
+
+def respond(db, snapshot, query_en: str, lang: str) -> Tuple[str, str]:
+    """
+    (reply in ``lang``, tier that answered): "intent" for the compiled
+    intents, then "cache" or "qna" for the QnA knowledge base; when the KB
+    has no match, "conditions" if the message lists several symptoms.
+    """
+    reply, tier = _respond(db, snapshot, query_en, lang)
+    chat_replies.inc(tier)
+    return reply, tier
+
+
+def _respond(db, snapshot, query_en: str, lang: str) -> Tuple[str, str]:
+    fast = fast_reply(query_en)
+    if fast is not None:
+        with timed("translate_out"):
+            return translate_from_english(fast[0], lang), fast[1]
+    with timed("response_cache"):
+        reply = response_cache.get(query_en, lang, snapshot.version)
+    if reply is not None:
+        return reply, "cache"
+    match, english_reply = answer_query(snapshot, query_en)
+    if match is None:
+        fallback = fallback_reply(query_en)
+        if fallback is not None:
+            with timed("translate_out"):
+                return translate_from_english(fallback[0], lang), fallback[1]
+    with timed("translate_out"):
+        if match is not None:
+            reply = localized_answer(db, match[0], english_reply, lang)
+        else:
+            reply = translate_from_english(english_reply, lang)
+    if cacheable(reply, english_reply, lang):
+        response_cache.set(query_en, lang, snapshot.version, reply)
+    return reply, "qna"
+
+
+async def arespond(db, snapshot, query_en: str, lang: str) -> Tuple[str, str]:
+    reply, tier = await _arespond(db, snapshot, query_en, lang)
+    chat_replies.inc(tier)
+    return reply, tier
+
+
+async def _arespond(db, snapshot, query_en: str, lang: str) -> Tuple[str, str]:
+    fast = fast_reply(query_en)
+    if fast is not None:
+        with timed("translate_out"):
+            return await atranslate_from_english(fast[0], lang), fast[1]
+    with timed("response_cache"):
+        reply = await asyncio.to_thread(response_cache.get, query_en, lang, snapshot.version)
+    if reply is not None:
+        return reply, "cache"
+    match, english_reply = await asyncio.to_thread(answer_query, snapshot, query_en)
+    if match is None:
+        fallback = fallback_reply(query_en)
+        if fallback is not None:
+            with timed("translate_out"):
+                return await atranslate_from_english(fallback[0], lang), fallback[1]
+    with timed("translate_out"):
+        if match is not None:
+            reply = await alocalized_answer(db, match[0], english_reply, lang)
+        else:
+            reply = await atranslate_from_english(english_reply, lang)
+    if cacheable(reply, english_reply, lang):
+        await asyncio.to_thread(response_cache.set, query_en, lang, snapshot.version, reply)
+    return reply, "qna"
+
+
+# ----------------- Batch Pipeline -----------------
+def understand_many(messages: List[str]) -> List[Tuple[Detection, str]]:
+    """``understand`` for a batch: one translation call per detected source language."""
+    detections = [detect_language(message) for message in messages]
+    by_source: Dict[str, List[str]] = {}
+    for message, detected in zip(messages, detections):
+        if detected.lang != "en":
+            by_source.setdefault(detected.lang or "auto", []).append(message)
+    english: Dict[Tuple[str, str], str] = {}
+    for source, texts in by_source.items():
+        english.update(((text, source), out) for text, out in zip(texts, translator.translate_many(texts, source, "en")))
+
+    understood = []
+    for message, detected in zip(messages, detections):
+        query_en = message if detected.lang == "en" else english[(message, detected.lang or "auto")]
+        record_detection(detected, translated=detected.lang != "en")
+        understood.append((detected, query_en.lower()))
+    return understood
+
+
+def respond_many(db, snapshot, items: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    ``respond`` for (English query, language) pairs. Each distinct pair is
+    resolved once; misses of the intent and cache tiers are matched together
+    with ``match_many`` and localized with one lookup and one translation
+    batch per language.
+    """
+    resolved: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    english: Dict[Tuple[str, str], Tuple[str, str]] = {}  # pair -> (English reply, tier), translated below
+    pending: List[Tuple[str, str]] = []
+    for query, lang in dict.fromkeys(items):
+        fast = fast_reply(query)
+        if fast is not None:
+            english[(query, lang)] = fast
+            continue
+        reply = response_cache.get(query, lang, snapshot.version)
+        if reply is not None:
+            resolved[(query, lang)] = (reply, "cache")
+        else:
+            pending.append((query, lang))
+
+    queries = list(dict.fromkeys(query for query, _ in pending))
+    matches = dict(zip(queries, snapshot.match_many(queries))) if len(snapshot) else {}
+    hits = sum(match is not None for match in matches.values())
+    kb_matches.inc("hit", amount=hits)
+    kb_matches.inc("miss", amount=len(matches) - hits)
+    by_lang: Dict[str, List[str]] = {}
+    for query, lang in pending:
+        by_lang.setdefault(lang, []).append(query)
+    for lang, lang_queries in by_lang.items():
+        hits = [query for query in lang_queries if matches.get(query) is not None]
+        for query, reply in zip(hits, localized_answers(db, [matches[q] for q in hits], lang)):
+            resolved[(query, lang)] = (reply, "qna")
+            if cacheable(reply, matches[query][1], lang):
+                response_cache.set(query, lang, snapshot.version, reply)
+        for query in lang_queries:
+            if matches.get(query) is None:
+                english[(query, lang)] = fallback_reply(query) or (
+                    NO_MATCH_REPLY if len(snapshot) else EMPTY_KB_REPLY, "qna"
+                )
+
+    by_lang = {}
+    for (query, lang), (reply, tier) in english.items():
+        by_lang.setdefault(lang, []).append((query, reply, tier))
+    for lang, entries in by_lang.items():
+        translated = translate_many_from_english([reply for _, reply, _ in entries], lang)
+        for (query, reply, tier), out in zip(entries, translated):
+            resolved[(query, lang)] = (out, tier)
+            if tier == "qna" and cacheable(out, reply, lang):
+                response_cache.set(query, lang, snapshot.version, out)
+
+    replies = [resolved[item] for item in items]
+    for _, tier in replies:
+        chat_replies.inc(tier)
+    return replies
+
+
+def reply_language(requested: Optional[str], detected: Detection, user) -> str:
+    if requested:
+        return LANG_MAP.get(requested.strip().lower(), "en")
+    return detected.lang or user.language or "en"
+
+
+def history_rows(user_id: int, message: str, reply: str) -> List[dict]:
+    return [
+        {"user_id": user_id, "sender": "user", "message": message},
+        {"user_id": user_id, "sender": "bot", "message": reply},
+    ]
@@ -0,0 +1,214 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# ----------------- Config -----------------
+load_dotenv()
+
+CONDITIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "common_conditions.csv")
+CONDITIONS_CHAT_MIN_SYMPTOMS = int(os.getenv("CONDITIONS_CHAT_MIN_SYMPTOMS", 2))  # symptoms before /chat answers with conditions
+CONDITIONS_CHAT_LIMIT = int(os.getenv("CONDITIONS_CHAT_LIMIT", 3))
+
+# Everyday wording -> the symptom name used in common_conditions.csv
+SYMPTOM_SYNONYMS = {
+    "headache": "headaches",
+    "head ache": "headaches",
+    "high temperature": "fever",
+    "temperature": "fever",
+    "feverish": "fever",
+    "tired": "fatigue",
+    "tiredness": "fatigue",
+    "exhaustion": "fatigue",
+    "breathlessness": "shortness of breath",
+    "short of breath": "shortness of breath",
+    "difficulty breathing": "shortness of breath",
+    "stuffy nose": "congestion",
+    "blocked nose": "congestion",
+    "nasal congestion": "congestion",
+    "dizzy": "dizziness",
+    "nauseous": "nausea",
+    "thirsty": "increased thirst",
+    "muscle pain": "muscle aches",
+    "body aches": "muscle aches",
+    "body ache": "muscle aches",
+    "joint ache": "joint pain",
+    "swollen": "swelling",
+    "blurry vision": "blurred vision",
+    "light sensitivity": "sensitivity to light",
+    "photophobia": "sensitivity to light",
+    "losing weight": "weight loss",
+    "sweating at night": "night sweats",
+    "sneeze": "sneezing",
+    "coughing": "cough",
+    "wheeze": "wheezing",
+    "stiff": "stiffness",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(phrase: str) -> Tuple[str, ...]:
+    """Lower-case words with a trailing plural 's' removed: "Headaches" == "headache"."""
+    return tuple(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+                 for w in _WORD.findall(phrase.lower()))
+
+
+# ----------------- Index -----------------
+class ConditionIndex:
+    """
+    Symptom -> condition inverted index built once at load time. Each
+    symptom (and each synonym) is folded to a word tuple; a lookup gathers
+    the posting arrays of the query's symptoms, counts overlap per condition
+    with one ``np.bincount`` and keeps the top rows with ``argpartition``;
+    no per-request parsing or Python loop over conditions.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.dropna(subset=["condition", "symptoms"])
+        names: List[str] = []
+        descriptions: List[str] = []
+        symptom_sets: List[List[str]] = []
+        row_of: Dict[str, int] = {}
+        for condition, symptoms, description in zip(
+            df["condition"].astype(str).str.strip(),
+            df["symptoms"].astype(str),
+            df.get("description", pd.Series([""] * len(df), index=df.index)).fillna("").astype(str),
+        ):
+            idx = row_of.get(condition.lower())
+            if idx is None:  # repeated conditions are merged
+                idx = row_of[condition.lower()] = len(names)
+                names.append(condition)
+                descriptions.append(description.strip())
+                symptom_sets.append([])
+            for symptom in symptoms.split(","):
+                symptom = " ".join(symptom.lower().split())
+                if symptom and symptom not in symptom_sets[idx]:
+                    symptom_sets[idx].append(symptom)
+
+        self.names = names
+        self.descriptions = descriptions
+        self.symptoms: List[str] = sorted({s for ss in symptom_sets for s in ss})
+        symptom_id = {s: i for i, s in enumerate(self.symptoms)}
+
+        # folded phrase -> symptom id, for the canonical names and their synonyms
+        self.phrases: Dict[Tuple[str, ...], int] = {fold(s): i for s, i in symptom_id.items()}
+        for alias, canonical in SYMPTOM_SYNONYMS.items():
+            if canonical in symptom_id:
+                self.phrases.setdefault(fold(alias), symptom_id[canonical])
+        self.max_phrase = max((len(p) for p in self.phrases), default=0)
+
+        postings: List[List[int]] = [[] for _ in self.symptoms]
+        for row, ss in enumerate(symptom_sets):
+            for s in ss:
+                postings[symptom_id[s]].append(row)
+        self.postings = [np.asarray(p, dtype=np.int32) for p in postings]
+        self.sizes = np.asarray([len(ss) for ss in symptom_sets], dtype=np.float32)
+        self.condition_symptoms = [np.asarray([symptom_id[s] for s in ss], dtype=np.int32) for ss in symptom_sets]
+
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # ---- Query parsing ----
+    def resolve(self, symptoms: Iterable[str]) -> List[int]:
+        """Symptom ids for explicit symptom strings (unknown ones are ignored)."""
+        ids = []
+        for symptom in symptoms:
+            sid = self.phrases.get(fold(symptom))
+            if sid is not None and sid not in ids:
+                ids.append(sid)
+        return ids
+
+    def extract(self, text: str) -> List[int]:
+        """Symptom ids mentioned in free text, longest phrase first, no overlaps."""
+        words = fold(text)
+        ids: List[int] = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_phrase, len(words) - i), 0, -1):
+                sid = self.phrases.get(words[i:i + n])
+                if sid is not None:
+                    if sid not in ids:
+                        ids.append(sid)
+                    i += n
+                    break
+            else:
+                i += 1
+        return ids
+
+    # ---- Ranking ----
+    def rank(self, symptom_ids: List[int], limit: int = 5) -> List[dict]:
+        """Conditions by number of shared symptoms, then by share of their symptoms matched."""
+        with self._lock:
+            self.stats["lookups"] += 1
+        if not symptom_ids or limit <= 0:
+            return []
+        counts = np.bincount(np.concatenate([self.postings[s] for s in symptom_ids]), minlength=len(self.names))
+        rows = np.flatnonzero(counts)
+        overlap = counts[rows]
+        coverage = overlap / self.sizes[rows]
+        key = overlap + 0.5 * coverage  # overlap first, coverage breaks ties
+        if len(rows) > limit:
+            top = np.argpartition(-key, limit - 1)[:limit]
+            rows, overlap, coverage, key = rows[top], overlap[top], coverage[top], key[top]
+        order = np.argsort(-key, kind="stable")
+        query = np.asarray(symptom_ids, dtype=np.int32)
+        results = []
+        for i in order:
+            row = int(rows[i])
+            matched = self.condition_symptoms[row][np.isin(self.condition_symptoms[row], query)]
+            results.append({
+                "condition": self.names[row],
+                "description": self.descriptions[row],
+                "matched_symptoms": [self.symptoms[s] for s in matched],
+                "score": round(float(coverage[i]), 4),
+            })
+        return results
+
+    def lookup(self, symptoms: Iterable[str] = (), text: Optional[str] = None, limit: int = 5) -> Tuple[List[str], List[dict]]:
+        ids = self.resolve(symptoms)
+        for sid in self.extract(text or ""):
+            if sid not in ids:
+                ids.append(sid)
+        return [self.symptoms[s] for s in ids], self.rank(ids, limit)
+
+    # ---- /chat ----
+    def chat_reply(self, query: str) -> Optional[str]:
+        """English reply when the message names enough symptoms, else None."""
+        ids = self.extract(query)
+        if len(ids) < CONDITIONS_CHAT_MIN_SYMPTOMS:
+            return None
+        ranked = self.rank(ids, CONDITIONS_CHAT_LIMIT)
+        listed = "; ".join(f"{r['condition']} ({', '.join(r['matched_symptoms'])})" for r in ranked)
+        return (
+            f"These symptoms are commonly associated with: {listed}. "
+            "This is not a diagnosis — please consult a doctor if symptoms persist or worsen."
+        )
+
+
+def load_conditions_frame(path: str = CONDITIONS_PATH) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["condition", "symptoms", "description"])
+    return pd.read_csv(path)
+
+
+_index = ConditionIndex(pd.DataFrame(columns=["condition", "symptoms", "description"]))
+
+
+def build_conditions(path: str = CONDITIONS_PATH) -> ConditionIndex:
+    global _index
+    _index = ConditionIndex(load_conditions_frame(path))
+    print(f"✅ Condition index built: {len(_index)} conditions, {len(_index.symptoms)} symptoms.")
+    return _index
+
+
+def get_conditions() -> ConditionIndex:
+    return _index
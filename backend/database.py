@@ -1,15 +1,132 @@
-from sqlalchemy import create_engine
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-# ✅ Path to your SQLite DB
-DATABASE_URL = r"sqlite:///C:\Users\riyap\Desktop\chatbot\Nexus_Health\backend\chatbot.db"
+load_dotenv()
+
+# ----------------- Config -----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ✅ Path to your DB (any SQLAlchemy URL); defaults to backend/chatbot.db
+DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.join(BASE_DIR, 'chatbot.db')}"
+# ✅ Optional replica for /history and KB reads; defaults to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or DATABASE_URL
+
+# ✅ "tuned" (WAL + pragmas + sized pools) or "default" (driver defaults)
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned").strip().lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a pooled connection
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 10))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", 20))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # bytes
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB, so ~64 MB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+
+# ✅ Async mode: /chat, /history, /register and /login use an AsyncEngine
+DB_ASYNC_MODE = os.getenv("DB_ASYNC_MODE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def to_async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db (other drivers must be given explicitly)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL") or to_async_url(DATABASE_READ_URL)
+
+
+# ----------------- Engine Profiles -----------------
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """PRAGMAs run on every new connection of the tuned SQLite profile."""
+    pragmas = [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def engine_options(url: str, profile: str = DB_PROFILE, read_only: bool = False) -> dict:
+    """create_engine keyword arguments for ``url`` under ``profile``."""
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options  # single shared connection, pool settings don't apply
+    if profile == "tuned":
+        options.update(
+            pool_size=DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE,
+            max_overflow=DB_READ_MAX_OVERFLOW if read_only else DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=url.get_backend_name() != "sqlite",
+        )
+    return options
+
+
+def install_pragmas(engine, profile: str = DB_PROFILE, read_only: bool = False):
+    """Run the profile's SQLite PRAGMAs on every new DBAPI connection."""
+    if engine.dialect.name != "sqlite" or profile != "tuned":
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, read_only: bool = False):
+    engine = create_engine(url, **engine_options(url, profile, read_only))
+    install_pragmas(engine, profile, read_only)
+    return engine
+
+
 # ----------------- Engine -----------------
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine(DATABASE_URL)
+# Separate pool for /history and KB reads; query_only on SQLite, so it can never write
+read_engine = make_engine(DATABASE_READ_URL, read_only=True)
 
 # ----------------- Session -----------------
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# ----------------- Async Engine / Session -----------------
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DB_ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    def make_async_engine(url: str, profile: str = DB_PROFILE, read_only: bool = False):
+        async_eng = create_async_engine(url, **engine_options(url, profile, read_only))
+        install_pragmas(async_eng.sync_engine, profile, read_only)
+        return async_eng
+
+    async_engine = make_async_engine(ASYNC_DATABASE_URL)
+    async_read_engine = make_async_engine(ASYNC_DATABASE_READ_URL, read_only=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
 
 # ----------------- Base -----------------
 Base = declarative_base()
@@ -18,6 +135,12 @@ Base = declarative_base()
 def init_db():
     import backend.models  # ensure models are imported
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if not backend.models.install_medical_qna_triggers(conn):
+            print(
+                f"⚠️ No medical_qna change-log triggers for {engine.dialect.name}: edits made outside the loaders "
+                "will not move the KB version, so the index is rebuilt and cached replies expire on a timer instead."
+            )
 
 # ----------------- Dependency for FastAPI -----------------
 def get_db():
@@ -26,3 +149,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,339 @@
+"""
+Dense-vector matcher (``MATCHER_ENGINE=embedding``). Questions are embedded
+offline into L2-normalized float32 vectors, either by signed feature
+hashing of words, word pairs and in-word character n-grams (no model, no
+network) or by a local sentence-transformers model (``EMBEDDING_MODEL``).
+Small knowledge bases are scored exactly with one mat-vec; large ones go
+through an inverted-file (IVF) index: rows are clustered around k-means
+centroids and a query scores only the ``IVF_PROBES`` closest clusters,
+trading recall for latency.
+"""
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backend import snapshot_file
+from backend.intents import STOPWORDS
+from backend.matcher import normalize
+
+# ----------------- Config -----------------
+load_dotenv()
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 256))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "").strip()  # sentence-transformers model directory; empty = hashed n-grams
+EMBEDDING_MIN_SCORE = float(os.getenv("EMBEDDING_MIN_SCORE", 0.4))  # cosine similarity
+EMBEDDING_INTENT_MIN_SCORE = float(os.getenv("EMBEDDING_INTENT_MIN_SCORE", 0.6))  # intents.json patterns
+EMBEDDING_ANN_MIN_ROWS = int(os.getenv("EMBEDDING_ANN_MIN_ROWS", 20000))  # exact scan below this many questions
+IVF_LISTS = int(os.getenv("IVF_LISTS", 0))  # clusters; 0 = sqrt(rows)
+IVF_PROBES = int(os.getenv("IVF_PROBES", 32))  # clusters scored per query: more = better recall, slower
+IVF_TRAIN_PER_LIST = 40  # k-means sample size per cluster
+IVF_ITERATIONS = 8
+IVF_SEED = 20240601
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+WORD_WEIGHT = 1.0
+PAIR_WEIGHT = 0.5
+GRAM_WEIGHT = 0.35
+GRAM_SIZES = (3, 4)
+
+
+# ----------------- Embedders -----------------
+def _slot(feature: str, dim: int) -> Tuple[int, float]:
+    """Bucket and sign of a feature; crc32 so every process agrees."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+@lru_cache(maxsize=1 << 17)
+def _word_slots(word: str, dim: int) -> Tuple[Tuple[int, float], ...]:
+    padded = f"<{word}>"
+    slots = [(col, sign * WORD_WEIGHT) for col, sign in (_slot("w:" + word, dim),)]
+    for n in GRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            col, sign = _slot("g:" + padded[i:i + n], dim)
+            slots.append((col, sign * GRAM_WEIGHT))
+    return tuple(slots)
+
+
+class HashedEmbedder:
+    """
+    Signed feature hashing into ``dim`` buckets. Character n-grams make
+    "sprained" close to "sprain" and survive typos; stopwords are dropped
+    so "what is" does not dominate short questions.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashed:{dim}"
+
+    def embed(self, texts: Iterable[str], chunk_size: int = 8192) -> np.ndarray:
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            cells, values = [], []
+            for row, text in enumerate(chunk):
+                base = row * self.dim
+                words = TOKEN_RE.findall(normalize(text))
+                words = [w for w in words if w not in STOPWORDS] or words
+                for word in words:
+                    for col, value in _word_slots(word, self.dim):
+                        cells.append(base + col)
+                        values.append(value)
+                for a, b in zip(words, words[1:]):
+                    col, sign = _slot(f"p:{a} {b}", self.dim)
+                    cells.append(base + col)
+                    values.append(sign * PAIR_WEIGHT)
+            summed = np.bincount(cells, weights=values, minlength=len(chunk) * self.dim)
+            vectors[start:start + len(chunk)] = summed.reshape(len(chunk), self.dim)
+        return _normalized(vectors)
+
+
+class ModelEmbedder:
+    """A sentence-transformers model loaded from a local directory; nothing is downloaded."""
+
+    def __init__(self, path: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except Exception:
+            raise RuntimeError("❌ sentence-transformers is required for EMBEDDING_MODEL")
+        self.model = SentenceTransformer(path, device="cpu", local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"model:{path}"
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=256, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+_embedders: Dict[str, object] = {}
+
+
+def get_embedder(name: Optional[str] = None):
+    """Embedder by name (``hashed:<dim>`` | ``model:<path>``); default from the environment."""
+    if name is None:
+        name = f"model:{EMBEDDING_MODEL}" if EMBEDDING_MODEL else f"hashed:{EMBEDDING_DIM}"
+    if name not in _embedders:
+        kind, _, arg = name.partition(":")
+        _embedders[name] = ModelEmbedder(arg) if kind == "model" else HashedEmbedder(int(arg))
+    return _embedders[name]
+
+
+# ----------------- IVF -----------------
+class IVFIndex:
+    """
+    Spherical k-means clusters over the row vectors. The owning index keeps
+    its rows sorted by cluster, so cluster ``c`` is the contiguous slice
+    ``offsets[c]:offsets[c + 1]`` and a probe is a plain mat-vec on a view,
+    with no gather. Lists are the same on every build of the same rows.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+
+    @property
+    def lists(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def train(vectors: np.ndarray, lists: int = IVF_LISTS, chunk_size: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+        """(centroids, cluster of every row)."""
+        n = len(vectors)
+        if lists <= 0:
+            lists = int(round(np.sqrt(n)))
+        lists = max(1, min(lists, n))
+        rng = np.random.default_rng(IVF_SEED)
+        sample = vectors[np.sort(rng.choice(n, min(n, lists * IVF_TRAIN_PER_LIST), replace=False))]
+        centroids = sample[:lists].copy()
+        for _ in range(IVF_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            present, starts = np.unique(assign[order], return_index=True)
+            centroids[present] = np.add.reduceat(sample[order], starts, axis=0)  # empty clusters keep their centroid
+            centroids = _normalized(centroids)
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            assign[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        return centroids, assign
+
+    def probe(self, vector: np.ndarray, probes: int = IVF_PROBES) -> List[Tuple[int, int]]:
+        """(start, end) row ranges of the ``probes`` clusters closest to ``vector``."""
+        scores = self.centroids @ vector
+        if probes < len(scores):
+            nearest = np.argpartition(-scores, probes - 1)[:probes]
+        else:
+            nearest = np.arange(len(scores))
+        return [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in np.sort(nearest)]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids, "offsets": self.offsets}
+
+
+# ----------------- Embedding Index -----------------
+class EmbeddingIndex:
+    """
+    Nearest question by cosine similarity, with the same interface as the
+    difflib and sparse engines. With an IVF index the rows are stored in
+    cluster order (``pos_by_id`` and tombstones follow that order).
+    ``exact_top_k`` always scans every row and is the reference the IVF
+    recall is measured against.
+    """
+
+    def __init__(
+        self, rows: Iterable[Tuple[int, str, str]] = (), min_score: float = EMBEDDING_MIN_SCORE,
+        embedder=None, lists: int = IVF_LISTS, probes: int = IVF_PROBES, vectors: Optional[np.ndarray] = None,
+    ):
+        """``vectors``, one per row from ``embedder``, skips embedding the questions again."""
+        self.embedder = embedder or get_embedder()
+        self.min_score = min_score
+        self.probes = probes
+        rows = list(rows)
+        if vectors is None:
+            vectors = self.embedder.embed([question for _, question, _ in rows])
+        self.ivf = None
+        if len(rows) >= EMBEDDING_ANN_MIN_ROWS:
+            centroids, assign = IVFIndex.train(vectors, lists)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64)
+            self.ivf = IVFIndex(centroids, offsets)
+            rows = [rows[i] for i in order]
+            vectors = vectors[order]
+        self.vectors = vectors
+        self.ids: List[int] = [row_id for row_id, _, _ in rows]
+        self.questions: List[str] = [question for _, question, _ in rows]
+        self.answers: List[str] = [answer for _, _, answer in rows]
+        self.pos_by_id: Dict[int, int] = {row_id: pos for pos, row_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---- Query ----
+    def _ranked(
+        self, vector: np.ndarray, k: int, min_score: float, dead: Collection[int], exact: bool = False
+    ) -> List[Tuple[int, float]]:
+        """Up to ``k`` (position, score) pairs, best first; lower positions win ties."""
+        if self.ivf is None or exact:
+            positions = np.arange(len(self.ids))
+            scores = self.vectors @ vector
+        else:
+            ranges = self.ivf.probe(vector, self.probes)
+            positions = np.concatenate([np.arange(start, end) for start, end in ranges])
+            scores = np.concatenate([self.vectors[start:end] @ vector for start, end in ranges])
+        if dead:
+            scores = np.where(np.isin(positions, list(dead)), -np.inf, scores)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.lexsort((positions[top], -scores[top]))]
+        return [(int(positions[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def top_k(
+        self, query: str, k: int = 5, min_score: Optional[float] = None, dead: Collection[int] = ()
+    ) -> List[Tuple[int, str, float]]:
+        """Up to ``k`` (row id, question, score) candidates, best first, skipping ``dead`` positions."""
+        min_score = self.min_score if min_score is None else min_score
+        if not self.ids:
+            return []
+        vector = self.embedder.embed([query])[0]
+        return [(self.ids[pos], self.questions[pos], score) for pos, score in self._ranked(vector, k, min_score, dead)]
+
+    def exact_top_k(self, query: str, k: int = 5) -> List[Tuple[int, str, float]]:
+        """``top_k`` by a full scan, ignoring ``min_score``."""
+        if not self.ids:
+            return []
+        vector = self.embedder.embed([query])[0]
+        ranked = self._ranked(vector, k, -1.0, (), exact=True)
+        return [(self.ids[pos], self.questions[pos], score) for pos, score in ranked]
+
+    def match(self, query: str, min_score: Optional[float] = None) -> Optional[Tuple[int, str]]:
+        """(row id, answer) of the closest question, or None below ``min_score``."""
+        ranked = self.top_k(query, 1, min_score)
+        if not ranked:
+            return None
+        return ranked[0][0], self.answer_for(ranked[0][0])
+
+    def match_many(
+        self, queries: List[str], min_score: Optional[float] = None, chunk_size: int = 256
+    ) -> List[Optional[Tuple[int, str]]]:
+        """
+        ``match`` for a batch: one embedding call, and when scanning exactly
+        one mat-mat product per ``chunk_size`` queries, so the (questions x
+        queries) score matrix stays bounded however large the batch.
+        """
+        min_score = self.min_score if min_score is None else min_score
+        if not self.ids or not queries:
+            return [None] * len(queries)
+        vectors = self.embedder.embed(queries)
+        if self.ivf is not None:
+            best = [self._ranked(v, 1, min_score, ()) for v in vectors]
+            return [(self.ids[r[0][0]], self.answers[r[0][0]]) if r else None for r in best]
+        results: List[Optional[Tuple[int, str]]] = []
+        for start in range(0, len(vectors), chunk_size):
+            scores = self.vectors @ vectors[start:start + chunk_size].T
+            positions = scores.argmax(axis=0)
+            best_scores = scores[positions, np.arange(len(positions))]
+            results.extend(
+                (self.ids[pos], self.answers[pos]) if score >= min_score else None
+                for pos, score in zip(positions, best_scores)
+            )
+        return results
+
+    def answer(self, query: str, min_score: Optional[float] = None) -> Optional[str]:
+        match = self.match(query, min_score)
+        return match[1] if match else None
+
+    def answer_for(self, row_id: int) -> str:
+        return self.answers[self.pos_by_id[row_id]]
+
+    # ---- Snapshot File ----
+    def to_arrays(self) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """(meta, arrays) for ``snapshot_file.write_snapshot``; vectors and clusters are stored as built."""
+        arrays = snapshot_file.position_arrays(self.ids)
+        for name in ("questions", "answers"):
+            arrays[f"{name}.blob"], arrays[f"{name}.offsets"] = snapshot_file.pack_strings(getattr(self, name))
+        arrays["vectors"] = self.vectors
+        if self.ivf is not None:
+            arrays.update(snapshot_file.prefixed("ivf", self.ivf.to_arrays()))
+        return {"embedder": self.embedder.name, "min_score": self.min_score}, arrays
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: Dict[str, np.ndarray]) -> "EmbeddingIndex":
+        """An index over mapped arrays, embedding queries with the embedder the file was built with."""
+        index = cls.__new__(cls)
+        index.embedder = get_embedder(meta["embedder"])
+        index.min_score = meta["min_score"]
+        index.probes = IVF_PROBES
+        index.ids = snapshot_file.IntColumn(arrays["ids"])
+        index.questions, index.answers = (
+            snapshot_file.StringColumn(arrays[f"{name}.blob"], arrays[f"{name}.offsets"])
+            for name in ("questions", "answers")
+        )
+        index.pos_by_id = snapshot_file.PositionMap(arrays["sorted_ids"], arrays["sorted_pos"])
+        index.vectors = arrays["vectors"]
+        index.ivf = IVFIndex(arrays["ivf.centroids"], arrays["ivf.offsets"]) if "ivf.centroids" in arrays else None
+        return index
+
+
+def recall_at_k(index: EmbeddingIndex, queries: List[str], k: int = 5) -> float:
+    """Share of the exact top-``k`` rows that the IVF lookup also returns."""
+    found = total = 0
+    for query in queries:
+        exact = {row_id for row_id, _, _ in index.exact_top_k(query, k)}
+        approx = {row_id for row_id, _, _ in index.top_k(query, k, min_score=-1.0)}
+        found += len(exact & approx)
+        total += len(exact)
+    return found / total if total else 1.0
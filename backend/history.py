@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from backend.models import ChatHistory
+
+# ----------------- Config -----------------
+load_dotenv()
+
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "0").strip().lower() in ("1", "true", "yes")
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", 10000))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 500))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 0.5))  # seconds
+HISTORY_PUT_TIMEOUT = float(os.getenv("HISTORY_PUT_TIMEOUT", 2.0))  # seconds a request waits for room
+
+
+# ----------------- Write-behind Queue -----------------
+class HistoryWriter:
+    """
+    Bounded in-process buffer of ChatHistory rows, flushed by a background
+    thread as multi-row inserts once ``batch_size`` rows are waiting or
+    ``flush_interval`` has passed.
+
+    When the buffer is full, ``add`` waits up to ``put_timeout`` for the
+    flusher and then flushes on the caller's thread, so producers slow down
+    instead of rows being dropped. Rows stay visible through ``pending_for``
+    until their batch is committed; ``drain`` lets a reader commit a user's
+    rows first, so every row it pages through has a real id.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        maxsize: int = HISTORY_QUEUE_SIZE,
+        batch_size: int = HISTORY_BATCH_SIZE,
+        flush_interval: float = HISTORY_FLUSH_INTERVAL,
+        put_timeout: float = HISTORY_PUT_TIMEOUT,
+    ):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue: deque = deque()
+        self._inflight: List[dict] = []
+        self._cond = threading.Condition()
+        self._commit_lock = threading.Lock()  # readers vs. "committed but not yet dropped from buffer"
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.backpressure_waits = 0
+
+    # ---- Lifecycle ----
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        print("✅ Chat history write-behind enabled.")
+
+    def close(self):
+        """Stop the flusher and write out everything still buffered."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        print(f"✅ Chat history writer stopped ({self.flushed_rows} rows in {self.flushes} flushes).")
+
+    # ---- Producer ----
+    def add(self, rows: List[dict]):
+        """Queue rows (user_id, sender, message) in order; blocks while full."""
+        with self._cond:
+            deadline = time.monotonic() + self.put_timeout
+            while len(self._queue) + len(rows) > self.maxsize and not self._stopping:
+                self.backpressure_waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            full = len(self._queue) + len(rows) > self.maxsize
+            self._queue.extend(rows)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        if full or self._thread is None:
+            self.flush()
+
+    def try_add(self, rows: List[dict]) -> bool:
+        """Queue rows only if there is room right now (for the event loop)."""
+        with self._cond:
+            if self._thread is None or len(self._queue) + len(rows) > self.maxsize:
+                return False
+            self._queue.extend(rows)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    # ---- Reader support ----
+    def pending_for(self, user_id: int) -> List[dict]:
+        with self._cond:
+            return [r for r in list(self._inflight) + list(self._queue) if r["user_id"] == user_id]
+
+    def pending_rows(self) -> int:
+        return len(self._queue) + len(self._inflight)
+
+    def drain(self, user_id: int, timeout: Optional[float] = None) -> bool:
+        """
+        Commit every buffered row of ``user_id`` (flushing on the caller's
+        thread if needed). False if the flush failed or ``timeout`` passed.
+        """
+        deadline = time.monotonic() + (self.put_timeout if timeout is None else timeout)
+        with self._cond:
+            buffered = list(self._inflight) + list(self._queue)
+            last = max((i for i, r in enumerate(buffered) if r["user_id"] == user_id), default=-1)
+            target = self.flushed_rows + last + 1  # batches commit in queue order
+        while True:
+            self.flush(until=target)
+            with self._cond:
+                if self.flushed_rows >= target:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                # another thread's batch is committing, or the flush failed: wait and retry
+                self._cond.wait(min(remaining, self.flush_interval))
+
+    def visibility(self):
+        """Hold while reading the table and ``pending_for`` to see every row exactly once."""
+        return self._commit_lock
+
+    # ---- Flusher ----
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def flush(self, until: Optional[int] = None):
+        """Commit buffered rows in batches; stop once ``flushed_rows`` reaches ``until``."""
+        while True:
+            with self._cond:
+                if until is not None and self.flushed_rows >= until:
+                    return
+                if self._inflight:
+                    return  # another thread is flushing
+                count = min(len(self._queue), self.batch_size)
+                if not count:
+                    return
+                self._inflight = [self._queue.popleft() for _ in range(count)]
+                batch = self._inflight
+                self._cond.notify_all()  # room for blocked producers
+
+            db = self.session_factory()
+            try:
+                db.execute(ChatHistory.__table__.insert(), batch)
+                with self._commit_lock:
+                    db.commit()
+                    with self._cond:
+                        self._inflight = []
+                        self.flushed_rows += len(batch)
+                        self.flushes += 1
+                        self._cond.notify_all()  # wake readers waiting in drain
+            except Exception as e:
+                db.rollback()
+                with self._cond:
+                    # put the batch back in front and retry on the next cycle
+                    self._queue.extendleft(reversed(batch))
+                    self._inflight = []
+                print(f"❌ Chat history flush failed: {e}")
+                return
+            finally:
+                db.close()
+
+
+history_writer: Optional[HistoryWriter] = None
+
+
+def start_history_writer(session_factory: Callable[[], Session]) -> Optional[HistoryWriter]:
+    global history_writer
+    if HISTORY_WRITE_BEHIND and history_writer is None:
+        history_writer = HistoryWriter(session_factory)
+        history_writer.start()
+    return history_writer
+
+
+def stop_history_writer():
+    global history_writer
+    if history_writer is not None:
+        history_writer.close()
+        history_writer = None
+
+
+# ----------------- Pagination -----------------
+def history_page(stored: list, pending: List[dict], limit: int) -> Tuple[List[dict], Optional[int]]:
+    """
+    Merge a keyset page (``limit + 1`` rows, newest first) with unflushed
+    rows into (oldest-first items, next_before_id).
+    """
+    has_more = len(stored) > limit
+    rows = [{"id": r.id, "sender": r.sender, "message": r.message} for r in reversed(stored[:limit])]
+    rows += [{"id": None, "sender": r["sender"], "message": r["message"]} for r in pending]
+    has_more = has_more or len(rows) > limit
+    rows = rows[-limit:]
+    oldest = next((r["id"] for r in rows if r["id"] is not None), None)
+    if oldest is None and stored:
+        # page was all buffered rows: continue from the newest stored one
+        oldest = stored[0].id + 1
+    return rows, oldest if has_more else None
@@ -0,0 +1,138 @@
+import hashlib
+import os
+from typing import Callable, Iterator, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from backend.models import KBSourceManifest, MedicalQnA
+
+# ----------------- Config -----------------
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", 5000))
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", 1000))
+
+
+# ----------------- Normalization -----------------
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized clean-up of one chunk: accept ``input/output`` or
+    ``question/answer`` columns, strip whitespace, drop empty rows and
+    duplicates within the chunk.
+    """
+    if {"input", "output"}.issubset(df.columns):
+        df = df.rename(columns={"input": "question", "output": "answer"})
+    elif not {"question", "answer"}.issubset(df.columns):
+        raise ValueError("❌ CSV must contain either 'input/output' or 'question/answer' columns")
+
+    df = df[["question", "answer"]].dropna()
+    df = df.assign(
+        question=df["question"].astype(str).str.strip(),
+        answer=df["answer"].astype(str).str.strip(),
+    )
+    df = df[(df["question"] != "") & (df["answer"] != "")]
+    return df.drop_duplicates(subset="question", keep="first")
+
+
+def read_csv_chunks(csv_path: str, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """Yield (raw row count, normalized chunk) without loading the whole file."""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        yield len(chunk), normalize_frame(chunk)
+
+
+# ----------------- Bulk Insert -----------------
+def insert_ignore_duplicates(db: Session, records: list, table: Table = MedicalQnA.__table__) -> int:
+    """
+    ``INSERT ... ON CONFLICT DO NOTHING`` for a list of question/answer dicts,
+    executed as one executemany. Returns the number of rows actually inserted.
+    """
+    if not records:
+        return 0
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        # no portable upsert: drop questions that already exist, then insert
+        existing = set(
+            db.execute(
+                select(table.c.question).where(table.c.question.in_([r["question"] for r in records]))
+            ).scalars()
+        )
+        records = [r for r in records if r["question"] not in existing]
+        if records:
+            db.execute(table.insert(), records)
+        return len(records)
+
+    stmt = insert(table).on_conflict_do_nothing(index_elements=["question"])
+    return db.execute(stmt, records).rowcount
+
+
+def bulk_load_frame_chunks(
+    db: Session, chunks, batch_size: int = INSERT_BATCH_SIZE, table: Table = MedicalQnA.__table__
+) -> Tuple[int, int]:
+    """Insert normalized (raw row count, chunk) pairs in batches, one transaction per chunk."""
+    inserted_count = 0
+    skipped_count = 0
+    try:
+        for raw_rows, df in chunks:
+            records = df.to_dict("records")
+            chunk_inserted = 0
+            for start in range(0, len(records), batch_size):
+                chunk_inserted += insert_ignore_duplicates(db, records[start:start + batch_size], table)
+            db.commit()
+            inserted_count += chunk_inserted
+            skipped_count += raw_rows - chunk_inserted
+    except Exception:
+        db.rollback()
+        raise
+    return inserted_count, skipped_count
+
+
+def bulk_load_csv(db: Session, csv_path: str, chunk_size: int = CSV_CHUNK_SIZE) -> Tuple[int, int]:
+    """Stream ``csv_path`` into medical_qna; returns (inserted, skipped)."""
+    return bulk_load_frame_chunks(db, read_csv_chunks(csv_path, chunk_size))
+
+
+# ----------------- Source Manifest -----------------
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sync_source(db: Session, path: str, loader: Callable[[Session, str], Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """
+    Run ``loader`` only if ``path`` changed since the last successful load.
+
+    Size and mtime are compared first, so an untouched file costs one
+    ``stat``. If they differ the file is hashed, and a matching hash (file
+    touched or copied, same bytes) only refreshes the manifest. The manifest
+    is written after the loader commits, so a failed load is retried on the
+    next start. Returns the loader's (inserted, skipped), or None if skipped.
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    entry = db.get(KBSourceManifest, key)
+    if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+        print(f"⏭️ {path} unchanged (size/mtime), skipping load.")
+        return None
+
+    sha256 = file_sha256(path)
+    result = None
+    if entry is not None and entry.sha256 == sha256:
+        print(f"⏭️ {path} unchanged (content hash), skipping load.")
+    else:
+        result = loader(db, path)
+
+    if entry is None:
+        entry = KBSourceManifest(path=key)
+        db.add(entry)
+    entry.size = stat.st_size
+    entry.mtime_ns = stat.st_mtime_ns
+    entry.sha256 = sha256
+    db.commit()
+    return result
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# ----------------- File Path -----------------
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intents.json")
+
+# Words that carry no topic: "how do i treat cuts" and "how to treat cuts?" share the key {treat, cuts}
+STOPWORDS = frozenset(
+    "a an the i me my you your is are am was be do does did to of in on for at by with and or "
+    "if what which how when why who whats can could should would will it this that there any "
+    "please about get have has".split()
+)
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN.findall(text.lower()))
+
+
+def content_key(words: Tuple[str, ...]) -> FrozenSet[str]:
+    return frozenset(w for w in words if w not in STOPWORDS)
+
+
+# ----------------- Engine -----------------
+class IntentsEngine:
+    """
+    All intents.json patterns compiled into two hash tables: the exact token
+    sequence, and the set of content words (stopwords dropped, order
+    ignored). ``match`` answers only an exact token sequence and runs before
+    the QnA matcher; ``match_content`` is looser ("what is fever?" hits the
+    "Fever" pattern), so it is tried only after a QnA miss. Either is a
+    dict probe.
+
+    With ``semantic`` (the embedding matcher engine) the patterns are also
+    embedded for ``match_nearest``: the intent of the closest pattern above
+    ``EMBEDDING_INTENT_MIN_SCORE``, tried only after a QnA miss and the
+    conditions tier so a list of symptoms is not answered with one symptom's
+    intent.
+    """
+
+    def __init__(self, intents: List[dict], semantic: bool = False):
+        self.tags: List[str] = []
+        self.responses: List[str] = []
+        self.exact: Dict[Tuple[str, ...], int] = {}
+        self.by_content: Dict[FrozenSet[str], int] = {}
+        self.patterns: List[Tuple[str, int]] = []  # (pattern, intent)
+        self.collisions = 0
+        for intent in intents:
+            if not intent.get("responses"):
+                continue
+            idx = len(self.tags)
+            self.tags.append(intent.get("tag", ""))
+            self.responses.append(intent["responses"][0])  # deterministic, like load_data
+            for pattern in intent.get("patterns", []):
+                words = tokens(pattern)
+                if not words:
+                    continue
+                self.patterns.append((pattern, idx))
+                self.exact.setdefault(words, idx)
+                key = content_key(words)
+                if not key:
+                    continue  # "how are you": exact only
+                if self.by_content.setdefault(key, idx) != idx:
+                    self.collisions += 1  # first intent keeps the key
+        self.nearest = None
+        if semantic and self.patterns:
+            from backend.embedding import EMBEDDING_INTENT_MIN_SCORE, EmbeddingIndex
+            rows = [(n, pattern, self.responses[idx]) for n, (pattern, idx) in enumerate(self.patterns)]
+            self.nearest = EmbeddingIndex(rows, min_score=EMBEDDING_INTENT_MIN_SCORE)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def lookup(self, query: str) -> Optional[int]:
+        """Intent whose pattern has exactly the query's token sequence."""
+        words = tokens(query)
+        return self.exact.get(words) if words else None
+
+    def lookup_content(self, query: str) -> Optional[int]:
+        """Intent whose pattern has the query's content words, in any order."""
+        key = content_key(tokens(query))
+        return self.by_content.get(key) if key else None
+
+    def match(self, query: str) -> Optional[Tuple[str, str]]:
+        """(tag, English response) for an exact pattern, or None."""
+        return self._answer(self.lookup(query), "")
+
+    def match_content(self, query: str) -> Optional[Tuple[str, str]]:
+        """(tag, English response) for a pattern with the same content words, or None."""
+        return self._answer(self.lookup_content(query), "content_")
+
+    def _answer(self, idx: Optional[int], stat: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            self.stats[f"{stat}hits" if idx is not None else f"{stat}misses"] += 1
+        return None if idx is None else (self.tags[idx], self.responses[idx])
+
+    def match_nearest(self, query: str) -> Optional[Tuple[str, str]]:
+        """(tag, English response) of the closest embedded pattern, or None."""
+        if self.nearest is None:
+            return None
+        hit = self.nearest.top_k(query, 1)
+        with self._lock:
+            self.stats["nearest_hits" if hit else "nearest_misses"] += 1
+        if not hit:
+            return None
+        idx = self.patterns[hit[0][0]][1]
+        return self.tags[idx], self.responses[idx]
+
+
+def load_intents(path: str = INTENTS_PATH) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("intents", [])
+
+
+_engine = IntentsEngine([])
+
+
+def build_intents(path: str = INTENTS_PATH, semantic: Optional[bool] = None) -> IntentsEngine:
+    global _engine
+    if semantic is None:
+        from backend.matcher import MATCHER_ENGINE
+        semantic = MATCHER_ENGINE == "embedding"
+    _engine = IntentsEngine(load_intents(path), semantic)
+    print(f"✅ Intents engine compiled: {len(_engine.tags)} intents, {len(_engine)} patterns"
+          f"{f', {_engine.collisions} shared keys' if _engine.collisions else ''}"
+          f"{', embedded for nearest-pattern lookup' if _engine.nearest is not None else ''}.")
+    return _engine
+
+
+def get_intents() -> IntentsEngine:
+    return _engine
@@ -0,0 +1,306 @@
+import os
+import threading
+import time
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend import snapshot_file
+from backend.matcher import MATCHER_ENGINE, get_engine, load_rows, normalize
+from backend.models import MedicalQnA, MedicalQnAChange, MedicalQnATranslation, has_medical_qna_triggers
+from backend.translation import atranslate_from_english, translate_from_english, translate_many_from_english
+
+# ----------------- Config -----------------
+load_dotenv()
+
+KB_REFRESH_INTERVAL = float(os.getenv("KB_REFRESH_INTERVAL", 5))  # seconds between version checks
+KB_MAX_SEGMENTS = int(os.getenv("KB_MAX_SEGMENTS", 8))
+KB_MAX_DEAD_RATIO = float(os.getenv("KB_MAX_DEAD_RATIO", 0.2))
+KB_SNAPSHOT_PATH = os.getenv("KB_SNAPSHOT_PATH", "").strip()  # shared mmap snapshot file; empty = per-process build
+# seconds between full rebuilds on a database without change-log triggers (its version only moves on loads)
+KB_UNLOGGED_REBUILD_INTERVAL = float(os.getenv("KB_UNLOGGED_REBUILD_INTERVAL", 300))
+
+
+# ----------------- Version -----------------
+def current_version(db: Session) -> int:
+    """Latest change-log id; one primary-key lookup."""
+    return db.query(func.coalesce(func.max(MedicalQnAChange.id), 0)).scalar()
+
+
+def changes_since(db: Session, version: int) -> List[Tuple[int, Optional[int], str]]:
+    return (
+        db.query(MedicalQnAChange.id, MedicalQnAChange.qna_id, MedicalQnAChange.op)
+        .filter(MedicalQnAChange.id > version)
+        .order_by(MedicalQnAChange.id)
+        .all()
+    )
+
+
+def load_rows_by_id(db: Session, ids: List[int], chunk_size: int = 500) -> List[Tuple[int, str, str]]:
+    rows = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows.extend(
+            db.query(MedicalQnA.id, MedicalQnA.question, MedicalQnA.answer)
+            .filter(MedicalQnA.id.in_(chunk))
+            .all()
+        )
+    return sorted(rows)
+
+
+# ----------------- Snapshot -----------------
+class KBSnapshot:
+    """
+    Immutable view of the knowledge base at one version.
+
+    The match structures are a list of segments (matcher instances): the
+    first is a full build, later ones hold rows changed since. Rows that were
+    updated or deleted are tombstoned in older segments by position. Applying
+    a delta builds one new segment and copies only the segment list and the
+    tombstones, so refresh cost follows the size of the change. Once there
+    are too many segments or tombstones the snapshot is rebuilt from scratch.
+
+    With ``KB_SNAPSHOT_PATH`` set, the full build lives in a file shared by
+    all workers (``snapshot_file``) and ``file`` identifies the copy mapped.
+    """
+
+    def __init__(
+        self, version: int, engine: str, segments: Tuple = (), dead: Tuple[FrozenSet[int], ...] = (),
+        file: Optional[Tuple[int, int]] = None,
+    ):
+        self.version = version
+        self.engine = engine
+        self.segments = segments
+        self.dead = dead or tuple(frozenset() for _ in segments)
+        self.file = file
+        self.size = sum(len(seg) - len(d) for seg, d in zip(self.segments, self.dead))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def dead_count(self) -> int:
+        return sum(len(d) for d in self.dead)
+
+    # ---- Build ----
+    @classmethod
+    def full(cls, db: Session, engine: str = MATCHER_ENGINE) -> "KBSnapshot":
+        if KB_SNAPSHOT_PATH:
+            return cls.shared(db, engine, KB_SNAPSHOT_PATH)
+        version = current_version(db)
+        return cls(version, engine, (get_engine(engine)(load_rows(db)),))
+
+    @classmethod
+    def shared(cls, db: Session, engine: str, path: str) -> "KBSnapshot":
+        """
+        Map the snapshot file at ``path`` and catch up through the change log.
+        The first worker to get here (or any worker finding the file missing,
+        for another engine, ahead of the database or too far behind) builds
+        it; the others wait on the lock and map the result.
+        """
+        with snapshot_file.build_lock(path):
+            mapped = snapshot_file.open_snapshot(path, engine)
+            snapshot = None
+            if mapped is not None and mapped.version <= current_version(db):
+                snapshot = cls.from_file(mapped).catch_up(db)
+            if snapshot is None:
+                built = cls(current_version(db), engine, (get_engine(engine)(load_rows(db)),))
+                meta, arrays = built.segments[0].to_arrays()
+                snapshot_file.write_snapshot(path, built.version, engine, meta, arrays)
+                mapped = snapshot_file.open_snapshot(path, engine)
+                if mapped is None:
+                    print(f"❌ Could not map KB snapshot {path}; serving the in-memory build.")
+                    return built
+                snapshot = cls.from_file(mapped)
+                print(f"✅ KB snapshot file {path} written at version {built.version}.")
+            return snapshot
+
+    @classmethod
+    def from_file(cls, mapped: snapshot_file.MappedSnapshot) -> "KBSnapshot":
+        segment = get_engine(mapped.engine).from_arrays(mapped.meta, mapped.arrays)
+        return cls(mapped.version, mapped.engine, (segment,), file=mapped.inode)
+
+    def apply(self, db: Session, version: int, changed_ids: List[int]) -> "KBSnapshot":
+        """New snapshot with ``changed_ids`` re-read from the database."""
+        changed = set(changed_ids)
+        dead = []
+        for seg, seg_dead in zip(self.segments, self.dead):
+            hit = {seg.pos_by_id[i] for i in changed if i in seg.pos_by_id}
+            dead.append(seg_dead | hit if hit else seg_dead)
+
+        segments = self.segments
+        rows = load_rows_by_id(db, sorted(changed))
+        if rows:
+            segments = segments + (get_engine(self.engine)(rows),)
+            dead.append(frozenset())
+        return KBSnapshot(version, self.engine, segments, tuple(dead), self.file)
+
+    def catch_up(self, db: Session) -> Optional["KBSnapshot"]:
+        """
+        This snapshot brought up to the database's KB version through the
+        change log, or None when only a full rebuild will do: the log was
+        pruned past our version, the table was recreated, or the deltas
+        have grown too many segments or tombstones.
+        """
+        if current_version(db) == self.version:
+            return self
+        changes = changes_since(db, self.version)
+        if not changes or changes[0][0] != self.version + 1 or any(op == "R" for _, _, op in changes):
+            return None
+        # "T" (translations stored) only moves the version, so version-keyed caches drop old replies
+        updated = self.apply(db, changes[-1][0], list({qna_id for _, qna_id, op in changes if op != "T"}))
+        if len(updated.segments) > KB_MAX_SEGMENTS or updated.dead_count > KB_MAX_DEAD_RATIO * max(len(updated), 1):
+            return None
+        return updated
+
+    # ---- Query ----
+    def top_k(self, query: str, k: int = 5) -> List[Tuple[int, str, float]]:
+        """Merge per-segment results; older segments win ties, like row order."""
+        merged = []
+        for seg_no, (seg, seg_dead) in enumerate(zip(self.segments, self.dead)):
+            for rank, (row_id, question, score) in enumerate(seg.top_k(query, k, dead=seg_dead)):
+                merged.append(((score, normalize(question), -seg_no, -rank), row_id, question, score))
+        merged.sort(key=lambda m: m[0], reverse=True)
+        return [(row_id, question, score) for _, row_id, question, score in merged[:k]]
+
+    def match(self, query: str) -> Optional[Tuple[int, str]]:
+        """(row id, answer) of the best live match, or None."""
+        if len(self.segments) == 1 and not self.dead[0]:
+            return self.segments[0].match(query)
+        best = None
+        for seg_no, (seg, seg_dead) in enumerate(zip(self.segments, self.dead)):
+            for row_id, question, score in seg.top_k(query, 1, dead=seg_dead):
+                key = (score, normalize(question), -seg_no)
+                if best is None or key > best[0]:
+                    best = (key, (row_id, seg.answer_for(row_id)))
+        return best[1] if best else None
+
+    def match_many(self, queries: List[str]) -> List[Optional[Tuple[int, str]]]:
+        """``match`` for a batch; engines with a vectorized ``match_many`` score it in one go."""
+        if len(self.segments) == 1 and not self.dead[0] and hasattr(self.segments[0], "match_many"):
+            return self.segments[0].match_many(queries)
+        return [self.match(query) for query in queries]
+
+    def answer(self, query: str) -> Optional[str]:
+        match = self.match(query)
+        return match[1] if match else None
+
+
+# ----------------- Resident Knowledge Base -----------------
+_snapshot = KBSnapshot(0, MATCHER_ENGINE)
+_refresh_lock = threading.Lock()
+_last_check = 0.0
+_last_build = 0.0
+
+
+def build_index(db: Session, engine: str = MATCHER_ENGINE) -> KBSnapshot:
+    """Full rebuild of the process-wide snapshot, swapped in atomically."""
+    global _snapshot, _last_build
+    with _refresh_lock:
+        _snapshot = KBSnapshot.full(db, engine)
+        _last_build = time.monotonic()
+    print(f"✅ QnA match index ({engine}) built with {len(_snapshot)} questions at version {_snapshot.version}.")
+    return _snapshot
+
+
+def get_index() -> KBSnapshot:
+    return _snapshot
+
+
+def refresh_due() -> bool:
+    return time.monotonic() - _last_check >= KB_REFRESH_INTERVAL
+
+
+def refresh_if_due(session_factory: Callable[[], Session]) -> KBSnapshot:
+    """``refresh_index`` on a session of its own, opened only when a check is due."""
+    if not refresh_due():
+        return _snapshot
+    db = session_factory()
+    try:
+        return refresh_index(db)
+    finally:
+        db.close()
+
+
+def refresh_index(db: Session, force: bool = False) -> KBSnapshot:
+    """
+    Bring the snapshot up to the database's KB version.
+
+    Cheap when nothing changed (one MAX(id) query, at most every
+    ``KB_REFRESH_INTERVAL`` seconds). Only one thread refreshes at a time;
+    others keep serving the current snapshot instead of waiting. A shared
+    snapshot file replaced by another worker is picked up here as well.
+    Without change-log triggers, direct edits never move the version, so
+    the snapshot is also rebuilt in memory every
+    ``KB_UNLOGGED_REBUILD_INTERVAL`` seconds.
+    """
+    global _snapshot, _last_check, _last_build
+    now = time.monotonic()
+    if not force and now - _last_check < KB_REFRESH_INTERVAL:
+        return _snapshot
+    if not _refresh_lock.acquire(blocking=force):
+        return _snapshot
+    try:
+        _last_check = now
+        snapshot = _snapshot
+        if not has_medical_qna_triggers(db.get_bind().dialect.name) and now - _last_build >= KB_UNLOGGED_REBUILD_INTERVAL:
+            # the shared file could be mapped back unchanged at the same version, so build our own
+            updated = KBSnapshot(current_version(db), snapshot.engine, (get_engine(snapshot.engine)(load_rows(db)),))
+            _last_build = now
+        elif KB_SNAPSHOT_PATH and snapshot.file != snapshot_file.file_identity(KB_SNAPSHOT_PATH):
+            updated = None  # another worker wrote a new snapshot file
+        else:
+            updated = snapshot.catch_up(db)
+            if updated is snapshot:
+                return snapshot
+        if updated is None:
+            updated = KBSnapshot.full(db, snapshot.engine)
+            _last_build = now
+        _snapshot = updated
+        print(f"🔄 KB index refreshed to version {_snapshot.version} ({len(_snapshot)} questions).")
+        return _snapshot
+    finally:
+        _refresh_lock.release()
+
+
+# ----------------- Answer Translations -----------------
+def localized_answer(db: Session, qna_id: int, answer: str, lang: str) -> str:
+    """Pre-translated answer from medical_qna_translation, else live translation."""
+    if not lang or lang.lower() == "en":
+        return answer
+    stored = (
+        db.query(MedicalQnATranslation.answer)
+        .filter(MedicalQnATranslation.qna_id == qna_id, MedicalQnATranslation.lang == lang.lower())
+        .scalar()
+    )
+    return stored if stored is not None else translate_from_english(answer, lang)
+
+
+def localized_answers(db: Session, matches: List[Tuple[int, str]], lang: str, chunk_size: int = 500) -> List[str]:
+    """``localized_answer`` for many (qna id, answer) pairs: one IN query per chunk, one batch translation."""
+    if not lang or lang.lower() == "en":
+        return [answer for _, answer in matches]
+    ids = sorted({qna_id for qna_id, _ in matches})
+    stored = {}
+    for start in range(0, len(ids), chunk_size):
+        stored.update(
+            db.query(MedicalQnATranslation.qna_id, MedicalQnATranslation.answer)
+            .filter(MedicalQnATranslation.qna_id.in_(ids[start:start + chunk_size]), MedicalQnATranslation.lang == lang.lower())
+            .all()
+        )
+    missing = [answer for qna_id, answer in matches if qna_id not in stored]
+    translated = dict(zip(missing, translate_many_from_english(missing, lang)))
+    return [stored[qna_id] if qna_id in stored else translated[answer] for qna_id, answer in matches]
+
+
+async def alocalized_answer(db, qna_id: int, answer: str, lang: str) -> str:
+    """``localized_answer`` for an AsyncSession."""
+    if not lang or lang.lower() == "en":
+        return answer
+    stored = await db.scalar(
+        select(MedicalQnATranslation.answer)
+        .where(MedicalQnATranslation.qna_id == qna_id, MedicalQnATranslation.lang == lang.lower())
+    )
+    return stored if stored is not None else await atranslate_from_english(answer, lang)
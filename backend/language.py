@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from backend.ranking import tokenize
+
+# ----------------- Config -----------------
+load_dotenv()
+
+LANG_DETECT_THRESHOLD = float(os.getenv("LANG_DETECT_THRESHOLD", 0.75))
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intents.json")
+
+# Seed vocabulary so detection works before the KB is loaded
+ENGLISH_SEED = (
+    "a about after am an and any are as at be been before but by can could did do does doing for from get "
+    "had has have having he her him his how i if in into is it its me my no not of on or our should so "
+    "some than that the their them then there these they this to too up us very was we were what when "
+    "where which while who why will with would you your hi hello thanks thank please yes help pain"
+)
+
+# Unicode blocks with a single obvious language for our users
+SCRIPT_LANGS = {
+    "hi": (0x0900, 0x097F),  # Devanagari
+}
+
+
+class Detection(NamedTuple):
+    lang: Optional[str]   # None when unsure
+    confidence: float
+
+
+def char_trigrams(word: str) -> list:
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# ----------------- English Profile -----------------
+class LanguageProfile:
+    """Word and character-trigram sets of English text from our own KB and intents."""
+
+    def __init__(self, texts: Iterable[str] = ()):
+        self.words = set(ENGLISH_SEED.split())
+        self.trigrams = set()
+        self.add(ENGLISH_SEED.split())
+        self.add(texts)
+
+    def add(self, texts: Iterable[str]):
+        for text in texts:
+            for word in tokenize(text):
+                if word.isascii() and word.isalpha():
+                    self.words.add(word)
+                    self.trigrams.update(char_trigrams(word))
+
+    def score(self, words: list) -> float:
+        """Share of known words and known trigrams, averaged."""
+        if not words:
+            return 0.0
+        known_words = sum(1 for w in words if w in self.words) / len(words)
+        grams = [g for w in words for g in char_trigrams(w)]
+        known_grams = sum(1 for g in grams if g in self.trigrams) / len(grams)
+        return 0.5 * known_words + 0.5 * known_grams
+
+
+def load_intent_patterns(path: str = INTENTS_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        intents = json.load(f).get("intents", [])
+    return [p for intent in intents for p in intent.get("patterns", [])]
+
+
+_profile = LanguageProfile()
+stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def build_profile(texts: Iterable[str]) -> LanguageProfile:
+    """Rebuild the English profile from KB questions plus intents.json patterns."""
+    global _profile
+    profile = LanguageProfile(texts)
+    profile.add(load_intent_patterns())
+    _profile = profile
+    print(f"✅ Language profile built with {len(profile.words)} words.")
+    return profile
+
+
+# ----------------- Detection -----------------
+def detect_language(text: str) -> Detection:
+    """
+    Cheap local guess: Unicode script first, then how English the Latin text
+    looks against the profile. Returns ``lang=None`` when unsure, in which
+    case the caller should ask the translator to auto-detect.
+    """
+    letters = [ch for ch in text if ch.isalpha()]
+    if not letters:
+        return Detection("en", 1.0)  # digits / punctuation only: nothing to translate
+
+    for lang, (lo, hi) in SCRIPT_LANGS.items():
+        share = sum(1 for ch in letters if lo <= ord(ch) <= hi) / len(letters)
+        if share >= 0.5:
+            return Detection(lang, share)
+
+    ascii_share = sum(1 for ch in letters if ch.isascii()) / len(letters)
+    if ascii_share < 0.5:
+        return Detection(None, 0.0)  # another script we have no profile for
+
+    words = [w for w in tokenize(text) if w.isalpha()]
+    confidence = _profile.score([w for w in words if w.isascii()]) * ascii_share ** 2
+    return Detection("en" if confidence >= LANG_DETECT_THRESHOLD else None, confidence)
+
+
+def record_detection(detection: Detection, translated: bool):
+    with _stats_lock:
+        stats[f"detected_{detection.lang or 'unknown'}"] += 1
+        stats["translations_performed" if translated else "translations_skipped"] += 1
@@ -1,53 +1,200 @@
+"""
+Knowledge-base loader.
+
+    python -m backend.load_data [SOURCE ...] [--chunk-size N] [--workers N] [--dry-run]
+
+Sources may be CSV (input/output or question/answer columns), JSONL with
+the same fields, or an ``intents.json`` file (each pattern becomes a
+question answered by the intent's first response). Input is streamed in
+chunks, normalized and de-duplicated on a process pool, and written into a
+staging table that replaces ``medical_qna`` in one transaction, so the live
+table is never empty and memory stays bounded by the chunk size.
+"""
+import argparse
+import json
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
 import pandas as pd
+from sqlalchemy import Column, Integer, MetaData, Table, Text
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine, Base
-from backend.models import MedicalQnA
+
+from backend.database import SessionLocal, init_db
+from backend.ingest import CSV_CHUNK_SIZE, bulk_load_frame_chunks, file_sha256, normalize_frame
+from backend.models import KBSourceManifest, MedicalQnA, MedicalQnAChange, MedicalQnATranslation, install_medical_qna_triggers
 
 # ----------------- File Path -----------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-csv_path = os.path.join(BASE_DIR, "data", "medical_qna.csv")
-
-if not os.path.exists(csv_path):
-    raise FileNotFoundError(f"❌ CSV file not found at {csv_path}")
-
-# ----------------- Reset medical_qna Table -----------------
-print("🔄 Resetting medical_qna table...")
-Base.metadata.drop_all(bind=engine, tables=[MedicalQnA.__table__])
-Base.metadata.create_all(bind=engine, tables=[MedicalQnA.__table__])
-
-# ----------------- Load CSV -----------------
-df = pd.read_csv(csv_path)
-
-print("📌 Available columns in CSV:", df.columns.tolist())
-
-# ✅ Normalize column names
-if "input" in df.columns and "output" in df.columns:
-    df = df.rename(columns={"input": "question", "output": "answer"})
-elif not {"question", "answer"}.issubset(df.columns):
-    raise ValueError("❌ CSV must contain either 'input/output' or 'question/answer' columns")
-
-# ----------------- Insert into DB -----------------
-db: Session = SessionLocal()
-inserted = 0
-
-try:
-    for _, row in df.iterrows():
-        if pd.isna(row["question"]) or pd.isna(row["answer"]):
-            continue  # skip empty rows
-        qna = MedicalQnA(
-            question=str(row["question"]).strip(),
-            answer=str(row["answer"]).strip()
-        )
-        db.add(qna)
-        inserted += 1
+DEFAULT_SOURCE = os.path.join(BASE_DIR, "data", "medical_qna.csv")
+
+STAGING_TABLE = "medical_qna_staging"
+staging_table = Table(
+    STAGING_TABLE,
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("question", Text, unique=True, nullable=False),
+    Column("answer", Text, nullable=False),
+)
+
+
+# ----------------- Readers -----------------
+def read_intents(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    with open(path, encoding="utf-8") as f:
+        intents = json.load(f).get("intents", [])
+    rows = [
+        {"question": pattern, "answer": intent["responses"][0]}
+        for intent in intents
+        if intent.get("responses")
+        for pattern in intent.get("patterns", [])
+    ]
+    for start in range(0, len(rows), chunk_size):
+        yield pd.DataFrame(rows[start:start + chunk_size])
+
+
+def read_source(path: str, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Raw, un-normalized chunks of one source file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif ext == ".json":
+        yield from read_intents(path, chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def normalized_chunks(paths: List[str], chunk_size: int, workers: int) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    (raw row count, normalized chunk) pairs in source order. At most
+    ``2 * workers`` chunks are in flight, which bounds memory.
+    """
+    frames = (frame for path in paths for frame in read_source(path, chunk_size))
+    if workers <= 1:
+        for frame in frames:
+            yield len(frame), normalize_frame(frame)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for frame in frames:
+            pending.append((len(frame), pool.submit(normalize_frame, frame)))
+            if len(pending) >= 2 * workers:
+                raw_rows, future = pending.popleft()
+                yield raw_rows, future.result()
+        while pending:
+            raw_rows, future = pending.popleft()
+            yield raw_rows, future.result()
+
+
+def with_progress(chunks, started: float) -> Iterator[Tuple[int, pd.DataFrame]]:
+    rows = 0
+    for raw_rows, df in chunks:
+        rows += raw_rows
+        print(f"🔄 {rows} rows read ({rows / max(time.perf_counter() - started, 1e-9):.0f} rows/s)...")
+        yield raw_rows, df
+
 
+# ----------------- Staging + Swap -----------------
+def create_staging(db: Session):
+    bind = db.connection()
+    staging_table.drop(bind=bind, checkfirst=True)
+    staging_table.create(bind=bind)
     db.commit()
-    print(f"✅ {inserted} QnA records inserted into database successfully!")
 
-except Exception as e:
-    db.rollback()
-    print(f"❌ Error inserting data: {e}")
 
-finally:
-    db.close()
+def swap_staging(db: Session, paths: List[str]):
+    """
+    Replace medical_qna with the staging table in one transaction.
+
+    Stored translations are carried over to the new row ids when the
+    question and answer are unchanged; every other translation is dropped.
+    Workers see a reset in the change log and rebuild their indexes. Only
+    the manifest rows of ``paths`` are written; other sources keep theirs.
+    """
+    qna = MedicalQnA.__tablename__
+    translations = MedicalQnATranslation.__tablename__
+    same_row = (
+        f"SELECT o.id AS old_id, s.id AS new_id FROM {qna} o "
+        f"JOIN {STAGING_TABLE} s ON s.question = o.question AND s.answer = o.answer"
+    )
+    conn = db.connection()
+    conn.exec_driver_sql(f"DELETE FROM {translations} WHERE qna_id NOT IN (SELECT old_id FROM ({same_row}))")
+    # negate first so the (qna_id, lang) unique constraint never sees a clash mid-update
+    conn.exec_driver_sql(
+        f"UPDATE {translations} SET qna_id = -(SELECT new_id FROM ({same_row}) WHERE old_id = {translations}.qna_id)"
+    )
+    conn.exec_driver_sql(f"UPDATE {translations} SET qna_id = -qna_id")
+
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        # keep medical_qna_translation's foreign key pointing at "medical_qna"
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    conn.exec_driver_sql(f"ALTER TABLE {qna} RENAME TO {qna}_old")
+    conn.exec_driver_sql(f"ALTER TABLE {STAGING_TABLE} RENAME TO {qna}")
+    conn.exec_driver_sql(f"DROP TABLE {qna}_old")
+    if sqlite:
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+    install_medical_qna_triggers(conn)
+
+    db.execute(MedicalQnAChange.__table__.insert().values(qna_id=None, op="R"))
+    # only the loaded sources: the startup CSV's row must survive a load of other files,
+    # or the next start's sync_source would merge the CSV back into the replaced KB
+    for path in paths:
+        stat = os.stat(path)
+        db.merge(KBSourceManifest(
+            path=os.path.abspath(path), size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=file_sha256(path)
+        ))
+    db.commit()
+
+
+# ----------------- Loader -----------------
+def load(paths: List[str], chunk_size: int = CSV_CHUNK_SIZE, workers: int = 1, dry_run: bool = False) -> dict:
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Source file not found at {path}")
+
+    started = time.perf_counter()
+    chunks = with_progress(normalized_chunks(paths, chunk_size, workers), started)
+
+    if dry_run:
+        raw = kept = 0
+        for raw_rows, df in chunks:
+            raw += raw_rows
+            kept += len(df)
+        print(f"🧪 Dry run: {raw} rows read, {kept} valid after per-chunk normalization. Nothing written.")
+        return {"read": raw, "valid": kept, "inserted": 0}
+
+    init_db()
+    db: Session = SessionLocal()
+    try:
+        create_staging(db)
+        inserted, skipped = bulk_load_frame_chunks(db, chunks, table=staging_table)
+        print(f"🔁 Swapping {inserted} rows into {MedicalQnA.__tablename__}...")
+        swap_staging(db, paths)
+    except Exception:
+        db.rollback()
+        staging_table.drop(bind=db.connection(), checkfirst=True)
+        db.commit()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {inserted} QnA records loaded, {skipped} skipped (empty or duplicate) in {elapsed:.1f}s.")
+    return {"read": inserted + skipped, "inserted": inserted, "skipped": skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the medical QnA knowledge base without downtime.")
+    parser.add_argument("sources", nargs="*", default=[DEFAULT_SOURCE], help="CSV, JSONL or intents.json files")
+    parser.add_argument("--chunk-size", type=int, default=CSV_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    parser.add_argument("--dry-run", action="store_true", help="parse and normalize only")
+    args = parser.parse_args()
+    load(args.sources, args.chunk_size, args.workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
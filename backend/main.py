@@ -1,22 +1,45 @@
-from difflib import get_close_matches
+import asyncio
 import os
-import pandas as pd
 import smtplib
 from email.mime.text import MIMEText
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from typing import Optional
+import json
 import secrets
+import time
 
 from fastapi import FastAPI, Depends, HTTPException, Query, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 
-from backend.database import init_db, get_db
-from backend.models import User, ChatHistory, MedicalQnA
+from backend.auth import (
+    HashPoolSaturated, TokenUser, claims_cache, create_user_token, optional_token_user, password_hasher, require_admin,
+    require_token_user, token_user_for,
+)
+from backend.database import (
+    DB_ASYNC_MODE, init_db, get_db, get_read_db, SessionLocal, ReadSessionLocal, engine, read_engine, async_engine, async_read_engine,
+)
+from backend import history
+from backend.models import User, ChatHistory, has_medical_qna_triggers
+from backend.ingest import bulk_load_csv, sync_source
+from backend.conditions import build_conditions, get_conditions
+from backend.intents import build_intents, get_intents
+from backend.kb import KB_UNLOGGED_REBUILD_INTERVAL, build_index, get_index, refresh_if_due
+from backend.metrics import METRICS_ENABLED, MetricsMiddleware, chat_requests, registry, require_metrics_token, timed
+from backend.profiling import PROFILING_ENABLED, SlowRequestMiddleware, router as profiling_router
+from backend.translation import translator
+from backend.language import build_profile, stats as language_stats
+from backend.chat_service import (
+    Guest, history_rows, reply_language, respond, respond_many, understand, understand_many,
+)
+from backend.response_cache import response_cache
+from backend.streaming import router as streaming_router, stream_slots
 from backend.schemas import (
-    RegisterUser, LoginUser, ChatRequest, ChatResponse, ChatHistoryResponse
+    RegisterUser, LoginUser, ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchResponse, ChatHistoryResponse,
+    ConditionLookupRequest, ConditionLookupResponse,
 )
 from dotenv import load_dotenv
 
@@ -26,78 +49,60 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 print("ENV SMTP_USER:", os.getenv("SMTP_USER"))
 print("ENV SMTP_PASS:", os.getenv("SMTP_PASS"))
 
-# ----------------- Security -----------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # ----------------- JWT Config -----------------
 SECRET_KEY = "supersecretkey123"   # ⚠️ use env variable in production
 ALGORITHM = "HS256"
 RESET_TOKEN_EXPIRE_MINUTES = 30
 
-# ----------------- Translation -----------------
-try:
-    from deep_translator import GoogleTranslator
-except Exception:
-    GoogleTranslator = None
-
-
-def translate_to_english(msg: str) -> str:
-    if GoogleTranslator is None:
-        return msg
-    try:
-        return GoogleTranslator(source="auto", target="en").translate(msg)
-    except Exception:
-        return msg
-
-
-def translate_from_english(msg: str, lang_code: str) -> str:
-    if not lang_code or lang_code.lower() == "en" or GoogleTranslator is None:
-        return msg
-    try:
-        return GoogleTranslator(source="en", target=lang_code.lower()).translate(msg)
-    except Exception:
-        return msg
-
+# ----------------- Chat Config -----------------
+CHAT_BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", 5000))
 
 # ----------------- CSV Loader -----------------
-def load_csv_to_db(db: Session):
-    from sqlalchemy.exc import IntegrityError
+KB_CSV_PATH = os.path.join("backend", "data", "medical_qna.csv")
+
 
-    csv_path = os.path.join("backend", "data", "medical_qna.csv")
+def load_csv_to_db(db: Session, csv_path: str = KB_CSV_PATH):
     if not os.path.exists(csv_path):
         print(f"❌ CSV not found at: {csv_path}")
         return
 
-    df = pd.read_csv(csv_path)
-
-    inserted_count = 0
-    skipped_count = 0
+    result = sync_source(db, csv_path, bulk_load_csv)
+    if result is not None:
+        inserted_count, skipped_count = result
+        print(f"✅ CSV load finished. Inserted {inserted_count}, Skipped {skipped_count} (duplicates).")
 
-    for _, row in df.iterrows():
-        question = str(row["input"]).strip()
-        answer = str(row["output"]).strip()
 
-        try:
-            db.add(MedicalQnA(question=question, answer=answer))
-            db.commit()
-            inserted_count += 1
-        except IntegrityError:
-            db.rollback()
-            skipped_count += 1
-
-    print(f"✅ CSV load finished. Inserted {inserted_count}, Skipped {skipped_count} (duplicates).")
+def load_knowledge_base(db: Session, csv_path: str = KB_CSV_PATH):
+    """Everything a worker needs before it can answer /chat."""
+    load_csv_to_db(db, csv_path)
+    snapshot = build_index(db)
+    if not has_medical_qna_triggers(db.get_bind().dialect.name):
+        response_cache.limit_ttl(KB_UNLOGGED_REBUILD_INTERVAL)
+    build_intents()
+    build_conditions()
+    build_profile(q for seg in snapshot.segments for q in seg.questions)
+    return snapshot
 
 
 # ----------------- Lifespan -----------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    started = time.perf_counter()
     init_db()
     db = next(get_db())
     try:
-        load_csv_to_db(db)
+        load_knowledge_base(db)
     finally:
         db.close()
+    history.start_history_writer(SessionLocal)
+    app.state.startup_seconds = time.perf_counter() - started
+    print(f"🚀 Ready to serve in {app.state.startup_seconds:.3f}s")
     yield
+    history.stop_history_writer()
+    password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
 
 
 # ----------------- App -----------------
@@ -117,6 +122,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:  # slow-request ring buffer + /admin/profile sampling profiler
+    app.add_middleware(SlowRequestMiddleware)
+    app.include_router(profiling_router)
+
+
+@app.exception_handler(HashPoolSaturated)
+async def hash_pool_saturated(request, exc: HashPoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # ----------------- Email Helper -----------------
 def send_email(to_email: str, subject: str, body: str):
     smtp_host = os.getenv("SMTP_HOST")
@@ -141,6 +162,11 @@ def send_email(to_email: str, subject: str, body: str):
         print("❌ Email send failed:", e)
 
 
+async def send_email_async(to_email: str, subject: str, body: str):
+    """``send_email`` off the event loop (SMTP is blocking)."""
+    await asyncio.to_thread(send_email, to_email, subject, body)
+
+
 # ----------------- JWT Helpers -----------------
 def create_reset_token(email: str):
     expire = datetime.utcnow() + timedelta(minutes=RESET_TOKEN_EXPIRE_MINUTES)
@@ -171,7 +197,7 @@ def register(user: RegisterUser, db: Session = Depends(get_db)):
     if db.query(User).filter(User.email == email_clean).first():
         raise HTTPException(status_code=400, detail="❌ Email already registered")
 
-    hashed_pw = pwd_context.hash(user.password)
+    hashed_pw = password_hasher.hash(user.password)
     new_user = User(
         username=user.username.strip(),
         email=email_clean,
@@ -198,12 +224,21 @@ def register(user: RegisterUser, db: Session = Depends(get_db)):
 def login(payload: LoginUser, db: Session = Depends(get_db)):
     email_clean = payload.email.strip().lower()
     user = db.query(User).filter(User.email == email_clean).first()
-    if not user or not pwd_context.verify(payload.password, user.password):
+    if not user or not password_hasher.verify(payload.password, user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if password_hasher.needs_update(user.password):
+        # hashed with an older cost factor: upgrade now that we know the password
+        try:
+            user.password = password_hasher.hash(payload.password)
+            db.commit()
+        except HashPoolSaturated:
+            pass  # try again on a later login
     return {
         "user_id": user.id,
         "username": user.username,
         "language": user.language,
+        "access_token": create_user_token(user),
+        "token_type": "bearer",
         "message": "Login successful ✅"
     }
 
@@ -233,7 +268,7 @@ def request_password_reset(
     """
 
     if background_tasks:
-        background_tasks.add_task(send_email, user.email, "Password Reset Request", body)
+        background_tasks.add_task(send_email_async, user.email, "Password Reset Request", body)
     else:
         send_email(user.email, "Password Reset Request", body)
 
@@ -255,7 +290,7 @@ def reset_password_confirm(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed_pw = pwd_context.hash(new_password)
+    hashed_pw = password_hasher.hash(new_password)
     user.password = hashed_pw
     db.commit()
 
@@ -264,66 +299,236 @@ def reset_password_confirm(
 
 # ---- Chat ----
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == request.user).first()
+def chat(
+    request: ChatRequest,
+    db: Session = Depends(get_db),
+    token_user: Optional[TokenUser] = Depends(optional_token_user),
+):
+    user = token_user
+    if user is None and request.user:  # no token: look the user up by name
+        with timed("user_lookup"):
+            user = db.query(User).filter(User.username == request.user).first()
 
     if not user:  # guest fallback
-        class Guest:
-            id = 0
-            username = request.user or "guest"
-            language = request.language or "en"
-        user = Guest()
+        user = Guest(request.user, request.language)
+    chat_requests.inc("registered" if user.id != 0 else "guest")
 
-    if user.id != 0:
+    writer = history.history_writer
+    if user.id != 0 and writer is None:
         db.add(ChatHistory(user_id=user.id, sender="user", message=request.message))
 
-    query_en = translate_to_english(request.message).lower()
-    all_qna = db.query(MedicalQnA).all()
-
-    if all_qna:
-        all_questions = [q.question for q in all_qna]
-        matches = get_close_matches(query_en, [q.lower() for q in all_questions], n=1, cutoff=0.5)
-        if matches:
-            matched_qna = next(q for q in all_qna if q.question.lower() == matches[0])
-            bot_reply = matched_qna.answer
-        else:
-            bot_reply = "Sorry, I don’t have information about that. Please rephrase your question."
-    else:
-        bot_reply = "Knowledge base is empty. Please add QnA data."
+    detected, query_en = understand(request.message)
+    out_lang = reply_language(request.language, detected, user)
+    bot_reply_translated, tier = respond(db, refresh_if_due(ReadSessionLocal), query_en, out_lang)
+
+    with timed("history_write"):
+        if user.id != 0 and writer is not None:
+            writer.add(history_rows(user.id, request.message, bot_reply_translated))
+        elif user.id != 0:
+            db.add(ChatHistory(user_id=user.id, sender="bot", message=bot_reply_translated))
+            db.commit()
 
-    lang_map = {"english": "en", "hindi": "hi"}
-    out_lang = lang_map.get(request.language.strip().lower(), "en") if request.language else (user.language or "en")
-    bot_reply_translated = translate_from_english(bot_reply, out_lang)
+    return {"response": bot_reply_translated, "detected_language": detected.lang, "tier": tier}
 
-    if user.id != 0:
-        db.add(ChatHistory(user_id=user.id, sender="bot", message=bot_reply_translated))
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+def chat_batch(
+    request: ChatBatchRequest,
+    db: Session = Depends(get_db),
+    token_user: Optional[TokenUser] = Depends(optional_token_user),
+):
+    """
+    Many /chat messages in one request: one user lookup, one translation
+    call per language, each distinct query matched once against the same
+    snapshot, and all history rows written in one transaction.
+    """
+    messages = request.messages
+    if len(messages) > CHAT_BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_MESSAGES} messages per batch")
+
+    if token_user is not None:  # a token speaks for every message
+        users = [token_user] * len(messages)
+    else:
+        names = {m.user for m in messages if m.user}
+        known = {u.username: u for u in db.query(User).filter(User.username.in_(names))} if names else {}
+        users = [known.get(m.user) or Guest(m.user, m.language) for m in messages]
+    guests = sum(user.id == 0 for user in users)
+    chat_requests.inc("guest", amount=guests)
+    chat_requests.inc("registered", amount=len(users) - guests)
+
+    understood = understand_many([m.message for m in messages])
+    out_langs = [reply_language(m.language, detected, user) for m, (detected, _), user in zip(messages, understood, users)]
+    replies = respond_many(
+        db, refresh_if_due(ReadSessionLocal), [(query_en, lang) for (_, query_en), lang in zip(understood, out_langs)]
+    )
+
+    rows = [
+        row
+        for m, user, (reply, _) in zip(messages, users, replies) if user.id != 0
+        for row in history_rows(user.id, m.message, reply)
+    ]
+    writer = history.history_writer
+    if rows and writer is not None:
+        writer.add(rows)
+    elif rows:
+        db.execute(ChatHistory.__table__.insert(), rows)
         db.commit()
 
-    return {"response": bot_reply_translated}
+    return {"responses": [
+        {"response": reply, "detected_language": detected.lang, "tier": tier}
+        for (detected, _), (reply, tier) in zip(understood, replies)
+    ]}
+
+
+# SSE and WebSocket variants of /chat
+app.include_router(streaming_router)
+
+
+# ---- Symptom Lookup ----
+@app.post("/conditions/lookup", response_model=ConditionLookupResponse)
+def lookup_conditions(request: ConditionLookupRequest):
+    if not request.symptoms and not (request.text or "").strip():
+        raise HTTPException(status_code=400, detail="Provide symptoms or text")
+    symptoms, conditions = get_conditions().lookup(request.symptoms, request.text, max(1, min(request.limit, 50)))
+    return {"symptoms": symptoms, "conditions": conditions}
 
 
 # ---- History ----
+HISTORY_EXPORT_BATCH = 1000
+
+
 @app.get("/history/{username}", response_model=ChatHistoryResponse)
-def get_history(username: str, limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+def get_history(
+    username: str,
+    limit: int = Query(10, ge=1, le=100),
+    before_id: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_read_db),
+    token_user: TokenUser = Depends(require_token_user),
+):
+    user = token_user_for(username, token_user)
+
+    # keyset pagination over ix_chat_history_user_id_id: cost is per page, not per offset
+    query = db.query(ChatHistory.id, ChatHistory.sender, ChatHistory.message).filter(ChatHistory.user_id == user.id)
+    if before_id is not None:
+        query = query.filter(ChatHistory.id < before_id)
+    query = query.order_by(ChatHistory.id.desc()).limit(limit + 1)
+
+    writer = history.history_writer
+    pending = []
+    if writer is None or before_id is not None:
+        stored = query.all()
+    elif writer.drain(user.id):
+        # the user's buffered rows are committed now, so each one has an id to page from
+        stored = query.all()
+    else:
+        # flush failed: merge rows still waiting in the buffer (always the newest)
+        with writer.visibility():
+            stored = query.all()
+            pending = writer.pending_for(user.id)
 
-    rows = (
-        db.query(ChatHistory)
-        .filter(ChatHistory.user_id == user.id)
-        .order_by(ChatHistory.id.desc())
-        .limit(limit)
-        .all()
-    )
-    rows = list(reversed(rows))
+    rows, next_before_id = history.history_page(stored, pending, limit)
 
     return {
         "username": user.username,
         "language": user.language,
-        "history": [{"sender": r.sender, "message": r.message} for r in rows],
+        "history": rows,
+        "next_before_id": next_before_id,
     }
 
 
+def export_history_rows(user_id: int, batch_size: int = HISTORY_EXPORT_BATCH):
+    """NDJSON lines for every stored message, oldest first, one keyset batch in memory at a time."""
+    db = ReadSessionLocal()
+    try:
+        last_id = 0
+        while True:
+            batch = (
+                db.query(ChatHistory.id, ChatHistory.sender, ChatHistory.message)
+                .filter(ChatHistory.user_id == user_id, ChatHistory.id > last_id)
+                .order_by(ChatHistory.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return
+            yield "".join(
+                json.dumps({"id": r.id, "sender": r.sender, "message": r.message}, ensure_ascii=False) + "\n"
+                for r in batch
+            )
+            last_id = batch[-1].id
+    finally:
+        db.close()
+
+
+@app.get("/history/{username}/export")
+def export_history(username: str, token_user: TokenUser = Depends(require_token_user)):
+    user = token_user_for(username, token_user)
+    if history.history_writer is not None:
+        history.history_writer.flush()
+    return StreamingResponse(
+        export_history_rows(user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{user.username}_history.ndjson"'},
+    )
+
+
+# ---- Stats ----
+@app.get("/admin/stats", dependencies=[Depends(require_admin)])
+def admin_stats():
+    return {
+        "password_hashing": password_hasher.stats(),
+        "token_claims_cache": claims_cache.stats(),
+        "translation": translator.stats(),
+        "response_cache": response_cache.stats(),
+        "streams": stream_slots.stats(),
+        "intents": dict(get_intents().stats),
+        "conditions": dict(get_conditions().stats),
+        "language_detection": dict(language_stats),
+    }
+
+
+# ----------------- Metrics -----------------
+def pool_usage():
+    for name, eng in (("write", engine), ("read", read_engine)):
+        pool = eng.pool
+        if hasattr(pool, "checkedout"):  # QueuePool; single-connection pools have no counters
+            yield (name, "checked_out"), pool.checkedout()
+            yield (name, "idle"), pool.checkedin()
+            yield (name, "overflow"), max(pool.overflow(), 0)
+
+
+def kb_size():
+    snapshot = get_index()
+    yield ("questions",), len(snapshot)
+    yield ("version",), snapshot.version
+    yield ("segments",), len(snapshot.segments)
+
+
+registry.gauge("kb_snapshot", "Resident QnA snapshot size, version and segment count", ("field",), kb_size)
+registry.gauge("db_pool_connections", "Database pool connections by state", ("pool", "state"), pool_usage)
+registry.gauge(
+    "history_queue_rows", "Chat history rows waiting for the write-behind flush", (),
+    lambda: [((), history.history_writer.pending_rows() if history.history_writer else 0)],
+)
+registry.gauge("stream_connections", "Open SSE and WebSocket chat streams", (), lambda: [((), stream_slots.open)])
+
+
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if METRICS_ENABLED:
+    app.add_api_route(
+        "/metrics", metrics, response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)],
+    )
+
+
+# ----------------- Async Mode -----------------
+if DB_ASYNC_MODE:
+    from backend.async_api import mount_async_routes
+
+    mount_async_routes(app)
+
+
 print("SMTP_USER:", os.getenv("SMTP_USER"))
 print("SMTP_PASS:", os.getenv("SMTP_PASS"))
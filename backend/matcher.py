@@ -0,0 +1,203 @@
+import heapq
+import os
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from backend import snapshot_file
+from backend.models import MedicalQnA
+
+# ----------------- Config -----------------
+load_dotenv()
+
+MATCHER_ENGINE = os.getenv("MATCHER_ENGINE", "difflib").strip().lower()
+MATCH_CUTOFF = 0.5
+NGRAM_SIZE = 3
+SHORTLIST_SIZE = int(os.getenv("MATCH_SHORTLIST_SIZE", 64))  # rows scored exactly per query
+
+
+# ----------------- Helpers -----------------
+def normalize(text: str) -> str:
+    """Same normalization the original /chat path applied before difflib."""
+    return text.lower()
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> set:
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+# ----------------- QnA Match Index -----------------
+class QnAIndex:
+    """
+    Process-resident replacement for the per-request
+    ``db.query(MedicalQnA).all()`` + ``get_close_matches`` scan.
+
+    Every row is ranked at once by trigram Dice similarity (one ``bincount``
+    over the query's trigram postings), rows too long or too short to reach
+    the cutoff are dropped, and only the ``SHORTLIST_SIZE`` best are scored
+    with difflib, after its cheap ``real_quick_ratio``/``quick_ratio``
+    bounds. Exact questions are a dict lookup. The result equals
+    ``get_close_matches(query, questions, n=1, cutoff)`` whenever that row
+    is in the shortlist, which tests/test_matcher.py checks on typo'd and
+    paraphrased queries.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]] = ()):
+        self.ids: List[int] = []
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.normalized: List[str] = []
+        self.first_pos: Dict[str, int] = {}
+        self.pos_by_id: Dict[int, int] = {}
+        self.grams: Dict[str, np.ndarray] = {}
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self._build(rows)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---- Build ----
+    def _build(self, rows: Iterable[Tuple[int, str, str]]):
+        grams = defaultdict(list)
+        for row_id, question, answer in rows:
+            pos = len(self.ids)
+            norm = normalize(question)
+            self.ids.append(row_id)
+            self.pos_by_id[row_id] = pos
+            self.questions.append(question)
+            self.answers.append(answer)
+            self.normalized.append(norm)
+            # first row wins, like the old next(...) lookup over all_qna
+            self.first_pos.setdefault(norm, pos)
+            for gram in char_ngrams(norm):
+                grams[gram].append(pos)
+
+        self.grams = {gram: np.asarray(positions, dtype=np.int32) for gram, positions in grams.items()}
+        self.lengths = np.asarray([len(q) for q in self.normalized], dtype=np.int32)
+
+    # ---- Query ----
+    def _shortlist(self, query: str, cutoff: float, dead: Collection[int]) -> np.ndarray:
+        """Positions of the ``SHORTLIST_SIZE`` rows with the best trigram Dice score, best first."""
+        postings = [self.grams[gram] for gram in char_ngrams(query) if gram in self.grams]
+        if not postings:
+            return np.zeros(0, dtype=np.int64)
+        overlap = np.bincount(np.concatenate(postings), minlength=len(self.ids))
+        total = self.lengths + len(query)
+        # |trigrams| ~ length; the second term is difflib's real_quick_ratio, a length-only bound
+        dice = np.where(2.0 * np.minimum(self.lengths, len(query)) >= cutoff * total, overlap / total, 0.0)
+        if dead:
+            dice[np.fromiter(dead, dtype=np.int64, count=len(dead))] = 0.0
+        candidates = np.flatnonzero(dice)
+        if len(candidates) > SHORTLIST_SIZE:
+            candidates = candidates[np.argpartition(-dice[candidates], SHORTLIST_SIZE - 1)[:SHORTLIST_SIZE]]
+        return candidates[np.argsort(-dice[candidates], kind="stable")]
+
+    def top_k(
+        self, query: str, k: int = 5, cutoff: float = MATCH_CUTOFF, dead: Collection[int] = ()
+    ) -> List[Tuple[int, str, float]]:
+        """
+        Up to ``k`` (row id, question, score) candidates from the shortlist,
+        best first, ranked like ``get_close_matches(query, questions, n=k,
+        cutoff)``. Positions in ``dead`` (deleted or superseded rows) are skipped.
+        """
+        if not self.ids or k <= 0:
+            return []
+        query = normalize(query)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        best: List[Tuple[float, str, int]] = []  # min-heap of the k best so far
+        for pos in self._shortlist(query, cutoff, dead):
+            pos = int(pos)
+            bar = best[0][0] if len(best) == k else cutoff
+            candidate = self.normalized[pos]
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < bar or matcher.quick_ratio() < bar:
+                continue
+            ratio = matcher.ratio()
+            if ratio < bar:
+                continue
+            entry = (ratio, candidate, -pos)  # equal questions: first row wins
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        ranked = sorted(best, reverse=True)
+        return [(self.ids[-neg], self.questions[-neg], ratio) for ratio, _, neg in ranked]
+
+    def best_match(self, query: str, cutoff: float = MATCH_CUTOFF) -> Optional[str]:
+        """Return the matched (normalized) question, or None below ``cutoff``."""
+        query = normalize(query)
+        if query in self.first_pos:
+            return query
+        ranked = self.top_k(query, k=1, cutoff=cutoff)
+        return normalize(ranked[0][1]) if ranked else None
+
+    def match(self, query: str, cutoff: float = MATCH_CUTOFF) -> Optional[Tuple[int, str]]:
+        """(row id, answer) of the best match, or None below ``cutoff``."""
+        question = self.best_match(query, cutoff)
+        if question is None:
+            return None
+        pos = self.first_pos[question]
+        return self.ids[pos], self.answers[pos]
+
+    def answer(self, query: str, cutoff: float = MATCH_CUTOFF) -> Optional[str]:
+        match = self.match(query, cutoff)
+        return match[1] if match else None
+
+    def answer_for(self, row_id: int) -> str:
+        return self.answers[self.pos_by_id[row_id]]
+
+    # ---- Snapshot File ----
+    def to_arrays(self) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """(meta, arrays) for ``snapshot_file.write_snapshot``."""
+        arrays = snapshot_file.position_arrays(self.ids)
+        for name in ("questions", "answers", "normalized"):
+            arrays[f"{name}.blob"], arrays[f"{name}.offsets"] = snapshot_file.pack_strings(getattr(self, name))
+        arrays.update(snapshot_file.prefixed("first_pos", snapshot_file.HashedPositions.arrays(self.first_pos)))
+        arrays.update(snapshot_file.prefixed("grams", snapshot_file.Postings.arrays(self.grams)))
+        arrays["lengths"] = self.lengths
+        return {}, arrays
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: Dict[str, np.ndarray]) -> "QnAIndex":
+        """An index over mapped arrays; nothing is copied except the posting keys."""
+        index = cls.__new__(cls)
+        index.ids = snapshot_file.IntColumn(arrays["ids"])
+        index.questions, index.answers, index.normalized = (
+            snapshot_file.StringColumn(arrays[f"{name}.blob"], arrays[f"{name}.offsets"])
+            for name in ("questions", "answers", "normalized")
+        )
+        index.first_pos = snapshot_file.HashedPositions(
+            arrays["first_pos.hashes"], arrays["first_pos.positions"], index.normalized,
+        )
+        index.pos_by_id = snapshot_file.PositionMap(arrays["sorted_ids"], arrays["sorted_pos"])
+        index.grams = snapshot_file.Postings.load(arrays, "grams")
+        index.lengths = arrays["lengths"]
+        return index
+
+
+# ----------------- Engine Registry -----------------
+def get_engine(name: str = MATCHER_ENGINE):
+    """Resolve a matcher class by name: ``difflib`` | ``tfidf`` | ``bm25`` | ``embedding``."""
+    if name == "difflib":
+        return QnAIndex
+    if name == "embedding":
+        from backend.embedding import EmbeddingIndex
+        return EmbeddingIndex
+    from backend.ranking import ENGINES
+    if name not in ENGINES:
+        raise ValueError(f"❌ Unknown matcher engine '{name}'")
+    return ENGINES[name]
+
+
+def load_rows(db: Session) -> List[Tuple[int, str, str]]:
+    return db.query(MedicalQnA.id, MedicalQnA.question, MedicalQnA.answer).order_by(MedicalQnA.id).all()
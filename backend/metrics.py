@@ -0,0 +1,222 @@
+"""
+In-process counters and latency histograms rendered in the Prometheus text
+exposition format on /metrics. Recording is a bisect plus a short locked
+update; values computed elsewhere (KB size, pool usage) are read by gauge
+callbacks only when /metrics is scraped.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from backend.auth import ADMIN_TOKEN, require_bearer_secret
+from backend.profiling import current_trace
+
+# ----------------- Config -----------------
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "") or ADMIN_TOKEN  # bearer token scrapers send to /metrics
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ----------------- Metric Types -----------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        if not METRICS_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1])) for labels, s in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Current values read from ``collect`` at scrape time: an iterable of (labels, value)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Iterable[Tuple[Labels, float]]]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+# ----------------- Registry -----------------
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str], collect) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # a broken gauge must not take the endpoint down
+                print(f"❌ Metric {metric.name} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ----------------- Chat Metrics -----------------
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+)
+stage_seconds = registry.histogram("chat_stage_duration_seconds", "Time spent in each /chat pipeline stage", ("stage",))
+chat_requests = registry.counter("chat_requests_total", "Chat messages by caller type", ("user_type",))
+chat_replies = registry.counter("chat_replies_total", "Chat replies by the tier that answered", ("tier",))
+kb_matches = registry.counter("kb_matches_total", "QnA knowledge base lookups by outcome", ("result",))
+
+
+class timed:
+    """``with timed("match"):`` records the block's duration under that stage."""
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stage_seconds.observe(elapsed, self.stage)
+        trace = current_trace.get()
+        if trace is not None:  # slow-request capture is on
+            trace.stages.append((self.stage, elapsed))
+        return False
+
+
+# ----------------- HTTP Middleware -----------------
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by its route template (not
+    the raw path, which would make a series per username). Streaming
+    responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), str(status[0]),
+            )
+
+
+# ----------------- Scrape Access -----------------
+# /metrics needs "Authorization: Bearer <METRICS_TOKEN>" (ADMIN_TOKEN when unset); 403 while neither is set
+require_metrics_token = require_bearer_secret(METRICS_TOKEN, "METRICS_TOKEN")
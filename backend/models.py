@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, Text, UniqueConstraint, event, inspect
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -25,6 +25,10 @@ class User(Base):
 # ----------------- Chat History -----------------
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # keyset pagination: WHERE user_id = ? AND id < ? ORDER BY id DESC
+        Index("ix_chat_history_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -48,3 +52,181 @@ class MedicalQnA(Base):
 
     def __repr__(self):
         return f"<MedicalQnA(id={self.id}, question='{self.question[:30]}...')>"
+
+
+# ----------------- Medical QnA Translation -----------------
+class MedicalQnATranslation(Base):
+    """Answer of a MedicalQnA row translated ahead of time (see translate_kb.py)."""
+    __tablename__ = "medical_qna_translation"
+    __table_args__ = (UniqueConstraint("qna_id", "lang", name="uq_medical_qna_translation_qna_lang"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    qna_id = Column(Integer, ForeignKey("medical_qna.id", ondelete="CASCADE"), nullable=False)
+    lang = Column(String(10), nullable=False)
+    answer = Column(Text, nullable=False)
+
+    def __repr__(self):
+        return f"<MedicalQnATranslation(qna_id={self.qna_id}, lang='{self.lang}')>"
+
+
+# ----------------- KB Source Manifest -----------------
+class KBSourceManifest(Base):
+    """Fingerprint of each knowledge-base source file as of its last successful load."""
+    __tablename__ = "kb_source_manifest"
+
+    path = Column(String(500), primary_key=True)
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+
+    def __repr__(self):
+        return f"<KBSourceManifest(path='{self.path}', sha256='{self.sha256[:12]}')>"
+
+
+# ----------------- Medical QnA Change Log -----------------
+class MedicalQnAChange(Base):
+    """
+    Append-only log of changes to ``medical_qna``, written by triggers (and
+    by translate_kb.py for stored translations). The highest ``id`` is the
+    knowledge-base version.
+    """
+    __tablename__ = "medical_qna_changelog"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    qna_id = Column(Integer, nullable=True)  # NULL for a full reset
+    op = Column(String(1), nullable=False)   # I / U / D, R when the table was recreated, T for new translations
+
+    def __repr__(self):
+        return f"<MedicalQnAChange(id={self.id}, qna_id={self.qna_id}, op='{self.op}')>"
+
+
+MEDICAL_QNA_TRIGGERS = {
+    "medical_qna_after_insert": """
+    CREATE TRIGGER medical_qna_after_insert AFTER INSERT ON medical_qna
+    BEGIN
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'I');
+    END
+    """,
+    "medical_qna_after_update": """
+    CREATE TRIGGER medical_qna_after_update AFTER UPDATE ON medical_qna
+    BEGIN
+        INSERT INTO medical_qna_changelog (qna_id, op) SELECT OLD.id, 'D' WHERE OLD.id != NEW.id;
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'U');
+        DELETE FROM medical_qna_translation WHERE qna_id = OLD.id AND (OLD.answer != NEW.answer OR OLD.id != NEW.id);
+    END
+    """,
+    "medical_qna_after_delete": """
+    CREATE TRIGGER medical_qna_after_delete AFTER DELETE ON medical_qna
+    BEGIN
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (OLD.id, 'D');
+        DELETE FROM medical_qna_translation WHERE qna_id = OLD.id;
+    END
+    """,
+}
+
+
+# PostgreSQL: one row-level trigger function for all three events. Deleted
+# rows' translations go through the foreign key's ON DELETE CASCADE.
+MEDICAL_QNA_CHANGE_FUNCTION_POSTGRESQL = """
+    CREATE OR REPLACE FUNCTION medical_qna_log_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'I');
+        ELSIF TG_OP = 'UPDATE' THEN
+            IF OLD.id <> NEW.id THEN
+                INSERT INTO medical_qna_changelog (qna_id, op) VALUES (OLD.id, 'D');
+            END IF;
+            INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'U');
+            IF OLD.answer <> NEW.answer OR OLD.id <> NEW.id THEN
+                DELETE FROM medical_qna_translation WHERE qna_id = OLD.id;
+            END IF;
+        ELSE
+            INSERT INTO medical_qna_changelog (qna_id, op) VALUES (OLD.id, 'D');
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+MEDICAL_QNA_TRIGGERS_POSTGRESQL = {
+    "medical_qna_after_change": """
+    CREATE TRIGGER medical_qna_after_change AFTER INSERT OR UPDATE OR DELETE ON medical_qna
+    FOR EACH ROW EXECUTE FUNCTION medical_qna_log_change()
+    """,
+}
+
+MEDICAL_QNA_TRIGGERS_MYSQL = {
+    "medical_qna_after_insert": """
+    CREATE TRIGGER medical_qna_after_insert AFTER INSERT ON medical_qna FOR EACH ROW
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'I')
+    """,
+    "medical_qna_after_update": """
+    CREATE TRIGGER medical_qna_after_update AFTER UPDATE ON medical_qna FOR EACH ROW
+    BEGIN
+        IF OLD.id <> NEW.id THEN
+            INSERT INTO medical_qna_changelog (qna_id, op) VALUES (OLD.id, 'D');
+        END IF;
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (NEW.id, 'U');
+        IF OLD.answer <> NEW.answer OR OLD.id <> NEW.id THEN
+            DELETE FROM medical_qna_translation WHERE qna_id = OLD.id;
+        END IF;
+    END
+    """,
+    "medical_qna_after_delete": """
+    CREATE TRIGGER medical_qna_after_delete AFTER DELETE ON medical_qna FOR EACH ROW
+        INSERT INTO medical_qna_changelog (qna_id, op) VALUES (OLD.id, 'D')
+    """,
+}
+
+TRIGGERS_BY_DIALECT = {
+    "sqlite": MEDICAL_QNA_TRIGGERS,
+    "postgresql": MEDICAL_QNA_TRIGGERS_POSTGRESQL,
+    "mysql": MEDICAL_QNA_TRIGGERS_MYSQL,
+    "mariadb": MEDICAL_QNA_TRIGGERS_MYSQL,
+}
+DROP_TRIGGER = {"postgresql": "DROP TRIGGER IF EXISTS {name} ON medical_qna"}
+
+
+def has_medical_qna_triggers(dialect_name: str) -> bool:
+    """Whether edits to medical_qna on this dialect move the KB version by themselves."""
+    return dialect_name in TRIGGERS_BY_DIALECT
+
+
+def install_medical_qna_triggers(connection) -> bool:
+    """
+    (Re)create the change-log triggers (idempotent). Returns False on a
+    dialect without them: direct edits then leave the KB version alone.
+    """
+    dialect = connection.dialect.name
+    if not has_medical_qna_triggers(dialect):
+        return False
+    if dialect == "postgresql":
+        connection.exec_driver_sql(MEDICAL_QNA_CHANGE_FUNCTION_POSTGRESQL)
+    for name, ddl in TRIGGERS_BY_DIALECT[dialect].items():
+        connection.exec_driver_sql(DROP_TRIGGER.get(dialect, "DROP TRIGGER IF EXISTS {name}").format(name=name))
+        connection.exec_driver_sql(ddl)
+    return True
+
+
+def reset_medical_qna_dependents(connection):
+    """
+    Invalidate everything keyed on medical_qna row ids after the table was
+    replaced wholesale: log a reset for in-memory indexes, drop stored
+    translations and forget source fingerprints.
+    """
+    tables = inspect(connection)
+    if tables.has_table(MedicalQnAChange.__tablename__):
+        connection.execute(MedicalQnAChange.__table__.insert().values(qna_id=None, op="R"))
+    if tables.has_table(MedicalQnATranslation.__tablename__):
+        connection.execute(MedicalQnATranslation.__table__.delete())
+    if tables.has_table(KBSourceManifest.__tablename__):
+        connection.execute(KBSourceManifest.__table__.delete())
+
+
+@event.listens_for(MedicalQnA.__table__, "after_create")
+def _medical_qna_created(target, connection, **kw):
+    # Recreating medical_qna on its own drops its triggers and invalidates
+    # every in-memory index; create_all handles the fresh-DB case.
+    if inspect(connection).has_table(MedicalQnAChange.__tablename__):
+        install_medical_qna_triggers(connection)
+        reset_medical_qna_dependents(connection)
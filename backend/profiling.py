@@ -0,0 +1,257 @@
+"""
+Opt-in profiling surface (``PROFILING_ENABLED``). A middleware keeps a
+bounded ring of requests slower than ``SLOW_REQUEST_MS`` with their stage
+timings and SQL statements, and an admin-triggered sampling profiler
+records collapsed stacks of every thread for a few seconds, ready for
+flamegraph.pl or speedscope.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.auth import require_admin
+
+# ----------------- Config -----------------
+load_dotenv()
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").strip().lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", 100))  # slow requests kept, oldest dropped first
+SLOW_REQUEST_MAX_SQL = 200  # statements kept per request
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", 0.01))  # seconds between stack samples
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 120))
+
+
+# ----------------- Request Traces -----------------
+class RequestTrace:
+    """Stages and SQL of one request; filled by ``metrics.timed`` and the engine hooks."""
+    __slots__ = ("method", "path", "started", "stages", "sql", "sql_dropped")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.stages: List[tuple] = []
+        self.sql: List[tuple] = []
+        self.sql_dropped = 0
+
+    def add_sql(self, statement: str, seconds: float):
+        if len(self.sql) < SLOW_REQUEST_MAX_SQL:
+            self.sql.append((" ".join(statement.split())[:500], seconds))
+        else:
+            self.sql_dropped += 1
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_trace.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    started = conn.info.get("query_started")
+    if trace is not None and started:
+        trace.add_sql(statement, time.perf_counter() - started.pop())  # parameters are never recorded
+
+
+class SlowRequestLog:
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, maxlen: int = SLOW_REQUEST_BUFFER):
+        self.threshold = threshold_ms / 1000
+        self.entries: deque = deque(maxlen=maxlen)
+        self.seen = 0
+        self.captured = 0
+
+    def record(self, trace: RequestTrace, route: str, status: int, seconds: float):
+        self.seen += 1
+        if seconds < self.threshold:
+            return
+        self.captured += 1
+        self.entries.append({
+            "method": trace.method,
+            "path": trace.path,
+            "route": route,
+            "status": status,
+            "started_at": trace.started,
+            "duration_ms": round(seconds * 1000, 3),
+            "stages": [{"stage": s, "ms": round(d * 1000, 3)} for s, d in trace.stages],
+            "sql": [{"statement": q, "ms": round(d * 1000, 3)} for q, d in trace.sql],
+            "sql_dropped": trace.sql_dropped,
+        })
+
+    def recent(self, limit: int) -> List[dict]:
+        return list(self.entries)[::-1][:limit]
+
+
+slow_requests = SlowRequestLog()
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware tracing every HTTP request and keeping the slow ones."""
+
+    def __init__(self, app):
+        self.app = app
+        if not event.contains(Engine, "before_cursor_execute", _before_execute):
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = current_trace.set(trace)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_trace.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            slow_requests.record(trace, route, status[0], time.perf_counter() - started)
+
+
+# ----------------- Sampling Profiler -----------------
+class SamplingProfiler:
+    """
+    Samples ``sys._current_frames()`` from a background thread and counts
+    each thread's stack as a collapsed line ("thread;outer;...;inner").
+    Nothing is hooked into the interpreter, so the cost is one stack walk
+    per thread per interval and only while a profile is running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = PROFILER_INTERVAL
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = PROFILER_INTERVAL) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.elapsed = 0.0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+        print(f"🔄 Sampling profiler started for {seconds:g}s every {interval * 1000:g} ms.")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self, seconds: float):
+        own = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sample = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                sample.append(";".join(reversed(stack)))
+            with self._stacks_lock:
+                self.stacks.update(sample)
+                self.samples += 1
+            self._stop.wait(self.interval)
+        self.elapsed = time.perf_counter() - started
+        print(f"✅ Sampling profiler stopped: {self.samples} samples in {self.elapsed:.1f}s.")
+
+    def top(self) -> list:
+        with self._stacks_lock:
+            return self.stacks.most_common()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.top())
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "elapsed_s": round(self.elapsed, 3),
+            "samples": self.samples,
+            "interval_s": self.interval,
+            "stacks": len(self.stacks),
+        }
+
+
+profiler = SamplingProfiler()
+
+
+# ----------------- Admin Routes -----------------
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])  # ADMIN_TOKEN bearer
+
+
+@router.get("/slow-requests")
+def get_slow_requests(limit: int = Query(20, ge=1, le=1000)):
+    return {
+        "threshold_ms": slow_requests.threshold * 1000,
+        "seen": slow_requests.seen,
+        "captured": slow_requests.captured,
+        "requests": slow_requests.recent(limit),
+    }
+
+
+@router.post("/profile/start")
+def start_profile(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval: float = Query(PROFILER_INTERVAL, ge=0.001, le=1),
+):
+    if not profiler.start(seconds, interval):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return profiler.status()
+
+
+@router.post("/profile/stop")
+def stop_profile():
+    profiler.stop()
+    return profiler.status()
+
+
+@router.get("/profile")
+def get_profile(format: str = Query("collapsed", pattern="^(collapsed|json)$")):
+    """The latest profile: collapsed stacks (flamegraph.pl / speedscope input) or JSON."""
+    if format == "json":
+        return {**profiler.status(), "stacks": dict(profiler.top())}
+    return PlainTextResponse(profiler.collapsed())
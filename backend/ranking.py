@@ -0,0 +1,263 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except Exception:
+    sparse = None
+
+from backend import snapshot_file
+from backend.matcher import normalize
+
+# ----------------- Config -----------------
+RANKER_MIN_SCORE = float(os.getenv("RANKER_MIN_SCORE", 0.5))
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize(text))
+
+
+# ----------------- Base Ranker -----------------
+class SparseRanker:
+    """
+    Bag-of-words retrieval over ``MedicalQnA.question``.
+
+    Questions are stored as a sparse (questions x vocabulary) CSC matrix, so a
+    query is one sparse mat-vec over the query's columns followed by an
+    ``argpartition`` top-k. Subclasses only decide how the matrix is weighted
+    and how scores are normalized.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]] = (), min_score: float = RANKER_MIN_SCORE):
+        if sparse is None:
+            raise RuntimeError("❌ scipy is required for the tfidf/bm25 matcher engines")
+        self.min_score = min_score
+        self.ids: List[int] = []
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.pos_by_id: Dict[int, int] = {}
+        self.vocab: Dict[str, int] = {}
+        self.idf = np.zeros(0)
+        self.matrix = sparse.csc_matrix((0, 0))
+
+        docs = []
+        for row_id, question, answer in rows:
+            self.pos_by_id[row_id] = len(self.ids)
+            self.ids.append(row_id)
+            self.questions.append(question)
+            self.answers.append(answer)
+            docs.append(Counter(tokenize(question)))
+        self._build(docs)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---- Build ----
+    def _build(self, docs: List[Counter]):
+        indptr, indices, counts = [0], [], []
+        for doc in docs:
+            for term, count in doc.items():
+                indices.append(self.vocab.setdefault(term, len(self.vocab)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(docs), len(self.vocab)),
+        )
+        df = np.bincount(tf.indices, minlength=len(self.vocab))
+        self.idf = self._idf(df, len(docs))
+        self.matrix = self._weight(tf).tocsc()
+
+    def _idf(self, df: np.ndarray, n_docs: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def _weight(self, tf):
+        raise NotImplementedError
+
+    def _query_weights(self, terms: Counter, cols: List[int]) -> np.ndarray:
+        raise NotImplementedError
+
+    # ---- Query ----
+    def scores(self, query: str, dead: Collection[int] = ()) -> Optional[np.ndarray]:
+        terms = Counter(tokenize(query))
+        cols = [self.vocab[t] for t in terms if t in self.vocab]
+        if not cols or not self.ids:
+            return None
+        scores = self.matrix[:, cols] @ self._query_weights(terms, cols)
+        if dead:
+            scores[np.fromiter(dead, dtype=np.int64, count=len(dead))] = -np.inf
+        return scores
+
+    def top_k(
+        self, query: str, k: int = 5, min_score: Optional[float] = None, dead: Collection[int] = ()
+    ) -> List[Tuple[int, str, float]]:
+        """Up to ``k`` (row id, question, score) candidates, best first, skipping ``dead`` positions."""
+        min_score = self.min_score if min_score is None else min_score
+        scores = self.scores(query, dead)
+        if scores is None or k <= 0:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (self.ids[pos], self.questions[pos], float(scores[pos]))
+            for pos in top
+            if scores[pos] >= min_score
+        ]
+
+    def match(self, query: str, min_score: Optional[float] = None) -> Optional[Tuple[int, str]]:
+        """(row id, answer) of the best-scoring question, or None below ``min_score``."""
+        scores = self.scores(query)
+        if scores is None:
+            return None
+        pos = int(np.argmax(scores))
+        min_score = self.min_score if min_score is None else min_score
+        return (self.ids[pos], self.answers[pos]) if scores[pos] >= min_score else None
+
+    def match_many(
+        self, queries: List[str], min_score: Optional[float] = None, chunk_size: int = 8
+    ) -> List[Optional[Tuple[int, str]]]:
+        """
+        ``match`` for a batch. Each chunk of queries is one sparse x dense
+        product, (questions x terms used) @ (terms used x queries), followed
+        by a column-wise argmax. Small chunks keep the dense result in cache;
+        larger ones were slower than single queries on a 20k-question KB.
+        """
+        min_score = self.min_score if min_score is None else min_score
+        results: List[Optional[Tuple[int, str]]] = []
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            weighted = []
+            for query in chunk:
+                terms = Counter(tokenize(query))
+                cols = [self.vocab[t] for t in terms if t in self.vocab]
+                weighted.append((cols, self._query_weights(terms, cols) if cols else None))
+            used = sorted({c for cols, _ in weighted for c in cols})
+            if not used or not self.ids:
+                results.extend([None] * len(chunk))
+                continue
+            slot = {c: i for i, c in enumerate(used)}
+            weights = np.zeros((len(used), len(chunk)))
+            for j, (cols, w) in enumerate(weighted):
+                if cols:
+                    weights[[slot[c] for c in cols], j] = w
+            scores = self.matrix[:, used] @ weights
+            best = scores.argmax(axis=0)
+            for j, pos in enumerate(best):
+                ok = weighted[j][0] and scores[pos, j] >= min_score
+                results.append((self.ids[pos], self.answers[pos]) if ok else None)
+        return results
+
+    def answer(self, query: str, min_score: Optional[float] = None) -> Optional[str]:
+        match = self.match(query, min_score)
+        return match[1] if match else None
+
+    def answer_for(self, row_id: int) -> str:
+        return self.answers[self.pos_by_id[row_id]]
+
+    # ---- Snapshot File ----
+    def to_arrays(self) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """(meta, arrays) for ``snapshot_file.write_snapshot``; the matrix is stored already weighted."""
+        arrays = snapshot_file.position_arrays(self.ids)
+        for name in ("questions", "answers"):
+            arrays[f"{name}.blob"], arrays[f"{name}.offsets"] = snapshot_file.pack_strings(getattr(self, name))
+        arrays["vocab.blob"], arrays["vocab.offsets"] = snapshot_file.pack_strings(sorted(self.vocab, key=self.vocab.get))
+        arrays["idf"] = self.idf
+        arrays["matrix.data"] = self.matrix.data
+        arrays["matrix.indices"] = self.matrix.indices
+        arrays["matrix.indptr"] = self.matrix.indptr
+        return {"min_score": self.min_score, "shape": list(self.matrix.shape)}, arrays
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: Dict[str, np.ndarray]) -> "SparseRanker":
+        """A ranker over mapped arrays; only the vocabulary dict is rebuilt."""
+        if sparse is None:
+            raise RuntimeError("❌ scipy is required for the tfidf/bm25 matcher engines")
+        ranker = cls.__new__(cls)
+        ranker.min_score = meta["min_score"]
+        ranker.ids = snapshot_file.IntColumn(arrays["ids"])
+        ranker.questions, ranker.answers = (
+            snapshot_file.StringColumn(arrays[f"{name}.blob"], arrays[f"{name}.offsets"])
+            for name in ("questions", "answers")
+        )
+        ranker.pos_by_id = snapshot_file.PositionMap(arrays["sorted_ids"], arrays["sorted_pos"])
+        terms = snapshot_file.unpack_strings(arrays["vocab.blob"], arrays["vocab.offsets"])
+        ranker.vocab = {term: col for col, term in enumerate(terms)}
+        ranker.idf = arrays["idf"]
+        ranker.matrix = sparse.csc_matrix(
+            (arrays["matrix.data"], arrays["matrix.indices"], arrays["matrix.indptr"]),
+            shape=tuple(meta["shape"]), copy=False,
+        )
+        return ranker
+
+
+# ----------------- TF-IDF -----------------
+class TfidfIndex(SparseRanker):
+    """Cosine similarity of sublinear, smoothed TF-IDF vectors."""
+
+    def _idf(self, df, n_docs):
+        return np.log((1 + n_docs) / (1 + df)) + 1.0
+
+    def _weight(self, tf):
+        weighted = tf.copy()
+        weighted.data = 1.0 + np.log(weighted.data)
+        weighted = weighted @ sparse.diags(self.idf.astype(np.float32))
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ weighted
+
+    def _query_weights(self, terms, cols):
+        weights = np.asarray(
+            [(1.0 + math.log(terms[t])) * self.idf[self.vocab[t]] for t in terms if t in self.vocab]
+        )
+        # out-of-vocabulary terms still count towards the query norm
+        oov = [(1.0 + math.log(c)) * self.idf.max(initial=1.0) for t, c in terms.items() if t not in self.vocab]
+        norm = math.sqrt(float(weights @ weights) + sum(w * w for w in oov)) or 1.0
+        return weights / norm
+
+
+# ----------------- BM25 -----------------
+class BM25Index(SparseRanker):
+    """
+    Okapi BM25. Scores are divided by the summed IDF of the query terms, so a
+    question containing every query term about once scores close to 1 and the
+    same ``RANKER_MIN_SCORE`` cutoff works for both engines.
+    """
+
+    def __init__(self, rows=(), min_score=RANKER_MIN_SCORE, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        super().__init__(rows, min_score)
+
+    def _idf(self, df, n_docs):
+        return np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def _weight(self, tf):
+        lengths = np.asarray(tf.sum(axis=1)).ravel()
+        avg = lengths.mean() if len(lengths) else 1.0
+        weighted = tf.tocoo()
+        row_norm = self.k1 * (1.0 - self.b + self.b * lengths[weighted.row] / (avg or 1.0))
+        data = weighted.data * (self.k1 + 1.0) / (weighted.data + row_norm)
+        return sparse.csr_matrix((data.astype(np.float32), (weighted.row, weighted.col)), shape=tf.shape)
+
+    def _query_weights(self, terms, cols):
+        weights = np.asarray([self.idf[self.vocab[t]] for t in terms if t in self.vocab])
+        unseen = self.idf.max(initial=1.0) * sum(1 for t in terms if t not in self.vocab)
+        total = float(weights.sum()) + unseen
+        return weights / (total or 1.0)
+
+
+ENGINES = {
+    "tfidf": TfidfIndex,
+    "bm25": BM25Index,
+}
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from backend.matcher import normalize
+from backend.translation import LRUCache
+
+# ----------------- Config -----------------
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 5000))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 24 * 3600))  # seconds; bounds staleness of stored translations
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")  # empty = no shared tier
+
+ResponseKey = Tuple[str, str, int]  # (normalized English query, output language, KB version)
+
+
+# ----------------- Shared Tier -----------------
+class SQLiteResponseTier:
+    """Replies in a SQLite file shared by every worker on the host."""
+
+    def __init__(self, path: str, ttl: float = RESPONSE_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    query TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    reply TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (version, lang, query)
+                )
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: ResponseKey) -> Optional[str]:
+        query, lang, version = key
+        row = self._conn().execute(
+            "SELECT reply, created_at FROM responses WHERE version = ? AND lang = ? AND query = ?",
+            (version, lang, query),
+        ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: ResponseKey, reply: str):
+        query, lang, version = key
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (query, lang, version, reply, created_at) VALUES (?, ?, ?, ?, ?)",
+                (query, lang, version, reply, time.time()),
+            )
+
+    def prune(self, version: int, newer: bool = False):
+        """Drop replies for older KB versions (and newer ones, after the KB was recreated)."""
+        op = "!=" if newer else "<"
+        with self._conn() as conn:
+            conn.execute(f"DELETE FROM responses WHERE version {op} ?", (version,))
+
+
+# ----------------- Response Cache -----------------
+class ResponseCache:
+    """
+    Final /chat replies keyed by (normalized English query, output language,
+    KB version). A KB change, including translate_kb storing translations,
+    bumps the version, so stale replies are never looked up again; the LRU
+    ages them out and the shared tier is pruned.
+    """
+
+    def __init__(self, memory: Optional[LRUCache] = None, shared: Optional[SQLiteResponseTier] = None):
+        self.memory = memory if memory is not None else LRUCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+        self.shared = shared
+        self._pruned_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query_en: str, lang: str, version: int) -> ResponseKey:
+        # only the matcher's own normalization: anything more could merge
+        # queries that the matcher scores differently
+        return normalize(query_en), (lang or "en").lower(), version
+
+    def get(self, query_en: str, lang: str, version: int) -> Optional[str]:
+        key = self.key(query_en, lang, version)
+        reply = self.memory.get(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+        if self.shared is not None:
+            reply = self.shared.get(key)
+            if reply is not None:
+                self.shared_hits += 1
+                self.memory.set(key, reply)
+                return reply
+        self.misses += 1
+        return None
+
+    def set(self, query_en: str, lang: str, version: int, reply: str):
+        key = self.key(query_en, lang, version)
+        self.memory.set(key, reply)
+        if self.shared is not None:
+            self.shared.set(key, reply)
+            self._prune_shared(version)
+
+    def _prune_shared(self, version: int):
+        with self._lock:
+            if self._pruned_version is not None and version <= self._pruned_version:
+                return
+            first = self._pruned_version is None
+            self._pruned_version = version
+        # on the first write also drop versions ahead of ours: the KB was recreated
+        self.shared.prune(version, newer=first)
+
+    def limit_ttl(self, ttl: float):
+        """Cap reply lifetime, for a KB whose version does not track every edit."""
+        self.memory.ttl = min(self.memory.ttl, ttl)
+        if self.shared is not None:
+            self.shared.ttl = min(self.shared.ttl, ttl)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self.memory),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
+
+
+def create_response_cache(path: str = RESPONSE_CACHE_PATH) -> ResponseCache:
+    return ResponseCache(shared=SQLiteResponseTier(path) if path else None)
+
+
+response_cache = create_response_cache()
@@ -34,20 +34,30 @@ class UserResponse(BaseModel):
 
 # ----------------- Chat Schemas -----------------
 class ChatRequest(BaseModel):
-    user: str
+    user: Optional[str] = None  # ignored when a bearer token is sent
     message: str
-    language: Optional[str] = "en"
+    language: Optional[str] = None  # defaults to the detected language, then the user's
 
 
 class ChatResponse(BaseModel):
     response: str
+    detected_language: Optional[str] = None
+    tier: Optional[str] = None  # "intent", "conditions", "cache" or "qna"
 
     class Config:
         orm_mode = True
 
 
+class ChatBatchRequest(BaseModel):
+    messages: List[ChatRequest]
+
+
+class ChatBatchResponse(BaseModel):
+    responses: List[ChatResponse]  # same order as the request
+
 # ----------------- Chat History Schemas -----------------
 class ChatHistoryItem(BaseModel):
+    id: Optional[int] = None  # None while still in the write-behind buffer
     sender: str
     message: str
 
@@ -59,6 +69,26 @@ class ChatHistoryResponse(BaseModel):
     username: str
     language: str
     history: List[ChatHistoryItem]
+    next_before_id: Optional[int] = None  # pass as before_id for the previous page
 
     class Config:
         orm_mode = True
+
+
+# ----------------- Condition Lookup Schemas -----------------
+class ConditionLookupRequest(BaseModel):
+    symptoms: List[str] = []
+    text: Optional[str] = None  # free text; known symptoms are picked out of it
+    limit: int = 5
+
+
+class ConditionMatch(BaseModel):
+    condition: str
+    description: str
+    matched_symptoms: List[str]
+    score: float  # share of the condition's symptoms that matched
+
+
+class ConditionLookupResponse(BaseModel):
+    symptoms: List[str]  # recognized symptoms, canonical names
+    conditions: List[ConditionMatch]
@@ -0,0 +1,309 @@
+"""
+Binary knowledge-base snapshot file shared by every worker on a host.
+
+Layout: a 64-byte header (magic, format, KB version, engine, table of
+contents offset/length), a JSON table of contents, then 64-byte aligned
+arrays. Strings are one UTF-8 blob plus an offsets array. Workers ``mmap``
+the file read-only and wrap the arrays without copying, so N workers share
+one physical copy through the page cache. A new snapshot is written next
+to the old one and swapped in with ``os.replace``, so a reader sees
+either the old file or the new one, never a partial write.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock, workers may build concurrently
+    fcntl = None
+
+MAGIC = b"NXKBSNAP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQ16sQQ")  # magic, format, reserved, kb version, engine, toc offset, toc length
+HEADER_SIZE = 64
+ALIGN = 64
+
+
+# ----------------- Column Helpers -----------------
+def pack_strings(strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(UTF-8 blob, int64 offsets with one extra end offset)."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def stable_hash(text: str) -> int:
+    """64-bit hash that is the same in every process (unlike ``hash``)."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StringColumn(Sequence):
+    """Read-only list of strings decoded from the mapped blob on access."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class IntColumn(Sequence):
+    """Read-only list of ints over a mapped array (plain ints, so they bind as SQL parameters)."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.values[i].tolist()
+        return int(self.values[i])
+
+
+class PositionMap(Mapping):
+    """Row id -> position, by binary search over ids sorted at write time."""
+
+    def __init__(self, sorted_ids: np.ndarray, positions: np.ndarray):
+        self.sorted_ids = sorted_ids
+        self.positions = positions
+
+    def get(self, key, default=None):
+        i = int(np.searchsorted(self.sorted_ids, key))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == key:
+            return int(self.positions[i])
+        return default
+
+    def __getitem__(self, key):
+        pos = self.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return pos
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.sorted_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.sorted_ids)
+
+
+def position_arrays(ids: Sequence) -> Dict[str, np.ndarray]:
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    return {"ids": ids, "sorted_ids": ids[order], "sorted_pos": order.astype(np.int32)}
+
+
+class HashedPositions(Mapping):
+    """String -> position over (stable hash, position) pairs sorted by hash; hits are verified."""
+
+    def __init__(self, hashes: np.ndarray, positions: np.ndarray, strings: StringColumn):
+        self.hashes = hashes
+        self.positions = positions
+        self.strings = strings
+
+    @staticmethod
+    def arrays(first_pos: Dict[str, int]) -> Dict[str, np.ndarray]:
+        hashes = np.fromiter((stable_hash(s) for s in first_pos), dtype=np.uint64, count=len(first_pos))
+        positions = np.fromiter(first_pos.values(), dtype=np.int32, count=len(first_pos))
+        order = np.argsort(hashes, kind="stable")
+        return {"hashes": hashes[order], "positions": positions[order]}
+
+    def get(self, key, default=None):
+        h = np.uint64(stable_hash(key))
+        i = int(np.searchsorted(self.hashes, h))
+        while i < len(self.hashes) and self.hashes[i] == h:
+            pos = int(self.positions[i])
+            if self.strings[pos] == key:
+                return pos
+            i += 1
+        return default
+
+    def __getitem__(self, key):
+        pos = self.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return pos
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return (self.strings[int(p)] for p in self.positions)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+
+class Postings(Mapping):
+    """
+    key -> slice of one or more parallel posting arrays (CSR layout). The
+    key dictionary is rebuilt per worker; it is small (one entry per
+    distinct term, trigram or character), the postings stay mapped.
+    """
+
+    def __init__(self, keys: List[str], offsets: np.ndarray, *values: np.ndarray):
+        self.index = {k: i for i, k in enumerate(keys)}
+        self.offsets = offsets
+        self.values = values
+
+    @staticmethod
+    def arrays(postings: Dict[str, object], parts: int = 1) -> Dict[str, np.ndarray]:
+        keys = sorted(postings)
+        lists = [postings[k] if parts > 1 else (postings[k],) for k in keys]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(entry[0]) for entry in lists], out=offsets[1:])
+        blob, key_offsets = pack_strings(keys)
+        arrays = {"keys": blob, "key_offsets": key_offsets, "offsets": offsets}
+        for n in range(parts):
+            chunks = [np.asarray(entry[n], dtype=np.int32) for entry in lists]
+            arrays[f"values{n}"] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+        return arrays
+
+    @classmethod
+    def load(cls, arrays: Dict[str, np.ndarray], prefix: str, parts: int = 1) -> "Postings":
+        keys = unpack_strings(arrays[f"{prefix}.keys"], arrays[f"{prefix}.key_offsets"])
+        values = [arrays[f"{prefix}.values{n}"] for n in range(parts)]
+        return cls(keys, arrays[f"{prefix}.offsets"], *values)
+
+    def get(self, key, default=None):
+        i = self.index.get(key)
+        if i is None:
+            return default
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if len(self.values) == 1:
+            return self.values[0][start:end]
+        return tuple(v[start:end] for v in self.values)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+def prefixed(prefix: str, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {f"{prefix}.{name}": array for name, array in arrays.items()}
+
+
+# ----------------- File -----------------
+class MappedSnapshot:
+    """An open snapshot file: header fields, engine meta and zero-copy array views."""
+
+    def __init__(self, path: str, version: int, engine: str, inode: Tuple[int, int], meta: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.version = version
+        self.engine = engine
+        self.inode = inode
+        self.meta = meta
+        self.arrays = arrays
+
+
+def file_identity(path: str) -> Optional[Tuple[int, int]]:
+    """(inode, mtime) of the file at ``path``; changes whenever a new snapshot is swapped in."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def write_snapshot(path: str, version: int, engine: str, meta: dict, arrays: Dict[str, np.ndarray]):
+    """Write to a temporary file next to ``path``, fsync, then atomically replace ``path``."""
+    toc, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        toc[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    toc_bytes = json.dumps({"meta": meta, "arrays": toc}).encode("utf-8")
+    data_start = -(-(HEADER_SIZE + len(toc_bytes)) // ALIGN) * ALIGN
+
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, version, engine.encode("ascii")[:16], HEADER_SIZE, len(toc_bytes))
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(toc_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + toc[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def open_snapshot(path: str, engine: Optional[str] = None) -> Optional[MappedSnapshot]:
+    """Map the snapshot at ``path``; None if it is missing, unreadable or for another engine."""
+    try:
+        with open(path, "rb") as f:
+            identity = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, fmt, _, version, raw_engine, toc_offset, toc_length = HEADER.unpack_from(mm, 0)
+        file_engine = raw_engine.rstrip(b"\0").decode("ascii")
+        if magic != MAGIC or fmt != FORMAT_VERSION or (engine is not None and file_engine != engine):
+            return None
+        toc = json.loads(mm[toc_offset:toc_offset + toc_length])
+        data_start = -(-(toc_offset + toc_length) // ALIGN) * ALIGN
+        arrays = {}
+        for name, entry in toc["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=data_start + entry["offset"]).reshape(entry["shape"])
+    except (struct.error, ValueError, KeyError, UnicodeDecodeError) as e:
+        print(f"❌ Ignoring unreadable KB snapshot {path}: {e}")
+        return None
+    return MappedSnapshot(path, version, file_engine, (identity.st_ino, identity.st_mtime_ns), toc["meta"], arrays)
+
+
+@contextmanager
+def build_lock(path: str):
+    """Serialize snapshot builds across the workers of one host."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a+b") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,238 @@
+"""
+Streaming /chat. The matched English answer is sent as soon as it is known
+and the reply in the user's language follows once it is translated, over
+Server-Sent Events (one turn per request) or a WebSocket that stays open
+for many turns and authenticates once. Database work runs on worker
+threads with short sessions, so an idle connection holds no session.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from backend import history
+from backend.async_api import current_snapshot, queue_history
+from backend.auth import TokenUser, optional_token_user, verify_token
+from backend.chat_service import (
+    Guest, answer_query, aunderstand, cacheable, fallback_reply, fast_reply, history_rows, reply_language,
+)
+from backend.database import ReadSessionLocal, SessionLocal
+from backend.kb import localized_answer
+from backend.metrics import chat_replies, chat_requests, timed
+from backend.models import ChatHistory, User
+from backend.response_cache import response_cache
+from backend.schemas import ChatRequest
+from backend.translation import atranslate_from_english
+
+# ----------------- Config -----------------
+load_dotenv()
+
+STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", 1000))  # open SSE + WebSocket streams
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", 300))  # seconds a WebSocket may wait for a message
+
+router = APIRouter()
+
+
+# ----------------- Connection Accounting -----------------
+class StreamSlots:
+    """Admission control for open streams; single event loop, so no lock."""
+
+    def __init__(self, limit: int = STREAM_MAX_CONNECTIONS):
+        self.limit = limit
+        self.open = 0
+        self.peak = 0
+        self.rejected = 0
+        self.turns = 0
+
+    def acquire(self) -> bool:
+        if self.open >= self.limit:
+            self.rejected += 1
+            return False
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        return True
+
+    def release(self):
+        self.open -= 1
+
+    def stats(self) -> dict:
+        return {"open": self.open, "peak": self.peak, "limit": self.limit, "rejected": self.rejected, "turns": self.turns}
+
+
+stream_slots = StreamSlots()
+
+
+# ----------------- Pipeline -----------------
+def _localize(qna_id: int, answer: str, lang: str) -> str:
+    db = ReadSessionLocal()
+    try:
+        return localized_answer(db, qna_id, answer, lang)
+    finally:
+        db.close()
+
+
+def _load_user(username: str):
+    db = ReadSessionLocal()
+    try:
+        return db.query(User).filter(User.username == username).first()
+    finally:
+        db.close()
+
+
+def _insert_history(rows: list):
+    db = SessionLocal()
+    try:
+        db.execute(ChatHistory.__table__.insert(), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def stages(query_en: str, lang: str) -> AsyncIterator[Tuple[str, str, str]]:
+    """
+    ``arespond`` in two steps: ("match", English reply, tier) as soon as
+    the answer is known, then ("reply", reply in ``lang``, tier). A cached
+    reply is already final and comes as the only step.
+    """
+    match = None
+    fast = fast_reply(query_en)
+    if fast is not None:
+        english_reply, tier = fast
+    else:
+        snapshot = await current_snapshot()
+        reply = await asyncio.to_thread(response_cache.get, query_en, lang, snapshot.version)
+        if reply is not None:
+            yield "reply", reply, "cache"
+            return
+        match, english_reply = await asyncio.to_thread(answer_query, snapshot, query_en)
+        tier = "qna"
+        if match is None:
+            fallback = fallback_reply(query_en)
+            if fallback is not None:
+                english_reply, tier = fallback
+    yield "match", english_reply, tier
+
+    with timed("translate_out"):
+        if match is not None and lang != "en":
+            reply = await asyncio.to_thread(_localize, match[0], english_reply, lang)
+        else:
+            reply = await atranslate_from_english(english_reply, lang)
+    if tier == "qna" and cacheable(reply, english_reply, lang):
+        await asyncio.to_thread(response_cache.set, query_en, lang, snapshot.version, reply)
+    yield "reply", reply, tier
+
+
+async def run_turn(user, message: str, language: Optional[str]) -> AsyncIterator[dict]:
+    """Events for one chat turn; the final reply is stored in the history."""
+    detected, query_en = await aunderstand(message)
+    out_lang = reply_language(language, detected, user)
+    reply = None
+    async for event, text, tier in stages(query_en, out_lang):
+        reply = text
+        yield {"event": event, "response": text, "tier": tier, "detected_language": detected.lang}
+    stream_slots.turns += 1
+    chat_requests.inc("registered" if user.id != 0 else "guest")
+    chat_replies.inc(tier)
+
+    if user.id != 0:
+        rows = history_rows(user.id, message, reply)
+        if history.history_writer is not None:
+            await queue_history(rows)
+        else:
+            await asyncio.to_thread(_insert_history, rows)
+
+
+async def resolve_user(token_user: Optional[TokenUser], username: Optional[str], language: Optional[str]):
+    if token_user is not None:
+        return token_user
+    user = await asyncio.to_thread(_load_user, username) if username else None
+    return user or Guest(username, language)
+
+
+# ----------------- Server-Sent Events -----------------
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, token_user: Optional[TokenUser] = Depends(optional_token_user)):
+    """One turn as ``text/event-stream``: a ``match`` event, then the final ``reply``."""
+    if not stream_slots.acquire():
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "1"})
+    try:
+        user = await resolve_user(token_user, request.user, request.language)
+    except BaseException:
+        stream_slots.release()
+        raise
+
+    async def events():
+        try:
+            async for event in run_turn(user, request.message, request.language):
+                yield sse(event.pop("event"), event)
+        finally:
+            stream_slots.release()
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----------------- WebSocket -----------------
+@router.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket):
+    """
+    Many turns on one connection. The token comes from the ``token`` query
+    parameter (browsers cannot set headers on a WebSocket) or an
+    ``Authorization: Bearer`` header and is checked once; each message is
+    ``{"message", "language"?, "user"?}`` and is answered with ``match`` and
+    ``reply`` frames shaped like the SSE events.
+    """
+    token = websocket.query_params.get("token")
+    header = websocket.headers.get("authorization", "")
+    if not token and header.lower().startswith("bearer "):
+        token = header[7:].strip()
+    claims = verify_token(token) if token else None
+    if token and claims is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or expired token")
+        return
+    if not stream_slots.acquire():
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many open streams")
+        return
+
+    await websocket.accept()
+    token_user = TokenUser(claims) if claims else None
+    users = {}  # username -> user, for token-less connections
+    try:
+        while True:
+            try:
+                payload = await asyncio.wait_for(websocket.receive_json(), STREAM_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Idle timeout")
+                return
+            except ValueError:
+                await websocket.send_json({"event": "error", "detail": "Expected a JSON object"})
+                continue
+            message = payload.get("message") if isinstance(payload, dict) else None
+            if not isinstance(message, str) or not message.strip():
+                await websocket.send_json({"event": "error", "detail": "message is required"})
+                continue
+            if claims is not None and claims["exp"] < time.time():
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
+                return
+
+            language = payload.get("language")
+            username = payload.get("user")
+            user = users.get(username)
+            if user is None:
+                user = users[username] = await resolve_user(token_user, username, language)
+            async for event in run_turn(user, message, language):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_slots.release()
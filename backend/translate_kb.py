@@ -0,0 +1,86 @@
+import argparse
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal, init_db
+from backend.models import MedicalQnA, MedicalQnAChange, MedicalQnATranslation
+from backend.translation import LANG_MAP, TRANSLATOR_BACKEND, TRANSLATION_CACHE_PATH, create_translator
+
+
+# ----------------- Batch Translation Job -----------------
+def missing_rows(db: Session, lang: str, limit: int, after_id: int = 0):
+    """MedicalQnA rows past ``after_id`` that have no stored translation for ``lang`` yet."""
+    return (
+        db.query(MedicalQnA.id, MedicalQnA.answer)
+        .outerjoin(
+            MedicalQnATranslation,
+            (MedicalQnATranslation.qna_id == MedicalQnA.id) & (MedicalQnATranslation.lang == lang),
+        )
+        .filter(MedicalQnATranslation.id.is_(None), MedicalQnA.id > after_id)
+        .order_by(MedicalQnA.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def translate_kb(db: Session, langs: List[str], translator, batch_size: int = 200) -> dict:
+    """
+    Fill medical_qna_translation for every language in ``langs``.
+
+    Safe to re-run: only rows without a translation are processed, and each
+    batch is committed on its own so an interrupted run keeps its progress.
+    Answers the translator could not handle (returned unchanged) are skipped
+    and retried on the next run. Batches are read by keyset (``id >`` the
+    last id seen), so skipped rows are never read twice in one run.
+
+    Each batch that stored translations also logs a "T" change, bumping the
+    KB version so cached /chat replies made with live translations expire.
+    """
+    report = {}
+    for lang in langs:
+        if lang == "en":
+            continue
+        inserted = failed = 0
+        last_id = 0
+        while True:
+            rows = missing_rows(db, lang, batch_size, last_id)
+            if not rows:
+                break
+            last_id = rows[-1].id
+            before = inserted
+            for qna_id, answer in rows:
+                translated = translator.translate(answer, "en", lang)
+                if not translated or translated == answer:
+                    failed += 1
+                    continue
+                db.add(MedicalQnATranslation(qna_id=qna_id, lang=lang, answer=translated))
+                inserted += 1
+            if inserted > before:
+                db.add(MedicalQnAChange(qna_id=None, op="T"))
+            db.commit()
+            print(f"🔄 [{lang}] {inserted} answers translated so far...")
+        report[lang] = {"inserted": inserted, "failed": failed}
+        print(f"✅ [{lang}] Inserted {inserted}, Failed {failed}.")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-translate MedicalQnA answers for every chat language.")
+    parser.add_argument("--lang", action="append", help="language code (repeatable); default: all in LANG_MAP")
+    parser.add_argument("--backend", default=TRANSLATOR_BACKEND, help="translator backend: google | stub | none")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db()
+    translator = create_translator(args.backend, TRANSLATION_CACHE_PATH)
+    db = SessionLocal()
+    try:
+        translate_kb(db, args.lang or sorted(set(LANG_MAP.values())), translator, args.batch_size)
+        print("📊 Translator stats:", translator.stats())
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
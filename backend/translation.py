@@ -0,0 +1,335 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+try:
+    from deep_translator import GoogleTranslator
+except Exception:
+    GoogleTranslator = None
+
+# ----------------- Config -----------------
+load_dotenv()
+
+TRANSLATOR_BACKEND = os.getenv("TRANSLATOR_BACKEND", "google").strip().lower()
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 10000))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", 7 * 24 * 3600))  # seconds
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "")  # empty = no persistent tier
+
+CacheKey = Tuple[str, str, str]  # (text, source, target)
+
+# UI language name -> language code
+LANG_MAP = {"english": "en", "hindi": "hi"}
+
+
+# ----------------- Backends -----------------
+class GoogleBackend:
+    """Remote translation through deep_translator (one HTTP call per text)."""
+    name = "google"
+
+    def __init__(self):
+        self._local = threading.local()  # GoogleTranslator keeps per-call state
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if GoogleTranslator is None:
+            raise RuntimeError("deep_translator is not installed")
+        translators: Dict[Tuple[str, str], object] = self._local.__dict__.setdefault("translators", {})
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+        return translator.translate(text)
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        if GoogleTranslator is None:
+            raise RuntimeError("deep_translator is not installed")
+        return GoogleTranslator(source=source, target=target).translate_batch(texts)
+
+
+class StubBackend:
+    """Deterministic offline backend: tags the text with the target language."""
+    name = "stub"
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        self.calls += 1
+        return text if target == "en" else f"[{target}] {text}"
+
+
+class NoopBackend:
+    """Returns the text unchanged (translation disabled)."""
+    name = "none"
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "stub": StubBackend,
+    "none": NoopBackend,
+}
+
+
+# ----------------- In-memory Tier -----------------
+class LRUCache:
+    """Size-bounded LRU with a per-entry TTL. Thread-safe."""
+
+    def __init__(self, maxsize: int = TRANSLATION_CACHE_SIZE, ttl: float = TRANSLATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: CacheKey, value: str):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# ----------------- Persistent Tier -----------------
+class SQLiteCache:
+    """Second tier in a local SQLite file so warm entries survive restarts."""
+
+    def __init__(self, path: str, ttl: float = TRANSLATION_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    text TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (source, target, text)
+                )
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        text, source, target = key
+        row = self._conn().execute(
+            "SELECT result, created_at FROM translations WHERE source = ? AND target = ? AND text = ?",
+            (source, target, text),
+        ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: CacheKey, value: str):
+        text, source, target = key
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (text, source, target, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (text, source, target, value, time.time()),
+            )
+
+
+# ----------------- Cached Translator -----------------
+class CachedTranslator:
+    """
+    Two-tier cache (LRU, then optional SQLite file) in front of a swappable
+    backend. Failed backend calls return the original text and are not cached.
+    """
+
+    def __init__(self, backend=None, memory: Optional[LRUCache] = None, persistent: Optional[SQLiteCache] = None):
+        self.backend = backend or NoopBackend()
+        self.memory = memory if memory is not None else LRUCache()
+        self.persistent = persistent
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def cached(self, text: str, source: str, target: str) -> Optional[str]:
+        """In-memory tier only; never blocks. Returns None on a miss."""
+        source = (source or "auto").lower()
+        target = (target or "en").lower()
+        if not text or not text.strip() or source == target:
+            return text
+        cached = self.memory.get((text, source, target))
+        if cached is not None:
+            self.hits += 1
+        return cached
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        source = (source or "auto").lower()
+        target = (target or "en").lower()
+        if not text or not text.strip() or source == target:
+            return text
+
+        key = (text, source, target)
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        if self.persistent is not None:
+            cached = self.persistent.get(key)
+            if cached is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, cached)
+                return cached
+
+        self.misses += 1
+        try:
+            result = self.backend.translate(text, source, target)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Translation failed ({source}->{target}): {e}")
+            return text
+        if result is None:
+            return text
+
+        self.memory.set(key, result)
+        if self.persistent is not None:
+            self.persistent.set(key, result)
+        return result
+
+    def translate_many(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        ``translate`` for a batch: duplicates are looked up once, and cache
+        misses go to the backend in one ``translate_batch`` call when it has one.
+        """
+        source = (source or "auto").lower()
+        target = (target or "en").lower()
+        results: Dict[str, str] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(texts):
+            if not text or not text.strip() or source == target:
+                results[text] = text
+                continue
+            key = (text, source, target)
+            cached = self.memory.get(key)
+            if cached is not None:
+                self.hits += 1
+            elif self.persistent is not None and (cached := self.persistent.get(key)) is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, cached)
+            else:
+                missing.append(text)
+                continue
+            results[text] = cached
+
+        if missing:
+            batch = getattr(self.backend, "translate_batch", None)
+            if batch is None:
+                for text in missing:
+                    results[text] = self.translate(text, source, target)
+            else:
+                self.misses += len(missing)
+                try:
+                    translated = batch(missing, source, target)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Batch translation failed ({source}->{target}): {e}")
+                    translated = [None] * len(missing)
+                for text, result in zip(missing, translated):
+                    results[text] = text if result is None else result
+                    if result is not None:
+                        self.memory.set((text, source, target), result)
+                        if self.persistent is not None:
+                            self.persistent.set((text, source, target), result)
+        return [results[text] for text in texts]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "backend": getattr(self.backend, "name", type(self.backend).__name__),
+            "size": len(self.memory),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "evictions": self.memory.evictions,
+            "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+        }
+
+
+def create_translator(backend: str = TRANSLATOR_BACKEND, cache_path: str = TRANSLATION_CACHE_PATH) -> CachedTranslator:
+    if backend == "google" and GoogleTranslator is None:
+        print("⚠️ deep_translator not installed, translation disabled")
+        backend = "none"
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ Unknown translator backend '{backend}'")
+    persistent = SQLiteCache(cache_path) if cache_path else None
+    return CachedTranslator(BACKENDS[backend](), persistent=persistent)
+
+
+translator = create_translator()
+
+
+# ----------------- Helpers -----------------
+def translate_to_english(msg: str, source: str = "auto") -> str:
+    return translator.translate(msg, source or "auto", "en")
+
+
+def translate_from_english(msg: str, lang_code: str) -> str:
+    if not lang_code or lang_code.lower() == "en":
+        return msg
+    return translator.translate(msg, "en", lang_code)
+
+
+async def atranslate(msg: str, source: str, target: str) -> str:
+    """Awaitable translation: memory hits return inline, misses run on a worker thread."""
+    cached = translator.cached(msg, source, target)
+    if cached is not None:
+        return cached
+    return await asyncio.to_thread(translator.translate, msg, source, target)
+
+
+async def atranslate_to_english(msg: str, source: str = "auto") -> str:
+    return await atranslate(msg, source or "auto", "en")
+
+
+async def atranslate_from_english(msg: str, lang_code: str) -> str:
+    if not lang_code or lang_code.lower() == "en":
+        return msg
+    return await atranslate(msg, "en", lang_code)
+
+
+def translate_many_from_english(msgs: List[str], lang_code: str) -> List[str]:
+    if not lang_code or lang_code.lower() == "en":
+        return list(msgs)
+    return translator.translate_many(msgs, "en", lang_code)
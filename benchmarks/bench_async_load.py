@@ -0,0 +1,71 @@
+"""
+Concurrent /chat and /history load against a running server, to compare
+the sync routes with DB_ASYNC_MODE=1.
+
+    uvicorn backend.main:app --port 8000                     # then
+    python -m benchmarks.bench_async_load --clients 500
+    DB_ASYNC_MODE=1 uvicorn backend.main:app --port 8000     # then again
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+QUESTIONS = ["how do i treat a sprain", "what is fever", "मुझे बुखार है", "what causes a headache"]
+
+
+async def client_loop(client: httpx.AsyncClient, user: str, token: str, requests: int, latencies: list, errors: list):
+    for i in range(requests):
+        started = time.perf_counter()
+        try:
+            if i % 4 == 3:
+                r = await client.get(
+                    f"/history/{user}", params={"limit": 10}, headers={"Authorization": f"Bearer {token}"},
+                )
+            else:
+                r = await client.post("/chat", json={"user": user, "message": QUESTIONS[i % len(QUESTIONS)]})
+            if r.status_code >= 400 and r.status_code != 404:
+                errors.append(r.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url: str, clients: int, requests: int, users: int):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        tokens = []
+        for u in range(users):
+            await client.post("/register", json={
+                "username": f"bench{u}", "email": f"bench{u}@example.com", "age": 30, "gender": "f", "password": "bench",
+            })
+            r = await client.post("/login", json={"email": f"bench{u}@example.com", "password": "bench"})
+            tokens.append(r.json().get("access_token", ""))
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, f"bench{c % users}", tokens[c % users], requests, latencies, errors) for c in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{clients} clients x {requests} requests in {elapsed:.2f}s -> {len(latencies) / elapsed:.0f} req/s")
+    print(f"  p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms, errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.requests, args.users))
+
+
+if __name__ == "__main__":
+    main()
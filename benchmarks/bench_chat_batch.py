@@ -0,0 +1,71 @@
+"""
+Throughput of N messages sent as N POST /chat calls versus one POST
+/chat/batch, in-process on a temporary database with a synthetic KB.
+
+    python -m benchmarks.bench_chat_batch --rows 20000 --messages 1000 --distinct 250 --engine tfidf
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--distinct", type=int, default=250, help="distinct questions among the messages")
+    parser.add_argument("--engine", default="tfidf")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    # configure the app before it is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["MATCHER_ENGINE"] = args.engine
+    os.environ["RESPONSE_CACHE_PATH"] = ""
+
+    from fastapi.testclient import TestClient
+
+    from backend.database import SessionLocal
+    from backend.kb import refresh_index
+    from backend.main import app
+    from backend.models import MedicalQnA
+    from backend.response_cache import response_cache
+
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        db = SessionLocal()
+        db.execute(MedicalQnA.__table__.insert(), [
+            {"question": f"What should I do about symptom number {i}?", "answer": f"Answer text for symptom {i}."}
+            for i in range(args.rows)
+        ])
+        db.commit()
+        refresh_index(db, force=True)
+        db.close()
+
+        client.post("/register", json={
+            "username": "bench", "email": "bench@example.com", "age": 30, "gender": "f", "password": "bench",
+        })
+        questions = [f"what should i do about symptom number {rng.randrange(args.rows)}" for _ in range(args.distinct)]
+        messages = [{"user": "bench", "message": rng.choice(questions)} for _ in range(args.messages)]
+
+        response_cache.clear()
+        started = time.perf_counter()
+        singles = [client.post("/chat", json=m).json()["response"] for m in messages]
+        single_s = time.perf_counter() - started
+
+        response_cache.clear()
+        started = time.perf_counter()
+        batch = [r["response"] for r in client.post("/chat/batch", json={"messages": messages}).json()["responses"]]
+        batch_s = time.perf_counter() - started
+
+    mismatches = sum(a != b for a, b in zip(singles, batch))
+    print(f"{args.rows} QnA rows ({args.engine}), {args.messages} messages, {args.distinct} distinct")
+    print(f"  /chat x{args.messages}: {single_s:7.2f}s   {args.messages / single_s:8.0f} msg/s")
+    print(f"  /chat/batch:  {batch_s:7.2f}s   {args.messages / batch_s:8.0f} msg/s   "
+          f"({single_s / batch_s:.1f}x, {mismatches} differing replies)")
+
+
+if __name__ == "__main__":
+    main()
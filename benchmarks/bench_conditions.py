@@ -0,0 +1,65 @@
+"""
+Symptom -> condition lookup latency as the condition table grows.
+
+    python -m benchmarks.bench_conditions --sizes 300 5000 20000 50000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import pandas as pd
+
+from backend.conditions import ConditionIndex, load_conditions_frame
+
+
+def synthetic_frame(base: pd.DataFrame, rows: int, vocab: int, seed: int = 7) -> pd.DataFrame:
+    """The real conditions plus synthetic ones drawing on the real and ``vocab`` made-up symptoms."""
+    rng = random.Random(seed)
+    real = sorted({s.strip().lower() for ss in base["symptoms"] for s in ss.split(",")})
+    pool = real + [f"symptom {i}" for i in range(vocab)]
+    extra = [
+        {
+            "condition": f"Condition {i}",
+            "symptoms": ", ".join(rng.sample(pool, rng.randint(3, 8))),
+            "description": f"Synthetic condition {i}.",
+        }
+        for i in range(max(rows - len(base), 0))
+    ]
+    return pd.concat([base, pd.DataFrame(extra)], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 5000, 20000, 50000])
+    parser.add_argument("--vocab", type=int, default=2000, help="synthetic symptom names")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    base = load_conditions_frame()
+    rng = random.Random(11)
+    for size in args.sizes:
+        started = time.perf_counter()
+        index = ConditionIndex(synthetic_frame(base, size, args.vocab))
+        build = time.perf_counter() - started
+
+        symptom_lists = [rng.sample(index.symptoms, rng.randint(1, 4)) for _ in range(args.queries)]
+        texts = [f"i have {' and '.join(s)} since yesterday" for s in symptom_lists]
+        for label, run in (
+            ("symptoms", lambda i: index.lookup(symptom_lists[i], None, 5)),
+            ("free text", lambda i: index.lookup((), texts[i], 5)),
+        ):
+            samples = []
+            for i in range(args.queries):
+                t = time.perf_counter()
+                run(i)
+                samples.append(time.perf_counter() - t)
+            samples.sort()
+            print(
+                f"{len(index):6d} conditions ({build:5.2f}s build) {label:>9}: "
+                f"p50 {statistics.median(samples) * 1e6:7.1f} µs   p99 {samples[int(len(samples) * 0.99) - 1] * 1e6:7.1f} µs"
+            )
+
+
+if __name__ == "__main__":
+    main()
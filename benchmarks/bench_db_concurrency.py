@@ -0,0 +1,135 @@
+"""
+Chat-history reads and writes running concurrently on SQLite, comparing the
+driver-default engine with the tuned profile (WAL, synchronous=NORMAL,
+mmap/cache sizing, busy_timeout, separate read-only pool).
+
+    python -m benchmarks.bench_db_concurrency --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, make_engine
+from backend.models import ChatHistory, User
+
+
+def seed(Session, users: int, rows_per_user: int):
+    db = Session()
+    db.add_all(
+        User(username=f"u{u}", email=f"u{u}@example.com", age=30, gender="f", password="x", language="en")
+        for u in range(users)
+    )
+    db.commit()
+    db.execute(ChatHistory.__table__.insert(), [
+        {"user_id": u + 1, "sender": "user" if i % 2 == 0 else "bot", "message": f"message {i}"}
+        for u in range(users) for i in range(rows_per_user)
+    ])
+    db.commit()
+    db.close()
+
+
+def writer(Session, users: int, stop: threading.Event, counts: dict, lock: threading.Lock):
+    """One /chat-like transaction: user + bot row, then commit."""
+    n = errors = 0
+    while not stop.is_set():
+        db = Session()
+        try:
+            uid = n % users + 1
+            db.execute(ChatHistory.__table__.insert(), [
+                {"user_id": uid, "sender": "user", "message": "how do i treat a sprain"},
+                {"user_id": uid, "sender": "bot", "message": "Rest, ice, compression, elevation."},
+            ])
+            db.commit()
+            n += 1
+        except OperationalError:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        counts["writes"] += n
+        counts["write_errors"] += errors
+
+
+def reader(Session, users: int, stop: threading.Event, counts: dict, lock: threading.Lock, latencies: list):
+    """One /history page: newest 10 rows for a user."""
+    n = errors = 0
+    local = []
+    while not stop.is_set():
+        db = Session()
+        started = time.perf_counter()
+        try:
+            db.query(ChatHistory.id, ChatHistory.sender, ChatHistory.message) \
+                .filter(ChatHistory.user_id == n % users + 1) \
+                .order_by(ChatHistory.id.desc()).limit(11).all()
+            local.append(time.perf_counter() - started)
+            n += 1
+        except OperationalError:
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        counts["reads"] += n
+        counts["read_errors"] += errors
+        latencies.extend(local)
+
+
+def run(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = make_engine(url, profile)
+        Base.metadata.create_all(bind=engine)
+        read_engine = make_engine(url, profile, read_only=True) if profile == "tuned" else engine
+        WriteSession = sessionmaker(bind=engine)
+        ReadSession = sessionmaker(bind=read_engine)
+        seed(WriteSession, args.users, args.rows_per_user)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        counts = {"writes": 0, "write_errors": 0, "reads": 0, "read_errors": 0}
+        latencies = []
+        threads = [
+            threading.Thread(target=writer, args=(WriteSession, args.users, stop, counts, lock))
+            for _ in range(args.writers)
+        ] + [
+            threading.Thread(target=reader, args=(ReadSession, args.users, stop, counts, lock, latencies))
+            for _ in range(args.readers)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+        read_engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0
+    return dict(counts, p99_read_ms=p99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rows-per-user", type=int, default=200)
+    args = parser.parse_args()
+
+    for profile in ("default", "tuned"):
+        r = run(profile, args)
+        print(
+            f"{profile:>8}: {r['writes'] / args.seconds:8.0f} writes/s ({r['write_errors']} locked), "
+            f"{r['reads'] / args.seconds:8.0f} reads/s ({r['read_errors']} locked), p99 read {r['p99_read_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
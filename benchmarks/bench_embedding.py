@@ -0,0 +1,101 @@
+"""
+Embedding matcher at scale: build time, top-k latency of the IVF lookup
+against an exact scan, and recall@1/recall@k of the IVF results against
+that scan, for a sweep of ``IVF_LISTS`` x ``IVF_PROBES`` settings.
+
+    python -m benchmarks.bench_embedding --rows 1000000 --dim 128 --queries 200
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.bench_scaling import TEMPLATES, near_miss
+
+SYLLABLES = [
+    "ar", "bel", "cor", "den", "fi", "gas", "hep", "ich", "lo", "mel", "neu", "os", "pan", "rhi", "sto", "tis",
+    "ur", "vas", "xan", "zo", "ca", "dia", "em", "gly", "ker", "lym", "myo", "nep", "pha", "ren",
+]
+
+
+def vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_questions(n: int, seed: int = 7) -> list:
+    """Template questions about two or three random pseudo-medical terms; few near-duplicates."""
+    rng = random.Random(seed)
+    words = vocabulary(20000, rng)
+    return [
+        rng.choice(TEMPLATES).format(" ".join(rng.choice(words) for _ in range(rng.randint(2, 3))))
+        for _ in range(n)
+    ]
+
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lists", default="0", help="comma-separated IVF_LISTS values (0 = sqrt(rows))")
+    parser.add_argument("--probes", default="8,16,32,64", help="comma-separated IVF_PROBES values")
+    args = parser.parse_args()
+
+    from backend import embedding
+
+    questions = synthetic_questions(args.rows)
+    rows = [(i + 1, q, f"Answer {i}") for i, q in enumerate(questions)]
+    rng = random.Random(11)
+    queries = [near_miss(questions[rng.randrange(args.rows)], rng) for _ in range(args.queries)]
+    embedder = embedding.HashedEmbedder(args.dim)
+
+    started = time.perf_counter()
+    vectors = embedder.embed(questions)
+    print(f"{args.rows} questions, dim {args.dim}: embedded in {time.perf_counter() - started:.1f} s "
+          f"({vectors.nbytes / 2**20:.0f} MiB float32)")
+
+    truth, best = [], []
+    for lists in (int(n) for n in args.lists.split(",")):
+        started = time.perf_counter()
+        index = embedding.EmbeddingIndex(rows, embedder=embedder, vectors=vectors, lists=lists)
+        build = time.perf_counter() - started
+        if index.ivf is None:
+            print(f"fewer than EMBEDDING_ANN_MIN_ROWS={embedding.EMBEDDING_ANN_MIN_ROWS} rows: exact scan only")
+            return
+        if not truth:
+            exact = []
+            for query in queries:
+                started = time.perf_counter()
+                ranked = index.exact_top_k(query, args.k)
+                exact.append(time.perf_counter() - started)
+                truth.append({row_id for row_id, _, _ in ranked})
+                best.append(ranked[0][0])
+            print(f"exact scan: p50 {percentile(exact, 0.5) * 1000:7.2f} ms  p95 {percentile(exact, 0.95) * 1000:7.2f} ms")
+        sizes = np.diff(index.ivf.offsets)
+        print(f"{index.ivf.lists} lists (largest {sizes.max()}, median {int(np.median(sizes))} rows), "
+              f"clustered in {build:.1f} s")
+        for probes in (int(p) for p in args.probes.split(",")):
+            index.probes = probes
+            latencies, found, top1 = [], 0, 0
+            for query, expected, first in zip(queries, truth, best):
+                started = time.perf_counter()
+                got = index.top_k(query, args.k, min_score=-1.0)
+                latencies.append(time.perf_counter() - started)
+                found += len(expected & {row_id for row_id, _, _ in got})
+                top1 += bool(got) and got[0][0] == first
+            print(f"  probes {probes:3d}: p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  "
+                  f"p95 {percentile(latencies, 0.95) * 1000:6.2f} ms  recall@1 {top1 / len(queries):.3f}  "
+                  f"recall@{args.k} {found / sum(len(t) for t in truth):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+/chat matching latency split by tier: queries answered by the compiled
+intents engine versus queries that miss it and fall back to the QnA matcher.
+
+    python -m benchmarks.bench_intents --rows 20000 --queries 500 --engine difflib
+"""
+import argparse
+import random
+import statistics
+import time
+
+from backend.intents import build_intents, load_intents
+from backend.matcher import get_engine
+
+
+def synthetic_rows(n: int):
+    return [
+        (i + 1, f"What should I do about symptom number {i}?", f"Answer text for symptom {i}.")
+        for i in range(n)
+    ]
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(samples) * 1e6:9.1f} µs   p99 {p99 * 1e6:9.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--engine", default="difflib")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    intents = build_intents()
+    patterns = [p.lower() for intent in load_intents() for p in intent.get("patterns", [])]
+    kb = get_engine(args.engine)(synthetic_rows(args.rows))
+    fallbacks = [f"what should i do about symptom number {rng.randrange(args.rows)}" for _ in range(args.queries)]
+    hits = [rng.choice(patterns) for _ in range(args.queries)]
+
+    tiers = {"intent": [], "qna": []}
+    for query in hits + fallbacks:
+        started = time.perf_counter()
+        answer = intents.match(query)
+        tier = "intent"
+        if answer is None:
+            kb.match(query)
+            tier = "qna"
+        tiers[tier].append(time.perf_counter() - started)
+
+    print(f"{args.rows} QnA rows ({args.engine}), {len(intents)} intent patterns")
+    for tier, samples in tiers.items():
+        if samples:
+            print(f"{tier:>7}: {len(samples):5d} queries   {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
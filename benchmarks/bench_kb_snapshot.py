@@ -0,0 +1,136 @@
+"""
+Shared KB snapshot file versus a per-process build: build and write time
+against map time, match latency on the mapped index, and the memory of K
+concurrent worker processes (Pss/private from /proc/self/smaps_rollup,
+Linux only) when each builds its own index versus mapping one file.
+
+    python -m benchmarks.bench_kb_snapshot --rows 20000 --workers 4 --engine tfidf
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_scaling import query_mix, question
+
+
+def synthetic_rows(n: int):
+    return [(i + 1, question(i), f"Answer {i}: rest, fluids and see a doctor if it gets worse.") for i in range(n)]
+
+
+def memory() -> dict:
+    """Resident, proportional (shared pages split between processes) and private memory in MiB."""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0), "private": private}
+
+
+def run_worker(mode: str, engine: str, rows: int, path: str, queries: int):
+    """Child process: load the index like a worker would, answer queries, report memory, wait."""
+    from backend import snapshot_file
+    from backend.matcher import get_engine
+
+    cls = get_engine(engine)  # imports scipy for tfidf/bm25 outside the timing
+    started = time.perf_counter()
+    if mode == "mapped":
+        mapped = snapshot_file.open_snapshot(path, engine)
+        index = cls.from_arrays(mapped.meta, mapped.arrays)
+    else:
+        index = cls(synthetic_rows(rows))
+    load = time.perf_counter() - started
+    mix = query_mix(rows, queries, random.Random(os.getpid()))
+    for category in ("exact", "near_miss", "miss"):
+        for query in mix[category]:
+            index.match(query)
+    print(json.dumps({"load_s": load, **memory()}), flush=True)
+    sys.stdin.read()  # stay alive until every worker has reported
+
+
+def workers(mode: str, args, path: str) -> list:
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_kb_snapshot", "--child", mode, "--engine", args.engine,
+        "--rows", str(args.rows), "--path", path, "--queries", str(args.queries),
+    ]
+    procs = [subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(args.workers)]
+    reports = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    return reports
+
+
+def latency(index, queries) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        index.match(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--engine", default="tfidf", choices=["difflib", "tfidf", "bm25"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50, help="queries per category")
+    parser.add_argument("--child", choices=["memory", "mapped"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_worker(args.child, args.engine, args.rows, args.path, args.queries)
+        return
+
+    from backend import snapshot_file
+    from backend.matcher import get_engine
+
+    engine = get_engine(args.engine)
+    path = os.path.join(tempfile.mkdtemp(), "kb.snap")
+    rows = synthetic_rows(args.rows)
+
+    started = time.perf_counter()
+    index = engine(rows)
+    build = time.perf_counter() - started
+    started = time.perf_counter()
+    meta, arrays = index.to_arrays()
+    snapshot_file.write_snapshot(path, 1, args.engine, meta, arrays)
+    write = time.perf_counter() - started
+    started = time.perf_counter()
+    mapped_file = snapshot_file.open_snapshot(path, args.engine)
+    mapped = engine.from_arrays(mapped_file.meta, mapped_file.arrays)
+    load = time.perf_counter() - started
+    print(f"{args.engine}, {args.rows} questions: build {build * 1000:8.1f} ms, write {write * 1000:6.1f} ms, "
+          f"map {load * 1000:6.2f} ms, file {os.path.getsize(path) / 2**20:.1f} MiB")
+
+    mix = query_mix(args.rows, args.queries, random.Random(7))
+    for category in ("exact", "near_miss", "miss"):
+        queries = mix[category]
+        same = sum(index.match(q) == mapped.match(q) for q in queries)
+        print(f"  {category:9s} in-memory {latency(index, queries):7.3f} ms  mapped {latency(mapped, queries):7.3f} ms  "
+              f"same answer {same}/{len(queries)}")
+
+    if not memory():
+        print("  (no /proc/self/smaps_rollup: skipping the multi-worker memory comparison)")
+        return
+    for mode in ("memory", "mapped"):
+        reports = workers(mode, args, path)
+        pss = sum(r["pss"] for r in reports)
+        print(f"  {args.workers} workers, {'own build' if mode == 'memory' else 'shared file'}: "
+              f"total Pss {pss:7.1f} MiB, private/worker {statistics.mean(r['private'] for r in reports):6.1f} MiB, "
+              f"load/worker {statistics.mean(r['load_s'] for r in reports) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Inbound translation cost with and without the local language-detection fast path.
+
+    python -m benchmarks.bench_language_detection --messages 2000 --english-share 0.9 --latency-ms 40
+
+The translator is the offline stub with an artificial per-call delay standing
+in for the remote round trip; the translation cache is disabled so every call
+pays it.
+"""
+import argparse
+import random
+import time
+
+from backend.language import build_profile, detect_language, load_intent_patterns
+from backend.translation import CachedTranslator, LRUCache, StubBackend
+
+HINDI = ["मुझे बुखार है", "मोच का इलाज कैसे करें", "सिर दर्द के लिए क्या करें", "खांसी की दवा"]
+
+
+class SlowStub(StubBackend):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def translate(self, text, source, target):
+        time.sleep(self.latency)
+        return super().translate(text, source, target)
+
+
+def workload(n: int, english_share: float, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    english = load_intent_patterns() or ["How do you treat a sprain?", "What to do for a fever?"]
+    return [rng.choice(english) if rng.random() < english_share else rng.choice(HINDI) for _ in range(n)]
+
+
+def run(messages: list, translator: CachedTranslator, detect: bool) -> float:
+    start = time.perf_counter()
+    for msg in messages:
+        if detect:
+            detected = detect_language(msg)
+            if detected.lang == "en":
+                continue
+            translator.translate(msg, detected.lang or "auto", "en")
+        else:
+            translator.translate(msg, "auto", "en")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--english-share", type=float, default=0.9)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    build_profile([])
+    messages = workload(args.messages, args.english_share)
+    results = {}
+    for detect in (False, True):
+        translator = CachedTranslator(SlowStub(args.latency_ms / 1000), memory=LRUCache(maxsize=0))
+        elapsed = run(messages, translator, detect)
+        results[detect] = elapsed
+        label = "detect + skip" if detect else "always translate"
+        print(
+            f"{label:>16}: {elapsed * 1000 / len(messages):8.3f} ms/msg  "
+            f"backend calls={translator.backend.calls}"
+        )
+    print(f"speedup: {results[False] / results[True]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
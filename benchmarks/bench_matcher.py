@@ -0,0 +1,100 @@
+"""
+QnAIndex against the scan it replaced, ``get_close_matches(query,
+questions, n=1, cutoff=0.5)``: p50/p99 latency per query category and how
+often both pick the same row, on a KB built from the intents.json
+vocabulary or from the scaling suite's synthetic questions.
+
+    python -m benchmarks.bench_matcher --rows 5000 --corpus intents --queries 40
+"""
+import argparse
+import json
+import os
+import random
+import time
+from difflib import get_close_matches
+
+from benchmarks.bench_scaling import MISSES, QUALIFIERS, TOPICS, near_miss, question
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), "..", "backend", "data", "intents.json")
+PARAPHRASES = [
+    ("how to cure", "how can i cure"), ("what to do if", "what should i do if"), ("how do you treat", "how to treat"),
+    ("which medicine to apply for", "what medicine should i use for"), ("what are the symptoms of", "symptoms of"),
+    ("how do i treat", "how should i treat"), ("what causes", "what is the cause of"), ("is", "could"),
+]
+
+
+def intents_questions(n: int) -> list:
+    """Every intents.json pattern with a qualifier, then with a topic as well, until there are ``n``."""
+    with open(INTENTS_PATH, encoding="utf-8") as f:
+        patterns = [p.rstrip("?") for intent in json.load(f)["intents"] for p in intent["patterns"] if len(p.split()) > 1]
+    questions = []
+    for i in range(n):
+        pattern = patterns[i % len(patterns)]
+        qualifier = QUALIFIERS[(i // len(patterns)) % len(QUALIFIERS)]
+        topic = TOPICS[i // (len(patterns) * len(QUALIFIERS)) % len(TOPICS)] if i >= len(patterns) * len(QUALIFIERS) else ""
+        questions.append(" ".join(part for part in (pattern, qualifier, topic and f"with {topic}") if part) + "?")
+    return questions
+
+
+def paraphrase(text: str, rng: random.Random) -> str:
+    """Reword the opening, drop the question mark and maybe the last word of a qualifier (never the topic)."""
+    text = text.lower().rstrip("?")
+    for old, new in PARAPHRASES:
+        if text.startswith(old + " "):
+            text = new + text[len(old):]
+            break
+    words = text.split()
+    if len(words) > 6 and rng.random() < 0.5:
+        del words[-1]
+    return " ".join(words)
+
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--corpus", choices=["intents", "synthetic"], default="intents")
+    parser.add_argument("--queries", type=int, default=40, help="queries per category")
+    args = parser.parse_args()
+
+    from backend.matcher import MATCH_CUTOFF, SHORTLIST_SIZE, QnAIndex
+
+    questions = intents_questions(args.rows) if args.corpus == "intents" else [question(i) for i in range(args.rows)]
+    rows = [(i + 1, q, f"Answer {i}") for i, q in enumerate(questions)]
+    lowered = [q.lower() for q in questions]
+    first = {}
+    for pos, q in enumerate(lowered):
+        first.setdefault(q, pos)
+    started = time.perf_counter()
+    index = QnAIndex(rows)
+    print(f"{args.corpus}, {args.rows} questions: index built in {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"shortlist {SHORTLIST_SIZE}")
+
+    rng = random.Random(5)
+    mix = {
+        "exact": [rng.choice(lowered) for _ in range(args.queries)],
+        "near_miss": [near_miss(rng.choice(questions), rng) for _ in range(args.queries)],
+        "paraphrase": [paraphrase(rng.choice(questions), rng) for _ in range(args.queries)],
+        "miss": [rng.choice(MISSES) for _ in range(args.queries)],
+    }
+    for category, queries in mix.items():
+        scan, indexed, same = [], [], 0
+        for query in queries:
+            started = time.perf_counter()
+            matches = get_close_matches(query, lowered, n=1, cutoff=MATCH_CUTOFF)
+            expected = rows[first[matches[0]]][0] if matches else None
+            scan.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            match = index.match(query)
+            indexed.append(time.perf_counter() - started)
+            same += (match[0] if match else None) == expected
+        print(f"  {category:10s} scan p50 {percentile(scan, 0.5) * 1000:8.2f} ms  p99 {percentile(scan, 0.99) * 1000:8.2f} ms"
+              f"  | index p50 {percentile(indexed, 0.5) * 1000:7.3f} ms  p99 {percentile(indexed, 0.99) * 1000:7.3f} ms"
+              f"  | same row {same}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cost of the /metrics instrumentation on the /chat hot path: the price of
+one stage timer and counter update, and in-process /chat throughput with
+METRICS_ENABLED=1 versus 0 (each run in a fresh interpreter).
+
+    python -m benchmarks.bench_metrics_overhead --requests 2000 --rounds 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+QUESTIONS = ["how do i treat a sprain", "what is fever", "i have a fever and a cough", "zzz unknown question"]
+
+
+def run_chat(requests: int):
+    """Child process: /chat throughput on a throwaway database; prints req/s."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["TRANSLATOR_BACKEND"] = "stub"
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    with TestClient(app) as client:
+        client.post("/register", json={
+            "username": "bench", "email": "bench@example.com", "age": 30, "gender": "f", "password": "bench",
+        })
+        for i in range(100):  # warm up
+            client.post("/chat", json={"user": "bench", "message": QUESTIONS[i % len(QUESTIONS)]})
+        started = time.perf_counter()
+        for i in range(requests):
+            client.post("/chat", json={"user": "bench", "message": QUESTIONS[i % len(QUESTIONS)]})
+        print(requests / (time.perf_counter() - started))
+
+
+def micro(n: int = 200000):
+    from backend.metrics import chat_replies, timed
+
+    started = time.perf_counter()
+    for _ in range(n):
+        with timed("bench"):
+            pass
+    timer = (time.perf_counter() - started) / n
+    started = time.perf_counter()
+    for _ in range(n):
+        chat_replies.inc("bench")
+    counter = (time.perf_counter() - started) / n
+    return timer, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3, help="alternating on/off runs")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_chat(args.requests)
+        return
+
+    timer, counter = micro()
+    print(f"stage timer {timer * 1e6:.2f} µs, counter inc {counter * 1e6:.2f} µs "
+          f"(a /chat records ~8 timers and ~3 counters, plus one request histogram)")
+
+    rates = {"1": [], "0": []}
+    for _ in range(args.rounds):
+        for flag in ("1", "0"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_metrics_overhead", "--child", "--requests", str(args.requests)],
+                env={**os.environ, "METRICS_ENABLED": flag}, capture_output=True, text=True, check=True,
+            ).stdout
+            rates[flag].append(float(out.strip().splitlines()[-1]))
+    on, off = max(rates["1"]), max(rates["0"])
+    print(f"/chat with metrics {on:7.0f} req/s, without {off:7.0f} req/s (best of {args.rounds}) "
+          f"-> overhead {(off - on) / off:+.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Scaling suite for the /chat pipeline: each stage of chat() timed in
+isolation and the endpoint end to end, over synthetic medical_qna tables of
+growing size and a mix of exact, near-miss, miss and Hindi queries. The
+stub translator keeps the network out of the numbers (Hindi queries stay
+Hindi, so they measure detection and translation overhead, not matching).
+Results are written as JSON; pass an earlier file as --baseline to flag
+regressions.
+
+    python -m benchmarks.bench_scaling --sizes 1000 10000 100000 1000000 --engines difflib tfidf bm25 \\
+        --output scaling.json --baseline previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+TEMPLATES = [
+    "What are the symptoms of {}?",
+    "How do I treat {}?",
+    "What causes {}?",
+    "Is {} contagious?",
+    "When should I see a doctor about {}?",
+    "How can I prevent {}?",
+    "What is the recovery time for {}?",
+    "Can children get {}?",
+]
+QUALIFIERS = [
+    "", "in children", "in adults", "during pregnancy", "at night", "after exercise", "in older people",
+    "after surgery", "in winter", "while travelling", "with diabetes", "at home",
+]
+TOPICS = [
+    "a sprained ankle", "a fever", "a migraine", "the flu", "a common cold", "asthma", "diabetes", "hypertension",
+    "food poisoning", "a sore throat", "back pain", "a burn", "an insect bite", "dehydration", "anemia",
+    "a nosebleed", "heat stroke", "acid reflux", "an ear infection", "pink eye", "chickenpox", "measles",
+    "a urinary tract infection", "insomnia", "eczema", "a broken wrist", "sunburn", "a concussion",
+]
+MISSES = [
+    "what is the capital of peru", "recommend a good laptop", "how do i file my taxes", "best pizza toppings",
+    "who won the football match", "explain quantum computing", "how to change a car tyre", "translate this poem",
+]
+HINDI = ["मुझे बुखार है", "सिर में दर्द हो रहा है", "मुझे खांसी और जुकाम है", "पेट में दर्द है क्या करूं", "मुझे नींद नहीं आती"]
+CATEGORIES = ("exact", "near_miss", "miss", "hindi")
+
+
+# ----------------- Synthetic Data -----------------
+def question(i: int) -> str:
+    combos = len(TEMPLATES) * len(TOPICS) * len(QUALIFIERS)
+    t, rest = i % len(TEMPLATES), i // len(TEMPLATES)
+    topic, rest = TOPICS[rest % len(TOPICS)], rest // len(TOPICS)
+    qualifier = QUALIFIERS[rest % len(QUALIFIERS)]
+    text = TEMPLATES[t].format(f"{topic} {qualifier}".strip())
+    return text if i < combos else f"{text[:-1]} (case {i // combos})?"
+
+
+def near_miss(text: str, rng: random.Random) -> str:
+    """Drop one word and swap two adjacent letters: a typo'd paraphrase."""
+    words = text.lower().rstrip("?").split()
+    if len(words) > 3:
+        del words[rng.randrange(1, len(words))]
+    w = rng.randrange(len(words))
+    if len(words[w]) > 3:
+        c = rng.randrange(len(words[w]) - 1)
+        words[w] = words[w][:c] + words[w][c + 1] + words[w][c] + words[w][c + 2:]
+    return " ".join(words)
+
+
+def query_mix(rows: int, per_category: int, rng: random.Random) -> dict:
+    return {
+        "exact": [question(rng.randrange(rows)).lower() for _ in range(per_category)],
+        "near_miss": [near_miss(question(rng.randrange(rows)), rng) for _ in range(per_category)],
+        "miss": [rng.choice(MISSES) for _ in range(per_category)],
+        "hindi": [rng.choice(HINDI) for _ in range(per_category)],
+    }
+
+
+# ----------------- Timing -----------------
+def timed(fn, inputs, budget: float, min_samples: int = 5) -> dict:
+    """Latency summary of ``fn`` over ``inputs``, stopping once ``budget`` seconds are spent."""
+    samples, hits, spent = [], 0, 0.0
+    for item in inputs:
+        started = time.perf_counter()
+        result = fn(item)
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed)
+        hits += result is not None and result is not False
+        spent += elapsed
+        if spent > budget and len(samples) >= min_samples:
+            break
+    samples.sort()
+    return {
+        "n": len(samples),
+        "hits": hits,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(statistics.median(samples) * 1000, 4),
+        "p99_ms": round(samples[max(int(len(samples) * 0.99) - 1, 0)] * 1000, 4),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: list, baseline_path: str, tolerance: float, min_delta_ms: float) -> list:
+    """(engine, rows, stage, old p50, new p50) for every p50 that grew by more than ``tolerance`` and ``min_delta_ms``."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["engine"], r["rows"]): r for r in json.load(f)["results"]}
+
+    def flat(stages: dict, prefix: str = ""):
+        for name, value in stages.items():
+            if "p50_ms" in value:
+                yield prefix + name, value["p50_ms"]
+            else:
+                yield from flat(value, f"{prefix}{name}.")
+
+    regressions = []
+    for result in results:
+        old = baseline.get((result["engine"], result["rows"]))
+        if old is None:
+            continue
+        old_p50 = dict(flat(old["stages"]))
+        for stage, p50 in flat(result["stages"]):
+            if stage in old_p50 and p50 > old_p50[stage] * (1 + tolerance) and p50 - old_p50[stage] > min_delta_ms:
+                regressions.append((result["engine"], result["rows"], stage, old_p50[stage], p50))
+    return regressions
+
+
+# ----------------- Suite -----------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--engines", nargs="+", default=["difflib", "tfidf", "bm25"])
+    parser.add_argument("--queries", type=int, default=100, help="queries per category")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--budget", type=float, default=20.0, help="seconds per stage before sampling stops")
+    parser.add_argument("--output", default="scaling.json")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 growth over the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p50 changes smaller than this")
+    args = parser.parse_args()
+
+    # a throwaway database and an offline translator, set before the app is imported
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["TRANSLATOR_BACKEND"] = "stub"
+    os.environ["TRANSLATION_CACHE_PATH"] = ""
+    os.environ["RESPONSE_CACHE_PATH"] = ""
+    os.environ["HISTORY_WRITE_BEHIND"] = "0"
+    os.environ["DB_ASYNC_MODE"] = "0"
+
+    from fastapi.testclient import TestClient
+
+    from backend.chat_service import understand
+    from backend.database import SessionLocal
+    from backend.kb import build_index
+    from backend.main import app
+    from backend.models import ChatHistory, MedicalQnA, User
+    from backend.response_cache import response_cache
+    from backend.translation import translator
+
+    rng = random.Random(7)
+    results = []
+    with TestClient(app) as client:
+        db = SessionLocal()
+        db.execute(User.__table__.insert(), [
+            {"username": f"bench{u}", "email": f"bench{u}@example.com", "age": 30, "gender": "f",
+             "password": "x", "language": "en"}
+            for u in range(args.users)
+        ])
+        db.commit()
+
+        loaded = 0
+        for size in sorted(args.sizes):
+            for start in range(loaded, size, 50000):
+                db.execute(MedicalQnA.__table__.insert(), [
+                    {"question": question(i), "answer": f"Answer for: {question(i)}"}
+                    for i in range(start, min(start + 50000, size))
+                ])
+                db.commit()
+            loaded = size
+            queries = query_mix(size, args.queries, rng)
+            usernames = [f"bench{rng.randrange(args.users)}" for _ in range(args.queries)]
+
+            for engine in args.engines:
+                started = time.perf_counter()
+                snapshot = build_index(db, engine)
+                kb_load = time.perf_counter() - started
+                understood = {c: [understand(q)[1] for q in qs] for c, qs in queries.items()}
+                translator.memory.clear()
+
+                def write_history(uid):
+                    session = SessionLocal()
+                    try:
+                        session.execute(ChatHistory.__table__.insert(), [
+                            {"user_id": uid, "sender": "user", "message": "how do i treat a fever"},
+                            {"user_id": uid, "sender": "bot", "message": "Rest and fluids."},
+                        ])
+                        session.commit()
+                        return True
+                    finally:
+                        session.close()
+
+                def chat(payload):
+                    response_cache.clear()  # cold cache: the full path every time
+                    return client.post("/chat", json=payload).status_code == 200
+
+                stages = {
+                    "user_lookup": timed(
+                        lambda name: db.query(User).filter(User.username == name).first(), usernames, args.budget,
+                    ),
+                    "translate": timed(lambda q: understand(q)[1], queries["hindi"], args.budget),
+                    "match": {c: timed(snapshot.match, qs, args.budget) for c, qs in understood.items()},
+                    "history_write": timed(write_history, range(1, args.queries + 1), args.budget),
+                    "end_to_end": {
+                        c: timed(chat, [{"user": u, "message": q} for u, q in zip(usernames, qs)], args.budget)
+                        for c, qs in queries.items()
+                    },
+                }
+                results.append({"engine": engine, "rows": size, "kb_load_s": round(kb_load, 4), "stages": stages})
+                print(
+                    f"{engine:>7} {size:8d} rows  load {kb_load:7.2f}s  "
+                    + "  ".join(f"{c} {stages['end_to_end'][c]['p50_ms']:8.2f}ms" for c in CATEGORIES)
+                )
+        db.close()
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "queries_per_category": args.queries,
+            "budget_s": args.budget,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance, args.min_delta_ms)
+        for engine, rows, stage, old, new in regressions:
+            print(f"❌ {engine} {rows} rows {stage}: p50 {old:.2f} -> {new:.2f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No p50 regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
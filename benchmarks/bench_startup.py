@@ -0,0 +1,55 @@
+"""
+Worker startup (KB load + index build) on a cold database versus a warm
+restart where the source manifest lets ingestion be skipped.
+
+    python -m benchmarks.bench_startup --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.main import load_knowledge_base
+from backend.models import install_medical_qna_triggers
+
+
+def make_csv(path: str, rows: int):
+    pd.DataFrame({
+        "input": [f"What should I do about symptom number {i}?" for i in range(rows)],
+        "output": [f"Answer text for symptom {i}." for i in range(rows)],
+    }).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "medical_qna.csv")
+        make_csv(csv_path, args.rows)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            install_medical_qna_triggers(conn)
+        Session = sessionmaker(bind=engine)
+
+        for label in ("cold start", "warm restart", "touched file"):
+            if label == "touched file":
+                os.utime(csv_path)  # new mtime, same bytes: hashed but not reloaded
+            db = Session()
+            started = time.perf_counter()
+            load_knowledge_base(db, csv_path)
+            elapsed = time.perf_counter() - started
+            db.close()
+            print(f"{label:>13}: {elapsed:.3f}s to ready ({args.rows} rows)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Streaming chat against a running server: time to first byte of
+/chat/stream versus the full /chat round trip, then many concurrent
+WebSocket sessions holding their connection for several turns each.
+
+    uvicorn backend.main:app --port 8000                     # then
+    python -m benchmarks.bench_streaming --turns 200 --connections 500 --session-turns 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import websockets
+
+QUESTIONS = ["how do i treat a sprain", "what is fever", "मुझे बुखार है", "what causes a headache"]
+
+
+def summary(samples: list) -> str:
+    samples = sorted(samples)
+    p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(samples) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms"
+
+
+async def first_byte(url: str, turns: int, language: str):
+    full, ttfb, last = [], [], []
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        for i in range(turns):
+            payload = {"message": QUESTIONS[i % len(QUESTIONS)], "language": language}
+            started = time.perf_counter()
+            await client.post("/chat", json=payload)
+            full.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            first = None
+            async with client.stream("POST", "/chat/stream", json=payload) as r:
+                async for line in r.aiter_lines():
+                    if first is None and line.startswith("event:"):
+                        first = time.perf_counter() - started
+            ttfb.append(first if first is not None else time.perf_counter() - started)
+            last.append(time.perf_counter() - started)
+    print(f"{turns} turns, language={language}")
+    print(f"  /chat full reply       {summary(full)}")
+    print(f"  /chat/stream 1st event {summary(ttfb)}")
+    print(f"  /chat/stream reply     {summary(last)}")
+
+
+async def session(url: str, turns: int, language: str, latencies: list, outcome: dict, ready: asyncio.Event):
+    try:
+        async with websockets.connect(url, open_timeout=30) as ws:
+            outcome["connected"] += 1
+            await ready.wait()  # hold every connection open before the turns start
+            for i in range(turns):
+                started = time.perf_counter()
+                await ws.send(json.dumps({"message": QUESTIONS[i % len(QUESTIONS)], "language": language}))
+                while json.loads(await ws.recv()).get("event") not in ("reply", "error"):
+                    pass
+                latencies.append(time.perf_counter() - started)
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+        outcome[type(e).__name__] = outcome.get(type(e).__name__, 0) + 1
+
+
+async def capacity(url: str, connections: int, turns: int, language: str):
+    ws_url = url.replace("http", "ws", 1) + "/chat/ws"
+    latencies, outcome, ready = [], {"connected": 0}, asyncio.Event()
+    tasks = [asyncio.create_task(session(ws_url, turns, language, latencies, outcome, ready)) for _ in range(connections)]
+    started = time.perf_counter()
+    while outcome["connected"] + sum(v for k, v in outcome.items() if k != "connected") < connections:
+        await asyncio.sleep(0.05)
+    connect_s = time.perf_counter() - started
+    started = time.perf_counter()
+    ready.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    print(f"{connections} WebSocket sessions x {turns} turns: {outcome} (connected in {connect_s:.2f}s)")
+    if latencies:
+        print(f"  {len(latencies) / elapsed:7.0f} turns/s   turn {summary(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--turns", type=int, default=200, help="sequential turns for the first-byte comparison")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--session-turns", type=int, default=5)
+    parser.add_argument("--language", default="en")
+    args = parser.parse_args()
+
+    asyncio.run(first_byte(args.url, args.turns, args.language))
+    asyncio.run(capacity(args.url, args.connections, args.session_turns, args.language))
+
+
+if __name__ == "__main__":
+    main()
@@ -135,22 +135,28 @@ def page_chatbot():
         st.session_state.messages.append(("user", user_input))
         st.chat_message("user").markdown(user_input)
 
+        # Stream the reply: the matched answer shows first, the translation replaces it
+        placeholder = st.chat_message("assistant").empty()
         try:
             payload = {
                 "user": st.session_state.username,
                 "message": user_input,
                 "language": st.session_state.ui_language,
             }
-            r = requests.post(f"{API_URL}/chat", json=payload, timeout=30)
-            if r.status_code == 200:
-                bot_reply = safe_json(r).get("response", "Something went wrong.")
-            else:
-                bot_reply = safe_json(r).get("detail", "Something went wrong.")
+            with requests.post(f"{API_URL}/chat/stream", json=payload, stream=True, timeout=30) as r:
+                if r.status_code == 200:
+                    bot_reply = "Something went wrong."
+                    for line in r.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            bot_reply = json.loads(line[5:]).get("response", bot_reply)
+                            placeholder.markdown(bot_reply)
+                else:
+                    bot_reply = safe_json(r).get("detail", "Something went wrong.")
         except Exception as e:
             bot_reply = f"Error: {e}"
 
         st.session_state.messages.append(("assistant", bot_reply))
-        st.chat_message("assistant").markdown(bot_reply)
+        placeholder.markdown(bot_reply)
 
 def page_reset():
     st.title("🔧 Reset Password")
@@ -1,10 +1,34 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
+
+const API_URL = "http://127.0.0.1:8000";
+const WS_URL = "ws://127.0.0.1:8000/chat/ws";
 
 function Chatbot() {
   const [messages, setMessages] = useState([
     { sender: "bot", message: "Hello! I am your wellness assistant." },
   ]);
   const [input, setInput] = useState("");
+  const socket = useRef(null);
+
+  // One WebSocket for the whole session: the matched answer arrives first,
+  // then the translated reply replaces it.
+  useEffect(() => {
+    const token = localStorage.getItem("token");
+    const ws = new WebSocket(token ? `${WS_URL}?token=${encodeURIComponent(token)}` : WS_URL);
+    ws.onmessage = (e) => {
+      const data = JSON.parse(e.data);
+      const text = data.event === "error" ? `❌ Error: ${data.detail}` : data.response;
+      setMessages((prev) => {
+        const last = prev[prev.length - 1];
+        if (last && last.sender === "bot" && last.pending) {
+          return [...prev.slice(0, -1), { sender: "bot", message: text, pending: data.event === "match" }];
+        }
+        return [...prev, { sender: "bot", message: text, pending: data.event === "match" }];
+      });
+    };
+    socket.current = ws;
+    return () => ws.close();
+  }, []);
 
   const sendMessage = async () => {
     if (!input.trim()) return;
@@ -12,12 +36,27 @@ function Chatbot() {
     const newMessages = [...messages, { sender: "user", message: input }];
     setMessages(newMessages);
 
+    const ws = socket.current;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({
+        user: localStorage.getItem("username") || "guest",
+        message: input,
+        language: "en", // default language
+      }));
+      setInput("");
+      return;
+    }
+
     try {
-      const res = await fetch("http://127.0.0.1:8000/chat", {
+      const token = localStorage.getItem("token");
+      const res = await fetch(`${API_URL}/chat`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
         body: JSON.stringify({
-          user: "testuser", // TODO: replace with logged-in username from state
+          user: localStorage.getItem("username") || "guest",
           message: input,
           language: "en", // default language
         }),
@@ -26,6 +26,8 @@ function Login() {
       const data = await res.json();
 
       if (res.ok) {
+        localStorage.setItem("token", data.access_token);
+        localStorage.setItem("username", data.username);
         setMessage("✅ Login successful!");
         setTimeout(() => navigate("/chatbot"), 1000); // Navigate to chatbot
       } else {
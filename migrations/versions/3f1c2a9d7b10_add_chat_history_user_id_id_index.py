@@ -0,0 +1,29 @@
+"""add chat_history (user_id, id) index
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db() already creates it on fresh databases
+    op.create_index('ix_chat_history_user_id_id', 'chat_history', ['user_id', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_history_user_id_id', table_name='chat_history', if_exists=True)
@@ -0,0 +1,92 @@
+"""
+Bearer tokens are verified once and their claims cached until ``exp``;
+/history answers 401 for a missing or bad token and 403 for another user's,
+and /metrics admits only its scrape token.
+"""
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import auth
+from backend.auth import ClaimsCache, create_access_token, create_user_token, require_bearer_secret, verify_token
+from backend.main import app
+from backend.metrics import require_metrics_token
+
+ANN = SimpleNamespace(id=1, username="ann", language="en")
+BOB = SimpleNamespace(id=2, username="bob", language="hi")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ClaimsCache(maxsize=10)
+    monkeypatch.setattr(auth, "claims_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def client(cache):
+    # no lifespan: every request below is turned away before it reaches the database
+    return TestClient(app)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_verified_claims_are_cached(cache, monkeypatch):
+    token = create_user_token(ANN)
+    assert verify_token(token)["uid"] == 1
+    monkeypatch.setattr(auth, "decode_token", lambda token: pytest.fail("decoded a cached token"))
+    assert verify_token(token)["sub"] == "ann"
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_cached_claims_expire(cache):
+    cache.put("token", {"uid": 1, "sub": "ann", "exp": time.time() + 0.05})
+    assert cache.get("token") is not None
+    time.sleep(0.1)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_expired_or_tampered_token_is_rejected(cache):
+    expired = create_access_token({"sub": "ann", "uid": 1}, expires_delta=timedelta(seconds=-1))
+    assert verify_token(expired) is None
+    assert verify_token(create_user_token(ANN) + "x") is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.parametrize("path", ["/history/ann", "/history/ann/export"])
+def test_history_needs_a_valid_token(client, path):
+    assert client.get(path).status_code == 401
+    response = client.get(path, headers=bearer("not-a-jwt"))
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("path", ["/history/ann", "/history/ann/export"])
+def test_history_rejects_another_users_token(client, path):
+    assert client.get(path, headers=bearer(create_user_token(BOB))).status_code == 403
+
+
+def test_metrics_needs_the_scrape_token(client):
+    app.dependency_overrides[require_metrics_token] = require_bearer_secret("scrape-token", "METRICS_TOKEN")
+    try:
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers=bearer("wrong")).status_code == 401
+        assert client.get("/metrics", headers=bearer(create_user_token(ANN))).status_code == 401
+        response = client.get("/metrics", headers=bearer("scrape-token"))
+        assert response.status_code == 200 and "# TYPE" in response.text
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_metrics_locked_without_a_configured_token(client):
+    app.dependency_overrides[require_metrics_token] = require_bearer_secret("", "METRICS_TOKEN")
+    try:
+        assert client.get("/metrics", headers=bearer("anything")).status_code == 403
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,123 @@
+"""
+HistoryWriter buffers /chat rows and flushes them in batches: a full queue
+slows producers down (``add``) or turns them away (``try_add``) instead of
+dropping rows, ``drain`` commits a user's rows before /history reads them,
+and keyset pages built with ``history_page`` neither repeat nor skip a
+message when a flush lands between two pages.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.history import HistoryWriter, history_page
+from backend.models import ChatHistory
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(session_factory):
+    # flushes only when a test asks for one (or a producer hits the limit)
+    writer = HistoryWriter(session_factory, maxsize=4, batch_size=100, flush_interval=60, put_timeout=0.2)
+    writer.start()
+    yield writer
+    writer.close()
+
+
+def rows(user_id, *messages):
+    return [{"user_id": user_id, "sender": "user", "message": m} for m in messages]
+
+
+def stored_messages(session_factory, user_id):
+    db = session_factory()
+    try:
+        return [m for (m,) in db.query(ChatHistory.message).filter(ChatHistory.user_id == user_id).order_by(ChatHistory.id)]
+    finally:
+        db.close()
+
+
+def page(session_factory, writer, user_id, limit, before_id=None):
+    """One /history page as main.get_history builds it when the buffer is not drained."""
+    db = session_factory()
+    try:
+        query = db.query(ChatHistory.id, ChatHistory.sender, ChatHistory.message).filter(ChatHistory.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(ChatHistory.id < before_id)
+        query = query.order_by(ChatHistory.id.desc()).limit(limit + 1)
+        with writer.visibility():
+            stored = query.all()
+            pending = writer.pending_for(user_id) if before_id is None else []
+        return history_page(stored, pending, limit)
+    finally:
+        db.close()
+
+
+def test_full_queue_blocks_then_flushes_on_callers_thread(session_factory, writer):
+    writer.add(rows(1, "m1", "m2", "m3", "m4"))
+    assert writer.pending_rows() == 4 and writer.flushed_rows == 0
+
+    started = time.monotonic()
+    writer.add(rows(1, "m5", "m6"))
+    assert time.monotonic() - started >= writer.put_timeout
+    assert writer.backpressure_waits >= 1
+    assert writer.pending_rows() == 0
+    assert stored_messages(session_factory, 1) == ["m1", "m2", "m3", "m4", "m5", "m6"]
+
+
+def test_blocked_producer_resumes_when_flusher_makes_room(session_factory, writer):
+    writer.put_timeout = 5
+    writer.add(rows(1, "m1", "m2", "m3", "m4"))
+    producer = threading.Thread(target=writer.add, args=(rows(1, "m5"),))
+    producer.start()
+    time.sleep(0.1)
+    assert producer.is_alive()  # waiting for room
+
+    started = time.monotonic()
+    writer.flush()
+    producer.join(timeout=2)
+    assert not producer.is_alive() and time.monotonic() - started < writer.put_timeout
+    assert writer.backpressure_waits >= 1
+    assert stored_messages(session_factory, 1) == ["m1", "m2", "m3", "m4", "m5"]
+
+
+def test_try_add_sheds_when_full(writer):
+    assert writer.try_add(rows(1, "m1", "m2", "m3"))
+    assert not writer.try_add(rows(1, "m4", "m5"))
+    assert writer.try_add(rows(1, "m4"))
+    assert [r["message"] for r in writer.pending_for(1)] == ["m1", "m2", "m3", "m4"]
+
+
+def test_drain_makes_buffered_rows_visible(session_factory, writer):
+    writer.add(rows(1, "m1", "m2") + rows(2, "other") + rows(1, "m3"))
+    assert stored_messages(session_factory, 1) == []
+
+    assert writer.drain(1)
+    assert writer.pending_for(1) == []
+    items, next_before_id = page(session_factory, writer, 1, limit=10)
+    assert [r["message"] for r in items] == ["m1", "m2", "m3"]
+    assert all(r["id"] is not None for r in items) and next_before_id is None
+
+
+def test_keyset_pages_across_a_flush(session_factory, writer):
+    writer.add(rows(1, "m1", "m2", "m3", "m4"))
+    writer.flush()
+    writer.add(rows(1, "m5", "m6", "m7"))
+
+    first, before_id = page(session_factory, writer, 1, limit=4)
+    assert [r["message"] for r in first] == ["m4", "m5", "m6", "m7"]
+    assert [r["id"] is None for r in first] == [False, True, True, True]
+
+    writer.flush()  # the buffered rows get ids between the two requests
+    second, after = page(session_factory, writer, 1, limit=4, before_id=before_id)
+    assert [r["message"] for r in second] == ["m1", "m2", "m3"]
+    assert after is None
@@ -0,0 +1,32 @@
+"""
+IntentsEngine.match is the /chat fast path and runs before the QnA tier,
+so it may only fire on a pattern's exact token sequence; the looser
+content-word lookup is ``match_content``, tried after a QnA miss.
+"""
+from backend.intents import IntentsEngine
+
+INTENTS = [
+    {"tag": "fever", "patterns": ["Fever", "How do you treat a fever?"], "responses": ["Drink fluids."]},
+    {"tag": "greeting", "patterns": ["Hi", "How are you"], "responses": ["Hello!"]},
+]
+
+
+def test_exact_token_sequence_hits_fast_path():
+    engine = IntentsEngine(INTENTS)
+    assert engine.match("fever") == ("fever", "Drink fluids.")
+    assert engine.match("How do you treat a FEVER") == ("fever", "Drink fluids.")
+    assert engine.match("how are you?") == ("greeting", "Hello!")
+
+
+def test_single_word_pattern_does_not_claim_questions():
+    engine = IntentsEngine(INTENTS)
+    assert engine.match("what is fever?") is None
+    assert engine.match("how to treat fever") is None
+
+
+def test_content_words_match_only_through_match_content():
+    engine = IntentsEngine(INTENTS)
+    assert engine.match_content("what is fever?") == ("fever", "Drink fluids.")
+    assert engine.match_content("treat fever how") == ("fever", "Drink fluids.")
+    assert engine.match_content("how are you") is None  # stopwords only: exact lookup alone
+    assert engine.stats["content_hits"] == 2 and engine.stats["content_misses"] == 1
@@ -0,0 +1,128 @@
+"""
+QnAIndex must pick the row the original /chat path picked:
+``get_close_matches(query, [q.lower() for q in questions], n=1, cutoff)``
+followed by the first row whose lower-cased question equals the match.
+Only the trigram shortlist is scored exactly, so besides edge cases this
+checks realistic typo'd and paraphrased queries on a KB worded like
+intents.json.
+"""
+import random
+from difflib import get_close_matches
+
+import pytest
+
+from backend.matcher import MATCH_CUTOFF, QnAIndex
+from benchmarks.bench_matcher import intents_questions, paraphrase
+from benchmarks.bench_scaling import near_miss
+
+CORPUS = [
+    "What is fever?",
+    "How do you treat a sprain?",
+    "What are the symptoms of diabetes?",
+    "How can I lower my blood pressure?",
+    "WHAT IS FEVER?",  # same question as row 1, different answer: row 1 must win
+    "what is fever?",
+    "What causes a headache?",
+    "What causes headaches?",
+    "Is it safe to take ibuprofen with food?",
+    "abcd",
+    "abce",  # "abcx" ties with "abcd" and "abce"
+    "a",
+    "?",
+    "How much water should I drink a day?",
+    "When should I see a doctor for a cough?",
+]
+
+QUERIES = [
+    "what is fever?",
+    "What Is Fever?",
+    "what is a fever",
+    "fever",
+    "how to treat sprain",
+    "symptoms of diabetes",
+    "lower blood pressure",
+    "what causes a headache",
+    "what causes headache",
+    "ibuprofen with food",
+    "abcx",
+    "abc",
+    "a",
+    "b",
+    "?",
+    "",
+    " ",
+    "zzzz",
+    "should i see a doctor for a cough or a cold that will not go away after a week",
+]
+
+
+def rows_for(questions):
+    return [(i + 1, q, f"answer {i + 1}") for i, q in enumerate(questions)]
+
+
+def reference(rows, query, cutoff):
+    """The pre-index /chat lookup, verbatim."""
+    matches = get_close_matches(query.lower(), [q.lower() for _, q, _ in rows], n=1, cutoff=cutoff)
+    if not matches:
+        return None
+    row_id, _, answer = next(r for r in rows if r[1].lower() == matches[0])
+    return row_id, answer
+
+
+@pytest.mark.parametrize("cutoff", [MATCH_CUTOFF, 0.6])
+@pytest.mark.parametrize("query", QUERIES)
+def test_same_row_as_get_close_matches(query, cutoff):
+    rows = rows_for(CORPUS)
+    assert QnAIndex(rows).match(query, cutoff) == reference(rows, query, cutoff)
+
+
+def test_first_row_wins_for_duplicate_questions():
+    index = QnAIndex(rows_for(CORPUS))
+    assert index.match("what is fever?") == (1, "answer 1")
+    assert index.match("WHAT IS FEVER?") == (1, "answer 1")
+
+
+def test_equal_scores_break_ties_like_get_close_matches():
+    rows = rows_for(CORPUS)
+    # "abcd" and "abce" both score 0.75; get_close_matches keeps the larger string
+    assert QnAIndex(rows).match("abcx") == reference(rows, "abcx", MATCH_CUTOFF) == (11, "answer 11")
+
+
+@pytest.mark.parametrize("query", ["", " ", "a", "?", "zz"])
+def test_empty_and_short_queries(query):
+    rows = rows_for(CORPUS)
+    assert QnAIndex(rows).match(query) == reference(rows, query, MATCH_CUTOFF)
+
+
+def test_empty_index():
+    assert QnAIndex().match("what is fever?") is None
+    assert QnAIndex().match("") is None
+
+
+def test_randomized_corpus():
+    rng = random.Random(3)
+    words = ["fever", "cough", "pain", "back", "head", "treat", "cure", "sleep", "child", "rash", "sore", "throat"]
+    questions = [
+        f"{rng.choice(['what is', 'how to treat', 'why do i have'])} {' '.join(rng.sample(words, rng.randint(1, 3)))}?"
+        for _ in range(300)
+    ]
+    rows = rows_for(questions)
+    index = QnAIndex(rows)
+    for _ in range(200):
+        query = rng.choice(questions)
+        chars = list(query)
+        for _ in range(rng.randint(0, 6)):
+            chars[rng.randrange(len(chars))] = rng.choice("abcdefghij ")
+        query = "".join(chars)
+        assert index.match(query) == reference(rows, query, MATCH_CUTOFF), query
+
+
+@pytest.mark.parametrize("reword", [near_miss, paraphrase])
+def test_realistic_queries_on_intents_vocabulary(reword):
+    questions = intents_questions(1500)
+    rows = rows_for(questions)
+    index = QnAIndex(rows)
+    rng = random.Random(11)
+    for _ in range(40):
+        query = reword(rng.choice(questions), rng)
+        assert index.match(query) == reference(rows, query, MATCH_CUTOFF), query
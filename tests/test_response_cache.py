@@ -0,0 +1,93 @@
+"""
+Cached /chat replies are keyed by KB version, so a change to the knowledge
+base (a row edit through the change-log triggers, or translate_kb storing
+translations) must stop the old reply from being served, and the shared
+SQLite tier must drop replies for versions it has moved past.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import chat_service, translation
+from backend.database import Base
+from backend.kb import KBSnapshot, current_version
+from backend.models import MedicalQnA, install_medical_qna_triggers
+from backend.response_cache import ResponseCache, SQLiteResponseTier
+from backend.translate_kb import translate_kb
+from backend.translation import CachedTranslator, LRUCache, StubBackend
+
+QUERY = "what is fever?"
+
+
+class StoredBackend:
+    """Translates differently from the live stub, to tell stored answers apart."""
+    name = "stored"
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return f"[stored {target}] {text}"
+
+
+def refreshed(db, snapshot):
+    """What refresh_index swaps in: the caught-up snapshot, or a full rebuild."""
+    return snapshot.catch_up(db) or KBSnapshot.full(db)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'kb.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        install_medical_qna_triggers(conn)
+    session = sessionmaker(bind=engine)()
+    session.add(MedicalQnA(question="What is fever?", answer="Rest and fluids."))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(memory=LRUCache(100, 3600), shared=SQLiteResponseTier(str(tmp_path / "responses.db")))
+    monkeypatch.setattr(chat_service, "response_cache", cache)
+    monkeypatch.setattr(translation, "translator", CachedTranslator(StubBackend()))
+    return cache
+
+
+def test_reply_not_served_after_kb_update(db, cache):
+    snapshot = KBSnapshot.full(db)
+    assert chat_service.respond(db, snapshot, QUERY, "en") == ("Rest and fluids.", "qna")
+    assert chat_service.respond(db, snapshot, QUERY, "en") == ("Rest and fluids.", "cache")
+
+    db.query(MedicalQnA).update({MedicalQnA.answer: "See a doctor."})
+    db.commit()
+    updated = refreshed(db, snapshot)
+    assert updated.version == current_version(db) > snapshot.version
+    assert chat_service.respond(db, updated, QUERY, "en") == ("See a doctor.", "qna")
+    assert chat_service.respond(db, updated, QUERY, "en") == ("See a doctor.", "cache")
+    assert cache.shared.get(ResponseCache.key(QUERY, "en", snapshot.version)) is None
+
+
+def test_reply_not_served_after_translate_kb(db, cache):
+    snapshot = KBSnapshot.full(db)
+    assert chat_service.respond(db, snapshot, QUERY, "hi") == ("[hi] Rest and fluids.", "qna")
+    assert chat_service.respond(db, snapshot, QUERY, "hi") == ("[hi] Rest and fluids.", "cache")
+
+    assert translate_kb(db, ["hi"], CachedTranslator(StoredBackend())) == {"hi": {"inserted": 1, "failed": 0}}
+    updated = refreshed(db, snapshot)
+    assert updated.version > snapshot.version
+    assert chat_service.respond(db, updated, QUERY, "hi") == ("[stored hi] Rest and fluids.", "qna")
+
+
+def test_shared_tier_drops_entries_after_version_bump(tmp_path):
+    path = str(tmp_path / "responses.db")
+    writer = ResponseCache(memory=LRUCache(10, 3600), shared=SQLiteResponseTier(path))
+    reader = ResponseCache(memory=LRUCache(10, 3600), shared=SQLiteResponseTier(path))  # another worker
+    writer.set(QUERY, "en", 1, "Rest and fluids.")
+    assert reader.get(QUERY, "en", 1) == "Rest and fluids."
+    assert reader.shared_hits == 1
+
+    writer.set("how to treat a cough?", "en", 2, "Drink fluids.")
+    assert writer.shared.get(ResponseCache.key(QUERY, "en", 1)) is None
+    versions = writer.shared._conn().execute("SELECT DISTINCT version FROM responses").fetchall()
+    assert versions == [(2,)]
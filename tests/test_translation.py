@@ -0,0 +1,77 @@
+"""
+CachedTranslator on the offline ``stub`` backend: repeats are served by the
+LRU, entries evicted from it come back from the SQLite tier without a
+backend call, ``translate_many`` looks each distinct text up once, and the
+stats counters account for every lookup.
+"""
+from backend.translation import CachedTranslator, LRUCache, SQLiteCache, StubBackend, create_translator
+
+
+class BatchStubBackend(StubBackend):
+    """The stub with a batch call, like GoogleBackend."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def translate_batch(self, texts, source, target):
+        self.batches.append(list(texts))
+        return [self.translate(text, source, target) for text in texts]
+
+
+def test_lru_hits_skip_the_backend():
+    translator = create_translator("stub", "")
+    assert translator.translate("fever", "en", "hi") == "[hi] fever"
+    assert translator.translate("fever", "EN", "HI") == "[hi] fever"
+    assert translator.cached("fever", "en", "hi") == "[hi] fever"
+    assert translator.backend.calls == 1
+    assert translator.translate("fever", "en", "en") == "fever"  # same language: no lookup at all
+    assert translator.stats()["hits"] == 2 and translator.stats()["misses"] == 1
+
+
+def test_sqlite_tier_serves_entries_evicted_from_the_lru(tmp_path):
+    translator = CachedTranslator(StubBackend(), memory=LRUCache(2, 3600), persistent=SQLiteCache(str(tmp_path / "tr.db")))
+    for text in ["fever", "cough", "rash"]:
+        translator.translate(text, "en", "hi")
+    assert translator.memory.evictions == 1 and translator.cached("fever", "en", "hi") is None
+
+    assert translator.translate("fever", "en", "hi") == "[hi] fever"
+    assert translator.backend.calls == 3
+    assert translator.persistent_hits == 1
+    assert translator.cached("fever", "en", "hi") == "[hi] fever"  # promoted back into the LRU
+
+    restarted = create_translator("stub", str(tmp_path / "tr.db"))
+    assert restarted.translate("cough", "en", "hi") == "[hi] cough"
+    assert restarted.backend.calls == 0 and restarted.persistent_hits == 1
+
+
+def test_translate_many_looks_up_each_text_once():
+    translator = create_translator("stub", "")
+    translator.translate("fever", "en", "hi")
+    texts = ["fever", "cough", "fever", "cough", "", "rash"]
+    assert translator.translate_many(texts, "en", "hi") == [
+        "[hi] fever", "[hi] cough", "[hi] fever", "[hi] cough", "", "[hi] rash",
+    ]
+    assert translator.backend.calls == 3  # fever once before, then cough and rash
+
+
+def test_translate_many_sends_misses_in_one_batch(tmp_path):
+    translator = CachedTranslator(BatchStubBackend(), persistent=SQLiteCache(str(tmp_path / "tr.db")))
+    translator.translate("fever", "en", "hi")
+    translator.translate_many(["cough", "fever", "rash", "cough"], "en", "hi")
+    assert translator.backend.batches == [["cough", "rash"]]
+    assert translator.translate_many(["rash", "cough"], "en", "hi") == ["[hi] rash", "[hi] cough"]
+    assert translator.backend.batches == [["cough", "rash"]]
+
+
+def test_stats_count_every_lookup(tmp_path):
+    translator = CachedTranslator(StubBackend(), memory=LRUCache(1, 3600), persistent=SQLiteCache(str(tmp_path / "tr.db")))
+    translator.translate("fever", "en", "hi")  # miss
+    translator.translate("fever", "en", "hi")  # LRU hit
+    translator.translate("cough", "en", "hi")  # miss, evicts fever
+    translator.translate("fever", "en", "hi")  # SQLite hit, evicts cough
+    stats = translator.stats()
+    assert stats["backend"] == "stub"
+    assert (stats["hits"], stats["persistent_hits"], stats["misses"], stats["errors"]) == (1, 1, 2, 0)
+    assert stats["evictions"] == 2 and stats["size"] == 1
+    assert stats["hit_rate"] == 0.5